@@ -115,6 +115,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # File-backed test DB: threaded tests need real SQLite locking, not shared-cache memory
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -125,6 +127,104 @@ if os.environ.get('DATABASE_URL'):
         ssl_require=True
     )
 
+# ==============================================
+# ⚡ CACHE (Shared across workers when REDIS_URL is set)
+# ==============================================
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL'),
+    }
+
+# ==============================================
+# 🏃 LIVE OCCUPANCY
+# ==============================================
+
+# Open sessions older than this are auto checked-out by `recount_occupancy`
+GYM_SESSION_TIMEOUT_HOURS = int(os.environ.get('GYM_SESSION_TIMEOUT_HOURS', 4))
+
+# Upper bound on how long a worker may serve a cached counter (shared cache only, see members/occupancy.py)
+OCCUPANCY_CACHE_TIMEOUT = int(os.environ.get('OCCUPANCY_CACHE_TIMEOUT', 300))
+
+# ==============================================
+# 🧾 RECEIPTS
+# ==============================================
+
+# Background PDF render threads per web worker (0 = render inline after commit)
+RECEIPT_RENDER_WORKERS = int(os.environ.get('RECEIPT_RENDER_WORKERS', 2))
+
+# 'platypus' (flowable layout) or 'canvas' (direct drawing, faster) - see payments/utils.py
+RECEIPT_RENDER_MODE = os.environ.get('RECEIPT_RENDER_MODE', 'platypus')
+
+# Processes for month-end batch receipts (empty = all cores)
+RECEIPT_BATCH_WORKERS = int(os.environ.get('RECEIPT_BATCH_WORKERS', 0)) or None
+
+# Receipt downloads: 'django' (FileResponse), 'accel' (nginx X-Accel-Redirect), 'sendfile' (X-Sendfile)
+RECEIPT_SERVE_MODE = os.environ.get('RECEIPT_SERVE_MODE', 'django')
+# nginx `internal` location aliased to MEDIA_ROOT
+RECEIPT_ACCEL_PREFIX = os.environ.get('RECEIPT_ACCEL_PREFIX', '/protected-media/')
+
+# ==============================================
+# 💬 WHATSAPP (Cloud API)
+# ==============================================
+
+WHATSAPP_PHONE_NUMBER_ID = os.environ.get('WHATSAPP_PHONE_NUMBER_ID')
+WHATSAPP_ACCESS_TOKEN = os.environ.get('WHATSAPP_ACCESS_TOKEN')
+WHATSAPP_API_VERSION = os.environ.get('WHATSAPP_API_VERSION', 'v18.0')
+# Point at whatsapp/fake_api.py for local testing / benchmarks
+WHATSAPP_API_BASE = os.environ.get('WHATSAPP_API_BASE', 'https://graph.facebook.com')
+# Parallel sends for bulk reminder dispatch
+WHATSAPP_SEND_CONCURRENCY = int(os.environ.get('WHATSAPP_SEND_CONCURRENCY', 8))
+
+# Pooled HTTP transport: keep-alive pool (default max(concurrency, 10)), retries on 429 / connect errors
+# (connect errors only while WHATSAPP_RATE_LIMIT is on, a 429 re-POST would skip the bucket)
+WHATSAPP_HTTP_POOL_SIZE = int(os.environ.get('WHATSAPP_HTTP_POOL_SIZE', 0)) or None
+WHATSAPP_HTTP_TIMEOUT = float(os.environ.get('WHATSAPP_HTTP_TIMEOUT', 10))
+WHATSAPP_HTTP_RETRIES = int(os.environ.get('WHATSAPP_HTTP_RETRIES', 2))
+WHATSAPP_HTTP_BACKOFF = float(os.environ.get('WHATSAPP_HTTP_BACKOFF', 0.5))
+WHATSAPP_HTTP_MAX_RETRY_AFTER = int(os.environ.get('WHATSAPP_HTTP_MAX_RETRY_AFTER', 30))
+# Circuit breaker: open after N consecutive failures, probe again after RESET seconds
+WHATSAPP_BREAKER_THRESHOLD = int(os.environ.get('WHATSAPP_BREAKER_THRESHOLD', 5))
+WHATSAPP_BREAKER_RESET = float(os.environ.get('WHATSAPP_BREAKER_RESET', 30))
+# Shared send rate per phone number id, across all processes (DB token bucket; 0 = off)
+WHATSAPP_RATE_LIMIT = float(os.environ.get('WHATSAPP_RATE_LIMIT', 80))
+WHATSAPP_RATE_LIMIT_BURST = float(os.environ.get('WHATSAPP_RATE_LIMIT_BURST', 0)) or None
+# Longest a dispatcher waits for a token before reporting the message rate-limited (retried later)
+WHATSAPP_RATE_LIMIT_TIMEOUT = float(os.environ.get('WHATSAPP_RATE_LIMIT_TIMEOUT', 30))
+
+# Outbox retries: backoff = BASE * 2^(attempt-1) seconds (+/-20% jitter), capped at MAX
+WHATSAPP_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('WHATSAPP_OUTBOX_MAX_ATTEMPTS', 6))
+WHATSAPP_OUTBOX_BACKOFF_BASE = int(os.environ.get('WHATSAPP_OUTBOX_BACKOFF_BASE', 30))
+WHATSAPP_OUTBOX_BACKOFF_MAX = int(os.environ.get('WHATSAPP_OUTBOX_BACKOFF_MAX', 3600))
+# SENDING rows older than this are assumed orphaned by a dead worker
+WHATSAPP_OUTBOX_CLAIM_TIMEOUT = int(os.environ.get('WHATSAPP_OUTBOX_CLAIM_TIMEOUT', 600))
+
+# Status webhooks: GET handshake token, POST bodies signed with the app secret (X-Hub-Signature-256)
+WHATSAPP_WEBHOOK_VERIFY_TOKEN = os.environ.get('WHATSAPP_WEBHOOK_VERIFY_TOKEN')
+WHATSAPP_APP_SECRET = os.environ.get('WHATSAPP_APP_SECRET')
+# Events are buffered in memory and applied in batches of this size / at least this often
+WHATSAPP_WEBHOOK_FLUSH_SIZE = int(os.environ.get('WHATSAPP_WEBHOOK_FLUSH_SIZE', 500))
+WHATSAPP_WEBHOOK_FLUSH_INTERVAL = float(os.environ.get('WHATSAPP_WEBHOOK_FLUSH_INTERVAL', 1.0))
+# Callbacks for ids the outbox hasn't saved yet are kept this long (seconds) before being dropped
+WHATSAPP_WEBHOOK_UNMATCHED_TTL = int(os.environ.get('WHATSAPP_WEBHOOK_UNMATCHED_TTL', 24 * 3600))
+
+# ==============================================
+# 📊 REPORT CACHE (see reports/cache.py)
+# ==============================================
+
+# Periods that ended before today only change on backdated writes (which invalidate)
+REPORT_CACHE_CLOSED_TTL = int(os.environ.get('REPORT_CACHE_CLOSED_TTL', 7 * 24 * 3600))
+REPORT_CACHE_CURRENT_TTL = int(os.environ.get('REPORT_CACHE_CURRENT_TTL', 300))
+# Larger rendered PDFs are streamed uncached
+REPORT_CACHE_MAX_FILE_BYTES = int(os.environ.get('REPORT_CACHE_MAX_FILE_BYTES', 5 * 1024 * 1024))
+
 # ==============================================
 # 👤 CUSTOM USER MODEL + EMAIL AUTH FIX
 # ==============================================
@@ -16,4 +16,7 @@ urlpatterns = [
     path('api/members/', include('members.urls')),
     path('api/fitness/', include('fitness.urls')),
     path('api/payments/', include('payments.urls')),
+    path('api/reports/', include('reports.urls')),
+    path('api/reminders/', include('reminders.urls')),
+    path('api/whatsapp/', include('whatsapp.urls')),
 ]
\ No newline at end of file
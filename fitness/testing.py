@@ -0,0 +1,31 @@
+"""
+Shared Test Fixtures
+Factories used by the app test suites (not imported by production code).
+"""
+from datetime import date, timedelta
+
+from .models import Gym, User
+
+
+def create_gym(email='owner@example.com', **fields):
+    """A gym with its owner (owner.gym set)"""
+    owner = User.objects.create_user(
+        email=email, password='test-pass-123', first_name='Gym', last_name='Owner', role='GYM_OWNER'
+    )
+    gym = Gym.objects.create(**{
+        'owner': owner, 'name': 'Test Gym', 'address': '1 Main Road', 'city': 'Pune', 'state': 'MH',
+        'pincode': '411001', 'phone': '9876543210', 'email': email, **fields
+    })
+    owner.gym = gym
+    owner.save()
+    return gym
+
+
+def create_member(gym, index=0, days_left=5, **fields):
+    from members.models import Member
+
+    return Member.objects.create(**{
+        'gym': gym, 'name': f'Member {index}', 'phone': f'90000{index:05d}', 'join_date': date.today(),
+        'membership_start_date': date.today(), 'membership_end_date': date.today() + timedelta(days=days_left),
+        **fields
+    })
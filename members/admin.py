@@ -3,7 +3,7 @@ Members Admin
 Optimized to match Model Fields exactly
 """
 from django.contrib import admin
-from .models import Member, MemberAttendance, MembershipPlan
+from .models import Member, MemberAttendance, MembershipPlan, GymOccupancy
 
 @admin.register(Member)
 class MemberAdmin(admin.ModelAdmin):
@@ -46,4 +46,10 @@ class MemberAttendanceAdmin(admin.ModelAdmin):
 class MembershipPlanAdmin(admin.ModelAdmin):
     list_display = ['name', 'gym', 'duration', 'price', 'is_active', 'created_at']
     list_filter = ['gym', 'duration', 'is_active']
-    search_fields = ['name']
\ No newline at end of file
+    search_fields = ['name']
+
+
+@admin.register(GymOccupancy)
+class GymOccupancyAdmin(admin.ModelAdmin):
+    list_display = ['gym', 'current_count', 'recounted_at', 'updated_at']
+    readonly_fields = ['recounted_at', 'updated_at']
@@ -0,0 +1,81 @@
+"""
+Attendance Analytics
+Per-member dwell time & visit frequency + "at risk" (stopped coming) list.
+
+Everything is one grouped query over MemberAttendance LEFT JOIN Member,
+cached per gym for the rest of the (local) day.
+"""
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, DurationField, Exists, ExpressionWrapper, F, Max, OuterRef, Q
+from django.utils import timezone
+
+from .models import Member, MemberAttendance
+
+VISIT_WINDOW_DAYS = 30
+DEFAULT_AT_RISK_DAYS = 14
+
+
+def _seconds_until_midnight(now):
+    tomorrow = timezone.localdate(now) + timedelta(days=1)
+    midnight = timezone.make_aware(datetime.combine(tomorrow, time.min))
+    return max(int((midnight - now).total_seconds()), 60)
+
+
+def attendance_queryset(gym, at_risk_days=None, now=None):
+    """Active members annotated with last_visit, visits_30d and avg_session"""
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+
+    session_length = ExpressionWrapper(
+        F('attendance__check_out_time') - F('attendance__check_in_time'),
+        output_field=DurationField()
+    )
+
+    queryset = Member.objects.filter(gym=gym, is_active=True)
+
+    if at_risk_days is not None:
+        # Anti-join: valid membership but no check-in inside the window
+        recent_visit = MemberAttendance.objects.filter(
+            member=OuterRef('pk'),
+            check_in_time__gte=now - timedelta(days=at_risk_days)
+        )
+        queryset = queryset.filter(membership_end_date__gte=today).filter(~Exists(recent_visit))
+
+    return queryset.only('id', 'name', 'phone', 'membership_end_date').annotate(
+        last_visit=Max('attendance__check_in_time'),
+        visits_30d=Count(
+            'attendance',
+            filter=Q(attendance__check_in_time__gte=now - timedelta(days=VISIT_WINDOW_DAYS))
+        ),
+        avg_session=Avg(session_length, filter=Q(attendance__check_out_time__isnull=False)),
+    ).order_by(F('last_visit').asc(nulls_first=True), 'name')
+
+
+def member_attendance_analytics(gym, at_risk_days=None):
+    """Serialized analytics rows, cached per gym until local midnight"""
+    now = timezone.now()
+    today = timezone.localdate(now)
+    key = f"member-analytics:{gym.pk}:{today.isoformat()}:{at_risk_days if at_risk_days is not None else 'all'}"
+
+    rows = cache.get(key)
+    if rows is not None:
+        return rows
+
+    rows = []
+    for member in attendance_queryset(gym, at_risk_days=at_risk_days, now=now):
+        last_visit = member.last_visit
+        rows.append({
+            'id': member.id,
+            'name': member.name,
+            'phone': member.phone,
+            'membership_end_date': member.membership_end_date,
+            'last_visit': last_visit,
+            'days_since_last_visit': (today - timezone.localdate(last_visit)).days if last_visit else None,
+            'visits_30d': member.visits_30d,
+            'avg_session_minutes': round(member.avg_session.total_seconds() / 60, 1) if member.avg_session else None,
+        })
+
+    cache.set(key, rows, _seconds_until_midnight(now))
+    return rows
@@ -0,0 +1,30 @@
+"""
+Recompute visit streaks / total visits from attendance history.
+Use after imports, backfills or timezone changes:
+    python manage.py rebuild_member_streaks [--gym <uuid>]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from fitness.models import Gym
+from members.streaks import rebuild_streaks
+
+
+class Command(BaseCommand):
+    help = 'Rebuild member visit streaks and totals from MemberAttendance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gym', help='Only rebuild this gym id')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        gym = None
+        if options['gym']:
+            gym = Gym.objects.get(pk=options['gym'])
+
+        started = time.monotonic()
+        updated = rebuild_streaks(gym=gym, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt streaks for {updated} members in {time.monotonic() - started:.2f}s"
+        ))
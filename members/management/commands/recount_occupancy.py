@@ -0,0 +1,27 @@
+"""
+Periodic occupancy self-heal.
+Run from cron / Render cron job every few minutes:
+    python manage.py recount_occupancy
+"""
+from django.core.management.base import BaseCommand
+
+from fitness.models import Gym
+from members.occupancy import recount_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Auto check-out stale sessions and rebuild live occupancy counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gym', help='Only recount this gym id')
+
+    def handle(self, *args, **options):
+        gym = None
+        if options['gym']:
+            gym = Gym.objects.get(pk=options['gym'])
+
+        result = recount_occupancy(gym=gym)
+        self.stdout.write(self.style.SUCCESS(
+            f"Recounted {result['gyms']} gyms: {result['inside']} inside, "
+            f"{result['timed_out']} sessions auto checked-out"
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness', '0001_initial'),
+        ('members', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GymOccupancy',
+            fields=[
+                ('gym', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='occupancy', serialize=False, to='fitness.gym')),
+                ('current_count', models.IntegerField(default=0)),
+                ('recounted_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'gym_occupancy',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='memberattendance',
+            index=models.Index(fields=['gym', 'check_out_time'], name='member_atte_gym_id_6f20aa_idx'),
+        ),
+    ]
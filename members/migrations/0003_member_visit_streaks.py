@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0002_occupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='current_streak',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='last_visit_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='longest_streak',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='total_visits',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,9 +1,11 @@
 """
 Members Models
-Contains Member, MembershipPlan, and Attendance logic.
+Contains Member, MembershipPlan, Attendance and live Occupancy logic.
 """
 from django.db import models
+from django.utils import timezone
 from fitness.models import Gym
+from datetime import date
 import uuid
 
 class MembershipPlan(models.Model):
@@ -51,6 +53,13 @@ class Member(models.Model):
     emergency_contact_phone = models.CharField(max_length=15, blank=True, null=True)
     medical_conditions = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+
+    # Visit streaks (maintained on check-in, see members/streaks.py)
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    total_visits = models.PositiveIntegerField(default=0)
+    last_visit_date = models.DateField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -62,6 +71,23 @@ class Member(models.Model):
     def __str__(self):
         return f"{self.name} ({self.phone})"
 
+    @property
+    def days_remaining(self):
+        return (self.membership_end_date - date.today()).days
+
+    @property
+    def is_expiring_soon(self):
+        return 0 <= self.days_remaining <= 7
+
+    @property
+    def active_streak(self):
+        """Stored streak is only alive if the member came today or yesterday"""
+        if self.last_visit_date is None:
+            return 0
+        if (timezone.localdate() - self.last_visit_date).days > 1:
+            return 0
+        return self.current_streak
+
 class MemberAttendance(models.Model):
     id = models.AutoField(primary_key=True)
     gym = models.ForeignKey(Gym, on_delete=models.CASCADE)
@@ -73,6 +99,27 @@ class MemberAttendance(models.Model):
     class Meta:
         db_table = 'member_attendance'
         ordering = ['-check_in_time']
+        indexes = [
+            # Open sessions lookup (check_out_time IS NULL) for occupancy recount
+            models.Index(fields=['gym', 'check_out_time']),
+        ]
+
+    def __str__(self):
+        return f"{self.member.name} - {self.check_in_time}"
+
+class GymOccupancy(models.Model):
+    """
+    The live occupancy counter (see members/occupancy.py).
+    A shared cache may front it; this row is the source of truth and is
+    re-synced from open attendance sessions by `recount_occupancy`.
+    """
+    gym = models.OneToOneField(Gym, on_delete=models.CASCADE, primary_key=True, related_name='occupancy')
+    current_count = models.IntegerField(default=0)
+    recounted_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'gym_occupancy'
 
     def __str__(self):
-        return f"{self.member.name} - {self.check_in_time}"
\ No newline at end of file
+        return f"{self.gym.name}: {self.current_count} inside"
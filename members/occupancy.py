@@ -0,0 +1,174 @@
+"""
+Live Occupancy Counter
+Per-gym "who is inside right now" count.
+
+GymOccupancy is the source of truth. Check-in / check-out touch one DB
+row, so reads are O(1). `recount_occupancy` (run periodically, in its own
+process) auto checks-out stale sessions and rebuilds every counter from
+open attendance rows, so any drift self-heals.
+
+The cache only fronts the row when it is shared by every process (Redis
+via REDIS_URL). A per-process LocMem cache never sees the recount's
+correction or the other workers' check-ins, so then reads go to the row.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from fitness.models import Gym
+from .models import GymOccupancy, MemberAttendance
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_key(gym_id):
+    return f'occupancy:{gym_id}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'OCCUPANCY_CACHE_TIMEOUT', 300)
+
+
+def _cache_is_shared():
+    # `cache` is a proxy, the backend object lives in caches[...]
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def _stored_count(gym):
+    return GymOccupancy.objects.filter(gym=gym).values_list('current_count', flat=True).first() or 0
+
+
+def get_occupancy(gym):
+    """Current head-count for a gym (shared cache first, DB row on miss / without one)"""
+    if not _cache_is_shared():
+        return max(_stored_count(gym), 0)
+
+    key = _cache_key(gym.pk)
+    count = cache.get(key)
+    if count is None:
+        count = _stored_count(gym)
+        cache.set(key, count, _cache_timeout())
+    return max(count, 0)
+
+
+def adjust_occupancy(gym, delta):
+    """Apply +/- delta to the durable counter and mirror it into the cache after commit"""
+    if not delta:
+        return
+
+    rows = GymOccupancy.objects.filter(gym=gym)
+    if delta < 0:
+        # Never go below zero, recount will fix any missed check-in
+        rows = rows.filter(current_count__gte=-delta)
+
+    # Single UPDATE ... SET count = count + delta (no read-modify-write race)
+    if not rows.update(current_count=F('current_count') + delta):
+        if delta < 0:
+            return
+        GymOccupancy.objects.get_or_create(gym=gym)
+        GymOccupancy.objects.filter(gym=gym).update(current_count=F('current_count') + delta)
+
+    if not _cache_is_shared():
+        return
+
+    def _sync_cache():
+        try:
+            cache.incr(_cache_key(gym.pk), delta)
+        except ValueError:
+            # Key not cached yet, next read loads it from DB
+            pass
+
+    transaction.on_commit(_sync_cache)
+
+
+def check_in(member, notes=''):
+    """
+    Open a new attendance session and bump the counter.
+    Any session the member left open is closed first, so one member
+    is never counted twice.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        closed = MemberAttendance.objects.filter(
+            member=member, check_out_time__isnull=True
+        ).update(check_out_time=now)
+
+        attendance = MemberAttendance.objects.create(
+            member=member,
+            gym=member.gym,
+            notes=notes
+        )
+        adjust_occupancy(member.gym, 1 - closed)
+    return attendance
+
+
+def check_out(member):
+    """Close the member's open session. Returns the attendance row or None if not inside."""
+    attendance = MemberAttendance.objects.filter(
+        member=member, check_out_time__isnull=True
+    ).order_by('-check_in_time').first()
+
+    if attendance is None:
+        return None
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Conditional update: a concurrent check-out can't decrement twice
+        closed = MemberAttendance.objects.filter(
+            pk=attendance.pk, check_out_time__isnull=True
+        ).update(check_out_time=now)
+        if closed:
+            adjust_occupancy(member.gym, -1)
+
+    attendance.refresh_from_db(fields=['check_out_time'])
+    return attendance
+
+
+def recount_occupancy(gym=None, now=None):
+    """
+    Auto check-out sessions older than GYM_SESSION_TIMEOUT_HOURS, then
+    rebuild counters from open sessions with one grouped query.
+    """
+    now = now or timezone.now()
+    timeout = timedelta(hours=getattr(settings, 'GYM_SESSION_TIMEOUT_HOURS', 4))
+
+    sessions = MemberAttendance.objects.all()
+    gyms = Gym.objects.all()
+    if gym is not None:
+        sessions = sessions.filter(gym=gym)
+        gyms = gyms.filter(pk=gym.pk)
+
+    # Stale sessions are closed at check-in + timeout, not "now"
+    timed_out = sessions.filter(
+        check_out_time__isnull=True,
+        check_in_time__lt=now - timeout
+    ).update(check_out_time=F('check_in_time') + timeout)
+
+    open_counts = dict(
+        sessions.filter(check_out_time__isnull=True)
+        .values('gym')
+        .annotate(total=Count('id'))
+        .values_list('gym', 'total')
+    )
+
+    rows = [
+        GymOccupancy(gym_id=gym_id, current_count=open_counts.get(gym_id, 0), recounted_at=now)
+        for gym_id in gyms.values_list('id', flat=True)
+    ]
+    GymOccupancy.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['gym'],
+        update_fields=['current_count', 'recounted_at'],
+    )
+    if _cache_is_shared():
+        cache.set_many({_cache_key(row.gym_id): row.current_count for row in rows}, _cache_timeout())
+
+    logger.info("Occupancy recount: %s gyms, %s sessions timed out", len(rows), timed_out)
+    return {'gyms': len(rows), 'timed_out': timed_out, 'inside': sum(open_counts.values())}
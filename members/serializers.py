@@ -3,6 +3,7 @@ Members Serializers
 Optimized for Flutter Frontend & Crash Prevention
 """
 from rest_framework import serializers
+from django.core.exceptions import ObjectDoesNotExist
 from .models import Member, MemberAttendance, MembershipPlan
 from datetime import date
 
@@ -11,6 +12,12 @@ class MemberSerializer(serializers.ModelSerializer):
     days_remaining = serializers.ReadOnlyField()
     is_expiring_soon = serializers.ReadOnlyField()
     
+    # Streak badges (stored on Member, no attendance scan)
+    current_streak = serializers.ReadOnlyField(source='active_streak')
+    
+    # Payment summary (denormalized MemberLedger, no Payment aggregates)
+    ledger = serializers.SerializerMethodField()
+    
     # Explicitly map 'profile_image' to handle file uploads correctly
     profile_image = serializers.ImageField(required=False, allow_null=True)
 
@@ -24,9 +31,12 @@ class MemberSerializer(serializers.ModelSerializer):
             'join_date', 'membership_start_date', 'membership_end_date',
             'is_active',
             'days_remaining', 'is_expiring_soon',
+            'current_streak', 'longest_streak', 'total_visits', 'last_visit_date',
+            'ledger',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'days_remaining', 'is_expiring_soon']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'days_remaining', 'is_expiring_soon',
+                            'current_streak', 'longest_streak', 'total_visits', 'last_visit_date']
 
     # 🛡️ THE MAGIC FIX (Empty String Handler)
     def to_internal_value(self, data):
@@ -52,6 +62,26 @@ class MemberSerializer(serializers.ModelSerializer):
             
         return super().to_internal_value(data)
 
+    def get_ledger(self, obj):
+        """Reads the select_related MemberLedger row (zeros if member never paid)"""
+        try:
+            ledger = obj.ledger
+        except ObjectDoesNotExist:
+            ledger = None
+        
+        if ledger is None:
+            return {
+                'lifetime_paid': 0.0, 'payment_count': 0, 'last_payment_date': None,
+                'outstanding_amount': 0.0, 'next_due_date': None,
+            }
+        return {
+            'lifetime_paid': float(ledger.lifetime_paid),
+            'payment_count': ledger.payment_count,
+            'last_payment_date': ledger.last_payment_date,
+            'outstanding_amount': float(ledger.outstanding_amount),
+            'next_due_date': ledger.next_due_date,
+        }
+
     def validate(self, data):
         """Check Logic: End Date should be after Start Date"""
         if 'membership_start_date' in data and 'membership_end_date' in data:
@@ -0,0 +1,115 @@
+"""
+Visit Streaks & Milestones
+Streak length, longest streak, total visits and last visit date are kept
+on Member and updated in O(1) per check-in, so the member app never has
+to scan MemberAttendance.
+
+A "visit" is a gym-local calendar day with at least one check-in
+(TIME_ZONE aware), so checking in twice on the same day counts once.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Member, MemberAttendance
+
+VISIT_MILESTONES = (10, 25, 50, 100, 200, 300, 500, 1000)
+
+STREAK_FIELDS = ['current_streak', 'longest_streak', 'total_visits', 'last_visit_date']
+
+
+def record_visit(member, check_in_time):
+    """
+    Apply one check-in to the member's counters.
+    Returns the milestone reached (e.g. 100) or None.
+    """
+    visit_date = timezone.localdate(check_in_time)
+
+    with transaction.atomic():
+        # Lock the row so two parallel check-ins can't both extend the streak
+        locked = Member.objects.select_for_update().only('id', *STREAK_FIELDS).get(pk=member.pk)
+        last = locked.last_visit_date
+
+        if last is not None and visit_date <= last:
+            # Already counted today (or an out-of-order backfill)
+            return None
+
+        if last is not None and visit_date - last == timedelta(days=1):
+            current = locked.current_streak + 1
+        else:
+            current = 1
+
+        values = {
+            'current_streak': current,
+            'longest_streak': max(locked.longest_streak, current),
+            'total_visits': locked.total_visits + 1,
+            'last_visit_date': visit_date,
+        }
+        Member.objects.filter(pk=member.pk).update(**values)
+
+    for field, value in values.items():
+        setattr(member, field, value)
+
+    total = values['total_visits']
+    return total if total in VISIT_MILESTONES else None
+
+
+def rebuild_streaks(gym=None, batch_size=1000):
+    """
+    Recompute streak counters from full attendance history.
+    Streams distinct (member, local day) pairs in order and bulk-updates.
+    Returns number of members updated.
+    """
+    members = Member.objects.all()
+    visits = MemberAttendance.objects.all()
+    if gym is not None:
+        members = members.filter(gym=gym)
+        visits = visits.filter(gym=gym)
+
+    visit_days = (
+        visits.annotate(day=TruncDate('check_in_time', tzinfo=timezone.get_current_timezone()))
+        .values_list('member_id', 'day')
+        .distinct()
+        .order_by('member_id', 'day')
+        .iterator(chunk_size=5000)
+    )
+
+    updated = 0
+    batch = []
+
+    def flush():
+        nonlocal updated
+        Member.objects.bulk_update(batch, STREAK_FIELDS)
+        updated += len(batch)
+        batch.clear()
+
+    with transaction.atomic():
+        # Members with no history at all end up at zero
+        members.update(current_streak=0, longest_streak=0, total_visits=0, last_visit_date=None)
+
+        row = None
+        for member_id, day in visit_days:
+            if row is None or row.pk != member_id:
+                if row is not None:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        flush()
+                row = Member(pk=member_id, current_streak=0, longest_streak=0, total_visits=0)
+                row.last_visit_date = None
+
+            if row.last_visit_date is not None and day - row.last_visit_date == timedelta(days=1):
+                row.current_streak += 1
+            else:
+                row.current_streak = 1
+            row.longest_streak = max(row.longest_streak, row.current_streak)
+            row.total_visits += 1
+            row.last_visit_date = day
+
+        if row is not None:
+            batch.append(row)
+        if batch:
+            flush()
+
+    return updated
@@ -1,3 +1,154 @@
-from django.test import TestCase
+"""
+Members Tests
+"""
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from fitness.testing import create_gym, create_member
+from .analytics import attendance_queryset, member_attendance_analytics
+from .models import GymOccupancy, Member, MemberAttendance
+from .occupancy import check_in, check_out, get_occupancy, recount_occupancy
+from .streaks import STREAK_FIELDS, rebuild_streaks, record_visit
+
+
+class OccupancyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.gym = create_gym()
+        self.members = [create_member(self.gym, index) for index in range(3)]
+
+    def test_check_in_and_out_keep_the_count(self):
+        for member in self.members:
+            check_in(member)
+        check_in(self.members[0])  # already inside, counted once
+        check_out(self.members[1])
+
+        self.assertEqual(get_occupancy(self.gym), 2)
+
+    def test_recount_from_another_process_is_seen_without_a_shared_cache(self):
+        check_in(self.members[0])
+        get_occupancy(self.gym)
+        # A web worker's LocMem copy that the recount process can't reach
+        cache.set(f'occupancy:{self.gym.pk}', 40)
+        GymOccupancy.objects.filter(gym=self.gym).update(current_count=7)
+
+        self.assertEqual(get_occupancy(self.gym), 7)
+        recount_occupancy(self.gym)
+        self.assertEqual(get_occupancy(self.gym), 1)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_shared_cache_falls_back_to_the_row(self):
+        check_in(self.members[0])
+
+        self.assertEqual(get_occupancy(self.gym), 1)
+
+
+class AttendanceAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.gym = create_gym()
+        self.now = timezone.make_aware(datetime(2025, 3, 20, 18, 0))
+
+    def visit(self, member, days_ago, minutes=None):
+        check_in = self.now - timedelta(days=days_ago)
+        attendance = MemberAttendance.objects.create(member=member, gym=self.gym)
+        MemberAttendance.objects.filter(pk=attendance.pk).update(
+            check_in_time=check_in,
+            check_out_time=check_in + timedelta(minutes=minutes) if minutes is not None else None,
+        )
+
+    def member(self, index, days_left=30):
+        return create_member(self.gym, index, membership_end_date=self.now.date() + timedelta(days=days_left))
+
+    def test_visit_stats_with_open_and_closed_sessions(self):
+        member = self.member(0)
+        self.visit(member, 40, minutes=30)  # outside the 30-day window
+        self.visit(member, 10, minutes=60)
+        self.visit(member, 2, minutes=90)
+        self.visit(member, 0)  # still inside: no length yet
+
+        row = attendance_queryset(self.gym, now=self.now).get()
+
+        self.assertEqual(row.last_visit, self.now)
+        self.assertEqual(row.visits_30d, 3)
+        self.assertEqual(row.avg_session, timedelta(minutes=60))
+
+    def test_at_risk_is_active_members_who_stopped_coming(self):
+        never, lapsed, recent = self.member(0), self.member(1), self.member(2)
+        expired = self.member(3, days_left=-1)
+        self.visit(lapsed, 20, minutes=45)
+        self.visit(recent, 3, minutes=45)
+
+        at_risk = attendance_queryset(self.gym, at_risk_days=14, now=self.now)
+
+        self.assertEqual([member.pk for member in at_risk], [never.pk, lapsed.pk])  # never-visited first
+        self.assertNotIn(expired.pk, [member.pk for member in at_risk])
+
+    def test_cached_rows_are_rebuilt_after_local_midnight(self):
+        member = self.member(0)
+        late = timezone.make_aware(datetime(2025, 3, 20, 23, 30))
+        with mock.patch('members.analytics.timezone.now', return_value=late):
+            first = member_attendance_analytics(self.gym)
+        self.visit(member, 0, minutes=30)
+
+        with mock.patch('members.analytics.timezone.now', return_value=late + timedelta(minutes=15)):
+            self.assertEqual(member_attendance_analytics(self.gym), first)  # same day: cached
+        with mock.patch('members.analytics.timezone.now', return_value=late + timedelta(hours=1)):
+            rows = member_attendance_analytics(self.gym)
+
+        self.assertEqual((first[0]['visits_30d'], rows[0]['visits_30d']), (0, 1))
+        self.assertEqual(rows[0]['avg_session_minutes'], 30.0)
+
+
+class StreakTests(TestCase):
+    def setUp(self):
+        self.gym = create_gym()
+        self.member = create_member(self.gym)
+
+    def check_in_at(self, *when):
+        """Attendance row + incremental update, like the check-in view"""
+        check_in_time = timezone.make_aware(datetime(*when))
+        attendance = MemberAttendance.objects.create(member=self.member, gym=self.gym)
+        MemberAttendance.objects.filter(pk=attendance.pk).update(check_in_time=check_in_time)
+        return record_visit(self.member, check_in_time)
+
+    def counters(self):
+        return tuple(Member.objects.values_list(*STREAK_FIELDS).get(pk=self.member.pk))
+
+    def assert_rebuild_matches(self):
+        incremental = self.counters()
+        rebuild_streaks(self.gym)
+        self.assertEqual(self.counters(), incremental)
+
+    def test_consecutive_days_extend_the_streak(self):
+        for day in (1, 2, 3):
+            self.check_in_at(2025, 3, day, 7, 0)
+
+        self.assertEqual(self.counters(), (3, 3, 3, datetime(2025, 3, 3).date()))
+        self.assert_rebuild_matches()
+
+    def test_gap_resets_current_but_keeps_longest(self):
+        for day in (1, 2, 3, 6, 7):
+            self.check_in_at(2025, 3, day, 7, 0)
+
+        self.assertEqual(self.counters()[:3], (2, 3, 5))
+        self.assert_rebuild_matches()
+
+    def test_second_check_in_same_day_counts_once(self):
+        self.check_in_at(2025, 3, 1, 7, 0)
+        self.assertIsNone(self.check_in_at(2025, 3, 1, 19, 0))
+
+        self.assertEqual(self.counters()[:3], (1, 1, 1))
+        self.assert_rebuild_matches()
+
+    def test_days_are_bucketed_in_local_time(self):
+        # 23:30 and 00:30 IST are the same UTC day but two gym days
+        self.check_in_at(2025, 3, 1, 23, 30)
+        self.check_in_at(2025, 3, 2, 0, 30)
+
+        self.assertEqual(self.counters(), (2, 2, 2, datetime(2025, 3, 2).date()))
+        self.assert_rebuild_matches()
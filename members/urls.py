@@ -1,8 +1,8 @@
 from django.urls import path
 from .views import (
-    MemberListCreateView, MemberDetailView, MemberCheckInView,
-    MemberAttendanceListView, ExpiringMembersView, ExpiredMembersView,
-    MembershipPlanListCreateView, MembershipPlanDetailView, MemberStatsView,
+    MemberListCreateView, MemberDetailView, MemberCheckInView, MemberCheckOutView,
+    MemberAttendanceListView, MemberAttendanceAnalyticsView, ExpiringMembersView, ExpiredMembersView,
+    MembershipPlanListCreateView, MembershipPlanDetailView, MemberStatsView, OccupancyView,
     check_member_status # 👈 YE IMPORT ZAROORI HAI
 )
 
@@ -13,12 +13,15 @@ urlpatterns = [
     path('', MemberListCreateView.as_view(), name='member-list'),
     path('<int:pk>/', MemberDetailView.as_view(), name='member-detail'),
     path('<int:pk>/check-in/', MemberCheckInView.as_view(), name='check-in'),
+    path('<int:pk>/check-out/', MemberCheckOutView.as_view(), name='check-out'),
+    path('occupancy/', OccupancyView.as_view(), name='occupancy'),
     
     path('expiring/', ExpiringMembersView.as_view(), name='expiring'),
     path('expired/', ExpiredMembersView.as_view(), name='expired'),
     path('stats/', MemberStatsView.as_view(), name='stats'),
     
     path('attendance/list/', MemberAttendanceListView.as_view(), name='attendance-list'),
+    path('attendance/analytics/', MemberAttendanceAnalyticsView.as_view(), name='attendance-analytics'),
     path('plans/', MembershipPlanListCreateView.as_view(), name='plan-list'),
     path('plans/<int:pk>/', MembershipPlanDetailView.as_view(), name='plan-detail'),
     
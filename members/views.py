@@ -9,8 +9,9 @@ from rest_framework.permissions import IsAuthenticated, AllowAny # ✅ AllowAny
 from rest_framework.decorators import api_view, permission_classes # ✅ Decorators zaroori hain
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser 
-from django.db import IntegrityError 
+from django.db import IntegrityError, transaction
 from django.db.models import Q
+from django.utils import timezone
 from datetime import date, timedelta
 
 from .models import Member, MemberAttendance, MembershipPlan
@@ -19,6 +20,8 @@ from .serializers import (
     MemberAttendanceSerializer, MembershipPlanSerializer
 )
 from fitness.models import ActivityLog
+from . import occupancy, streaks
+from .analytics import member_attendance_analytics, DEFAULT_AT_RISK_DAYS
 
 # ==========================================
 # 1. MEMBER MANAGEMENT (ADMIN ONLY)
@@ -90,7 +93,8 @@ class MemberDetailView(generics.RetrieveUpdateDestroyAPIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
     
     def get_queryset(self):
-        return Member.objects.filter(gym=self.request.user.gym)
+        # Ledger joined in, so the detail screen needs no payment aggregates
+        return Member.objects.filter(gym=self.request.user.gym).select_related('ledger')
     
     def update(self, request, *args, **kwargs):
         try:
@@ -118,22 +122,54 @@ class MemberDetailView(generics.RetrieveUpdateDestroyAPIView):
 # ==========================================
 
 class MemberCheckInView(APIView):
-    """Record member check-in"""
+    """Record member check-in (also bumps live occupancy & visit streak)"""
     permission_classes = [IsAuthenticated]
     
     def post(self, request, pk):
         try:
-            member = Member.objects.get(pk=pk, gym=request.user.gym)
-            attendance = MemberAttendance.objects.create(
-                member=member,
-                gym=request.user.gym,
-                notes=request.data.get('notes', '')
-            )
-            serializer = MemberAttendanceSerializer(attendance)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            member = Member.objects.select_related('gym').get(pk=pk, gym=request.user.gym)
+            with transaction.atomic():
+                attendance = occupancy.check_in(member, notes=request.data.get('notes', ''))
+                milestone = streaks.record_visit(member, attendance.check_in_time)
+            
+            data = MemberAttendanceSerializer(attendance).data
+            data.update({
+                'current_streak': member.current_streak,
+                'longest_streak': member.longest_streak,
+                'total_visits': member.total_visits,
+                'milestone': milestone,
+            })
+            return Response(data, status=status.HTTP_201_CREATED)
         except Member.DoesNotExist:
             return Response({'error': 'Member not found'}, status=status.HTTP_404_NOT_FOUND)
 
+class MemberCheckOutView(APIView):
+    """Record member check-out (closes the open session)"""
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, pk):
+        try:
+            member = Member.objects.select_related('gym').get(pk=pk, gym=request.user.gym)
+        except Member.DoesNotExist:
+            return Response({'error': 'Member not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        attendance = occupancy.check_out(member)
+        if attendance is None:
+            return Response({'error': 'Member is not checked in'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = MemberAttendanceSerializer(attendance)
+        return Response(serializer.data)
+
+class OccupancyView(APIView):
+    """Live head-count of members currently inside the gym"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        return Response({
+            'current_occupancy': occupancy.get_occupancy(request.user.gym),
+            'as_of': timezone.now(),
+        })
+
 class MemberAttendanceListView(generics.ListAPIView):
     serializer_class = MemberAttendanceSerializer
     permission_classes = [IsAuthenticated]
@@ -150,6 +186,30 @@ class MemberAttendanceListView(generics.ListAPIView):
         
         return queryset.order_by('-check_in_time')
 
+class MemberAttendanceAnalyticsView(APIView):
+    """
+    Per-member last visit, visits in last 30 days & avg session length.
+    ?at_risk=true&days=14 -> active members with no visit in N days.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        at_risk_days = None
+        if request.query_params.get('at_risk') in ('1', 'true', 'True'):
+            try:
+                at_risk_days = int(request.query_params.get('days', DEFAULT_AT_RISK_DAYS))
+            except ValueError:
+                return Response({'error': 'days must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+            if at_risk_days < 1:
+                return Response({'error': 'days must be at least 1'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        rows = member_attendance_analytics(request.user.gym, at_risk_days=at_risk_days)
+        return Response({
+            'at_risk_days': at_risk_days,
+            'count': len(rows),
+            'members': rows,
+        })
+
 class ExpiringMembersView(generics.ListAPIView):
     serializer_class = MemberListSerializer
     permission_classes = [IsAuthenticated]
@@ -235,7 +295,7 @@ def check_member_status(request):
     
     try:
         # Phone se search karo
-        member = Member.objects.filter(phone=phone).first()
+        member = Member.objects.filter(phone=phone).select_related('ledger').first()
         
         if member:
             # Pura data bhejo dashboard ke liye
@@ -2,7 +2,7 @@
 Payments Admin
 """
 from django.contrib import admin
-from .models import Payment, Receipt
+from .models import Payment, Receipt, MemberLedger
 
 
 @admin.register(Payment)
@@ -19,4 +19,11 @@ class ReceiptAdmin(admin.ModelAdmin):
     list_display = ['receipt_number', 'member', 'sent_via_whatsapp', 'created_at']
     list_filter = ['sent_via_whatsapp', 'gym', 'created_at']
     search_fields = ['receipt_number', 'member__name']
-    date_hierarchy = 'created_at'
\ No newline at end of file
+    date_hierarchy = 'created_at'
+
+@admin.register(MemberLedger)
+class MemberLedgerAdmin(admin.ModelAdmin):
+    list_display = ['member', 'gym', 'lifetime_paid', 'outstanding_amount', 'last_payment_date', 'next_due_date']
+    list_filter = ['gym']
+    search_fields = ['member__name', 'member__phone']
+    readonly_fields = ['updated_at']
@@ -0,0 +1,175 @@
+"""
+Batch Receipts
+Month-end printing: every receipt in a date range (or a list of payments)
+as one merged PDF or a ZIP of individual PDFs.
+
+  1. One query for the payments (+ member, gym, existing receipt)
+  2. Missing receipts get their numbers from ONE ReceiptSequence
+     reservation and are inserted with bulk_create (ignore_conflicts:
+     a concurrent generate-receipt / batch call may create some first)
+  3. Pages are rendered from plain context dicts across a process pool
+     (reportlab is pure CPU, threads would just fight over the GIL) with
+     the RECEIPT_RENDER_MODE engine, and merged with pypdf
+  4. Output goes to a spooled temp file that the view streams back
+"""
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.db import transaction
+from pypdf import PdfWriter
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from .models import Payment, Receipt
+from .utils import draw_receipt, receipt_context, render_receipt_bytes
+
+BATCH_FORMATS = ('pdf', 'zip')
+MAX_BATCH_RECEIPTS = 2000
+
+# Below this many receipts a process pool costs more than it saves
+MIN_PARALLEL_BATCH = 40
+
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def batch_payments(gym, payment_ids=None, start_date=None, end_date=None):
+    """Payments for a batch, with everything the receipt needs in the same query"""
+    payments = Payment.objects.filter(gym=gym).select_related('member', 'gym', 'receipt')
+    if payment_ids:
+        payments = payments.filter(pk__in=payment_ids)
+    if start_date:
+        payments = payments.filter(payment_date__gte=start_date)
+    if end_date:
+        payments = payments.filter(payment_date__lte=end_date)
+    return payments.order_by('payment_date', 'created_at')
+
+
+def ensure_receipts(gym, payments):
+    """
+    Receipt for every payment, creating missing ones in bulk.
+    Returns (receipts in payment order, number created).
+    """
+    receipts = {}
+    missing = []
+    for payment in payments:
+        try:
+            receipts[payment.pk] = payment.receipt
+        except Receipt.DoesNotExist:
+            missing.append(payment)
+
+    created = 0
+    if missing:
+        with transaction.atomic():
+            numbers = Receipt.generate_receipt_numbers(gym, len(missing))
+            candidates = Receipt.objects.bulk_create([
+                Receipt(payment=payment, gym=gym, member=payment.member, receipt_number=number)
+                for payment, number in zip(missing, numbers)
+            ], ignore_conflicts=True)
+        # Whoever won the OneToOne race: ours, or the concurrent caller's receipt
+        # (ignore_conflicts leaves pk unset; our reserved numbers identify our rows)
+        ours = {receipt.receipt_number for receipt in candidates}
+        for receipt in Receipt.objects.filter(payment__in=missing):
+            receipts[receipt.payment_id] = receipt
+            created += receipt.receipt_number in ours
+        # No background render: these PDFs are rendered in this request anyway; the
+        # per-receipt file is made on first download / WhatsApp send (pdf_status PENDING)
+
+    ordered = []
+    for payment in payments:
+        receipt = receipts[payment.pk]
+        # Reuse the already-loaded objects, no per-receipt lazy loads
+        receipt.payment = payment
+        receipt.member = payment.member
+        receipt.gym = payment.gym
+        ordered.append(receipt)
+    return ordered, created
+
+
+# ==============================================
+# 🖨️ RENDERING (worker functions must stay picklable / module-level)
+# ==============================================
+
+def _render_one(args):
+    ctx, mode = args
+    return render_receipt_bytes(ctx, mode=mode)
+
+
+def _render_pages(contexts):
+    """Several receipts as pages of one PDF (canvas engine)"""
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    for ctx in contexts:
+        draw_receipt(c, ctx)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _worker_count(total):
+    if total < MIN_PARALLEL_BATCH:
+        return 0
+    configured = getattr(settings, 'RECEIPT_BATCH_WORKERS', None) or os.cpu_count() or 1
+    return min(configured, max(1, total // MIN_PARALLEL_BATCH))
+
+
+def _chunks(items, parts):
+    size = -(-len(items) // parts)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def render_zip(contexts, output, mode=None):
+    mode = mode or getattr(settings, 'RECEIPT_RENDER_MODE', 'platypus')
+    workers = _worker_count(len(contexts))
+    jobs = [(ctx, mode) for ctx in contexts]
+
+    # Already-compressed PDF streams, deflating them again is wasted CPU
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pdfs = pool.map(_render_one, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+                for ctx, pdf in zip(contexts, pdfs):
+                    archive.writestr(f"receipt_{ctx['receipt_number']}.pdf", pdf)
+        else:
+            for ctx, job in zip(contexts, jobs):
+                archive.writestr(f"receipt_{ctx['receipt_number']}.pdf", _render_one(job))
+
+
+def render_merged_pdf(contexts, output, mode=None):
+    mode = mode or getattr(settings, 'RECEIPT_RENDER_MODE', 'platypus')
+    workers = _worker_count(len(contexts))
+
+    if mode == 'canvas':
+        # One canvas per worker, pages drawn straight onto it
+        if workers <= 1:
+            output.write(_render_pages(contexts))
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_render_pages, _chunks(contexts, workers)))
+    else:
+        jobs = [(ctx, mode) for ctx in contexts]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(_render_one, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+        else:
+            parts = [_render_one(job) for job in jobs]
+
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(BytesIO(part))
+    writer.write(output)
+
+
+def build_receipt_batch(receipts, fmt='pdf'):
+    """Render receipts into a spooled temp file (rewound), ready to stream"""
+    contexts = [receipt_context(receipt) for receipt in receipts]
+    output = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    if fmt == 'zip':
+        render_zip(contexts, output)
+    else:
+        render_merged_pdf(contexts, output)
+    output.seek(0)
+    return output
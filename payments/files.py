@@ -0,0 +1,123 @@
+"""
+Receipt File Serving
+Streams stored receipt PDFs with cache validators.
+
+  - ETag = receipt content hash -> 304 when the client already has it
+  - Range requests -> 206 partial content (resumable downloads on bad networks)
+  - RECEIPT_SERVE_MODE = 'accel' / 'sendfile' hands the file to nginx /
+    Apache (X-Accel-Redirect / X-Sendfile) after the auth check, so no
+    Django worker is tied up pushing bytes
+"""
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def receipt_etag(receipt):
+    if receipt.content_hash:
+        return f'"{receipt.content_hash}"'
+    if receipt.pdf_rendered_at:
+        return f'"{int(receipt.pdf_rendered_at.timestamp())}"'
+    return None
+
+
+def _etag_matches(header, etag):
+    if not header or not etag:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in [tag.strip().removeprefix('W/') for tag in header.split(',')]
+
+
+def _parse_range(header, size):
+    """(start, end) inclusive for a single 'bytes=' range, None if unusable, False if unsatisfiable"""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None  # multi-range / garbage -> ignore, send the whole file
+    first, last = match.groups()
+    if first == '':
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _iter_range(handle, start, length):
+    try:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
+
+
+def _common_headers(response, receipt, etag):
+    if etag:
+        response['ETag'] = etag
+    if receipt.pdf_rendered_at:
+        response['Last-Modified'] = http_date(receipt.pdf_rendered_at.timestamp())
+    # Per-user data: browsers may cache, shared proxies may not
+    response['Cache-Control'] = 'private, max-age=3600'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_receipt_file(request, receipt):
+    """HttpResponse for receipt.receipt_pdf (caller has already checked access)"""
+    etag = receipt_etag(receipt)
+    filename = f"receipt_{receipt.receipt_number}.pdf"
+
+    if _etag_matches(request.headers.get('If-None-Match'), etag):
+        return _common_headers(HttpResponse(status=304), receipt, etag)
+
+    pdf = receipt.receipt_pdf
+    mode = getattr(settings, 'RECEIPT_SERVE_MODE', 'django')
+
+    if mode in ('accel', 'sendfile'):
+        response = HttpResponse(content_type='application/pdf')
+        if mode == 'accel':
+            prefix = getattr(settings, 'RECEIPT_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + pdf.name
+        else:
+            response['X-Sendfile'] = pdf.path
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+        return _common_headers(response, receipt, etag)
+
+    size = pdf.size
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return _common_headers(response, receipt, etag)
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _iter_range(pdf.open('rb'), start, length),
+                status=206,
+                content_type='application/pdf'
+            )
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Disposition'] = f'inline; filename="{filename}"'
+            return _common_headers(response, receipt, etag)
+
+    response = FileResponse(pdf.open('rb'), content_type='application/pdf', filename=filename)
+    return _common_headers(response, receipt, etag)
@@ -0,0 +1,86 @@
+"""
+Member Ledger
+Keeps MemberLedger rows in sync with Payment writes.
+
+Every write path (create / edit / delete / renewal / batch) calls
+refresh_member_ledgers() inside its transaction; it recomputes the
+touched members with ONE grouped query and upserts the rows, so member
+screens read a single joined row instead of summing payments.
+
+The member rows are locked (SELECT ... FOR UPDATE, in pk order) before
+the aggregate is read. Two concurrent payments for one member then
+refresh one after the other, and the second one's aggregate, read after
+the first has committed, includes both payments. Without the lock the
+last upsert wins and one payment is missing from the ledger.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Max, Q, Sum
+
+from members.models import Member
+from .models import MemberLedger, Payment
+
+LEDGER_FIELDS = [
+    'lifetime_paid', 'payment_count', 'last_payment_date',
+    'outstanding_amount', 'next_due_date',
+]
+
+
+def _next_month(day):
+    if day.month == 12:
+        return day.replace(year=day.year + 1, month=1, day=1)
+    return day.replace(month=day.month + 1, day=1)
+
+
+def compute_ledgers(payments):
+    """{member_id: {gym_id, **LEDGER_FIELDS}} for a Payment queryset, one grouped query"""
+    paid = Q(status='PAID')
+    rows = (
+        payments.order_by()
+        .values('member_id', 'gym_id')
+        .annotate(
+            lifetime_paid=Sum('amount', filter=paid),
+            payment_count=Count('id', filter=paid),
+            last_payment_date=Max('payment_date', filter=paid),
+            outstanding_amount=Sum('amount', filter=Q(status='PENDING')),
+            last_period=Max('billing_period', filter=paid),
+        )
+    )
+
+    ledgers = {}
+    for row in rows:
+        ledgers[row['member_id']] = {
+            'gym_id': row['gym_id'],
+            'lifetime_paid': row['lifetime_paid'] or Decimal('0'),
+            'payment_count': row['payment_count'],
+            'last_payment_date': row['last_payment_date'],
+            'outstanding_amount': row['outstanding_amount'] or Decimal('0'),
+            'next_due_date': _next_month(row['last_period']) if row['last_period'] else None,
+        }
+    return ledgers
+
+
+def refresh_member_ledgers(member_ids):
+    """Recompute and upsert ledgers for the given members. Call inside the write transaction."""
+    member_ids = {member_id for member_id in member_ids if member_id is not None}
+    if not member_ids:
+        return
+
+    # 🛡️ Serialize ledger refreshes per member (pk order: no lock-order deadlocks between batches)
+    list(Member.objects.select_for_update().filter(pk__in=member_ids).order_by('pk').values_list('pk', flat=True))
+
+    ledgers = compute_ledgers(Payment.objects.filter(member_id__in=member_ids))
+
+    # Members whose last payment was deleted fall back to an empty ledger
+    empty = {
+        'lifetime_paid': Decimal('0'), 'payment_count': 0, 'last_payment_date': None,
+        'outstanding_amount': Decimal('0'), 'next_due_date': None,
+    }
+    MemberLedger.objects.filter(member_id__in=member_ids - ledgers.keys()).update(**empty)
+
+    MemberLedger.objects.bulk_create(
+        [MemberLedger(member_id=member_id, **values) for member_id, values in ledgers.items()],
+        update_conflicts=True,
+        unique_fields=['member'],
+        update_fields=LEDGER_FIELDS + ['updated_at'],
+    )
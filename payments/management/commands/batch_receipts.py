@@ -0,0 +1,55 @@
+"""
+Month-end receipt printing from the shell.
+    python manage.py batch_receipts --gym <id> --from 2026-10-01 --to 2026-10-31 -o october.pdf
+    python manage.py batch_receipts --gym <id> --payment <uuid> --payment <uuid> --format zip -o out.zip
+"""
+import shutil
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fitness.models import Gym
+from payments.batch_receipts import BATCH_FORMATS, batch_payments, build_receipt_batch, ensure_receipts
+
+
+class Command(BaseCommand):
+    help = 'Render receipts for a date range or payment ids into one PDF or a ZIP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gym', required=True, help='Gym id')
+        parser.add_argument('--from', dest='start_date', type=date.fromisoformat)
+        parser.add_argument('--to', dest='end_date', type=date.fromisoformat)
+        parser.add_argument('--payment', dest='payment_ids', action='append', help='Payment id (repeatable)')
+        parser.add_argument('--format', choices=BATCH_FORMATS, default='pdf')
+        parser.add_argument('-o', '--output', required=True)
+
+    def handle(self, *args, **options):
+        if not options['payment_ids'] and not (options['start_date'] and options['end_date']):
+            raise CommandError('Give --payment ids or both --from and --to')
+        try:
+            gym = Gym.objects.get(pk=options['gym'])
+        except Gym.DoesNotExist:
+            raise CommandError(f"Gym {options['gym']} not found")
+
+        started = time.perf_counter()
+        payments = list(batch_payments(
+            gym,
+            payment_ids=options['payment_ids'],
+            start_date=options['start_date'],
+            end_date=options['end_date'],
+        ))
+        if not payments:
+            raise CommandError('No payments found')
+
+        receipts, created = ensure_receipts(gym, payments)
+        output = build_receipt_batch(receipts, fmt=options['format'])
+        with open(options['output'], 'wb') as target:
+            shutil.copyfileobj(output, target)
+        output.close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(receipts)} receipts ({created} new) -> {options['output']} "
+            f"in {elapsed:.2f}s ({len(receipts) / elapsed:.0f}/s)"
+        ))
@@ -0,0 +1,71 @@
+"""
+Receipt renderer benchmark.
+    python manage.py benchmark_receipts [--count 500] [--mode platypus|canvas|all]
+
+Uses unsaved model instances, so it needs no data and writes nothing.
+Throughput and peak memory are measured in separate passes
+(tracemalloc slows rendering down noticeably).
+"""
+import time
+import tracemalloc
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from fitness.models import Gym
+from members.models import Member
+from payments.models import Payment, Receipt
+from payments.utils import RENDER_MODES, generate_receipt_pdf
+
+
+def _sample_receipt():
+    gym = Gym(
+        name='Iron Temple Fitness', address='12 MG Road, Near City Mall',
+        city='Pune', state='Maharashtra', pincode='411001',
+        phone='9999999999', email='frontdesk@irontemple.in'
+    )
+    member = Member(gym=gym, name='Ravi Kumar', phone='9876543210')
+    payment = Payment(
+        gym=gym, member=member, amount='1500.00', payment_method='UPI',
+        payment_date=date.today(), month='October 2026', status='PAID',
+        transaction_id='UTR4029381123'
+    )
+    return Receipt(
+        gym=gym, member=member, payment=payment,
+        receipt_number='REC-BENCH-0001', created_at=timezone.now()
+    )
+
+
+class Command(BaseCommand):
+    help = 'Benchmark receipt PDF rendering (receipts/sec, peak memory)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500)
+        parser.add_argument('--mode', choices=RENDER_MODES + ('all',), default='all')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        modes = RENDER_MODES if options['mode'] == 'all' else (options['mode'],)
+        receipt = _sample_receipt()
+
+        self.stdout.write(f"{'mode':<10}{'receipts/s':>12}{'ms/receipt':>12}{'peak KiB':>10}{'PDF bytes':>11}")
+        for mode in modes:
+            # Warm-up: first call pays for font / style setup
+            size = len(generate_receipt_pdf(receipt, mode=mode).read())
+
+            started = time.perf_counter()
+            for _ in range(count):
+                generate_receipt_pdf(receipt, mode=mode)
+            elapsed = time.perf_counter() - started
+
+            tracemalloc.start()
+            for _ in range(min(count, 50)):
+                generate_receipt_pdf(receipt, mode=mode)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            self.stdout.write(
+                f"{mode:<10}{count / elapsed:>12.1f}{elapsed * 1000 / count:>12.2f}"
+                f"{peak / 1024:>10.0f}{size:>11}"
+            )
@@ -0,0 +1,49 @@
+"""
+Delete receipt PDFs in storage that no Receipt row points to
+(left behind by the old always-re-render behaviour).
+    python manage.py cleanup_receipt_files [--dry-run] [--grace-minutes 60]
+
+Files younger than the grace period are kept: render_receipt writes the
+file before its row update commits, so a fresh file may simply not be
+referenced *yet*.
+"""
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments.models import Receipt
+
+RECEIPT_DIR = 'receipts'
+
+
+class Command(BaseCommand):
+    help = 'Remove orphaned receipt PDF files from media storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--grace-minutes', type=int, default=60, help='Keep files modified more recently')
+
+    def handle(self, *args, **options):
+        if not default_storage.exists(RECEIPT_DIR):
+            self.stdout.write("No receipt files")
+            return
+
+        referenced = set(
+            Receipt.objects.exclude(receipt_pdf='').exclude(receipt_pdf__isnull=True)
+            .values_list('receipt_pdf', flat=True)
+        )
+        _, files = default_storage.listdir(RECEIPT_DIR)
+
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        orphans = [
+            path for path in (f"{RECEIPT_DIR}/{name}" for name in files)
+            if path not in referenced and default_storage.get_modified_time(path) < cutoff
+        ]
+        if not options['dry_run']:
+            for name in orphans:
+                default_storage.delete(name)
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(orphans)} orphaned file(s), kept {len(files) - len(orphans)}"))
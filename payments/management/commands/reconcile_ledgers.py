@@ -0,0 +1,52 @@
+"""
+Verify MemberLedger rows against the Payment table.
+    python manage.py reconcile_ledgers          # report drift
+    python manage.py reconcile_ledgers --fix    # rewrite drifted rows
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from payments.ledger import LEDGER_FIELDS, compute_ledgers, refresh_member_ledgers
+from payments.models import MemberLedger, Payment
+
+
+class Command(BaseCommand):
+    help = 'Compare member ledgers with payment aggregates and optionally fix drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gym', help='Only check this gym id')
+        parser.add_argument('--fix', action='store_true', help='Rewrite ledgers that drifted')
+
+    def handle(self, *args, **options):
+        payments = Payment.objects.all()
+        ledgers = MemberLedger.objects.all()
+        if options['gym']:
+            payments = payments.filter(gym_id=options['gym'])
+            ledgers = ledgers.filter(gym_id=options['gym'])
+
+        expected = compute_ledgers(payments)
+        stored = {row['member_id']: row for row in ledgers.values('member_id', *LEDGER_FIELDS)}
+
+        drifted = []
+        for member_id in expected.keys() | stored.keys():
+            want = expected.get(member_id)
+            have = stored.get(member_id)
+            if want is None:
+                # Ledger exists but member has no payments: must be all zeros
+                if have['payment_count'] or have['lifetime_paid'] or have['outstanding_amount']:
+                    drifted.append(member_id)
+                continue
+            if have is None or any(have[field] != want[field] for field in LEDGER_FIELDS):
+                drifted.append(member_id)
+
+        for member_id in drifted[:50]:
+            self.stdout.write(f"  drift: member {member_id} stored={stored.get(member_id)} expected={expected.get(member_id)}")
+
+        if drifted and options['fix']:
+            with transaction.atomic():
+                refresh_member_ledgers(drifted)
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(drifted)} ledgers"))
+        elif drifted:
+            self.stdout.write(self.style.WARNING(f"{len(drifted)} ledgers out of sync (run with --fix)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"All {len(expected)} ledgers in sync"))
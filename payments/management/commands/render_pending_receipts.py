@@ -0,0 +1,44 @@
+"""
+Sweep receipts whose background render never finished
+(e.g. web worker restarted with jobs still queued). Runs as a Render cron.
+    python manage.py render_pending_receipts [--retry-failed] [--stuck] [--stuck-minutes 15]
+
+--stuck only takes over RENDERING rows claimed more than --stuck-minutes
+ago; younger ones may still be rendering in a live worker.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments.models import Receipt
+from payments.tasks import render_receipt
+
+
+class Command(BaseCommand):
+    help = 'Render receipt PDFs still PENDING (optionally FAILED / stuck RENDERING)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry FAILED renders')
+        parser.add_argument('--stuck', action='store_true', help='Also take over stale RENDERING receipts')
+        parser.add_argument('--stuck-minutes', type=int, default=15, help='RENDERING for longer than this is stuck')
+        parser.add_argument('--limit', type=int, default=500)
+
+    def handle(self, *args, **options):
+        statuses = ['PENDING']
+        if options['retry_failed']:
+            statuses.append('FAILED')
+        if options['stuck']:
+            cutoff = timezone.now() - timedelta(minutes=options['stuck_minutes'])
+            Receipt.objects.filter(pdf_status='RENDERING', updated_at__lt=cutoff).update(
+                pdf_status='PENDING', updated_at=timezone.now()
+            )
+
+        receipt_ids = list(
+            Receipt.objects.filter(pdf_status__in=statuses)
+            .order_by('created_at')
+            .values_list('pk', flat=True)[:options['limit']]
+        )
+
+        rendered = sum(1 for receipt_id in receipt_ids if render_receipt(receipt_id))
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered}/{len(receipt_ids)} receipts"))
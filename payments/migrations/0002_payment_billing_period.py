@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:39
+
+from datetime import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+
+MONTH_FORMATS = ('%B %Y', '%b %Y', '%Y-%m', '%m-%Y', '%m/%Y')
+
+
+def parse_month(value):
+    if not value:
+        return None
+    for fmt in MONTH_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date().replace(day=1)
+        except ValueError:
+            continue
+    return None
+
+
+def backfill_billing_period(apps, schema_editor):
+    """Free-text `month` -> billing_period, falling back to the payment date's month"""
+    Payment = apps.get_model('payments', 'Payment')
+    batch = []
+    for payment in Payment.objects.only('id', 'month', 'payment_date').iterator(chunk_size=2000):
+        payment.billing_period = parse_month(payment.month) or payment.payment_date.replace(day=1)
+        batch.append(payment)
+        if len(batch) >= 2000:
+            Payment.objects.bulk_update(batch, ['billing_period'])
+            batch = []
+    if batch:
+        Payment.objects.bulk_update(batch, ['billing_period'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness', '0001_initial'),
+        ('members', '0003_member_visit_streaks'),
+        ('payments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='billing_period',
+            field=models.DateField(blank=True, help_text='First day of the billed month', null=True),
+        ),
+        migrations.RunPython(backfill_billing_period, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['gym', 'billing_period', 'status'], name='payments_gym_id_bc99f7_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+
+
+def backfill_ledgers(apps, schema_editor):
+    """One grouped pass over payments -> one ledger row per paying member"""
+    Payment = apps.get_model('payments', 'Payment')
+    MemberLedger = apps.get_model('payments', 'MemberLedger')
+    paid = Q(status='PAID')
+
+    rows = Payment.objects.order_by().values('member_id', 'gym_id').annotate(
+        lifetime_paid=Sum('amount', filter=paid),
+        payment_count=Count('id', filter=paid),
+        last_payment_date=Max('payment_date', filter=paid),
+        outstanding_amount=Sum('amount', filter=Q(status='PENDING')),
+        last_period=Max('billing_period', filter=paid),
+    )
+
+    ledgers = []
+    for row in rows.iterator():
+        last_period = row['last_period']
+        next_due = None
+        if last_period:
+            if last_period.month == 12:
+                next_due = last_period.replace(year=last_period.year + 1, month=1, day=1)
+            else:
+                next_due = last_period.replace(month=last_period.month + 1, day=1)
+        ledgers.append(MemberLedger(
+            member_id=row['member_id'],
+            gym_id=row['gym_id'],
+            lifetime_paid=row['lifetime_paid'] or 0,
+            payment_count=row['payment_count'],
+            last_payment_date=row['last_payment_date'],
+            outstanding_amount=row['outstanding_amount'] or 0,
+            next_due_date=next_due,
+        ))
+    MemberLedger.objects.bulk_create(ledgers, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness', '0001_initial'),
+        ('members', '0003_member_visit_streaks'),
+        ('payments', '0002_payment_billing_period'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberLedger',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger', serialize=False, to='members.member')),
+                ('lifetime_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('payment_count', models.PositiveIntegerField(default=0)),
+                ('last_payment_date', models.DateField(blank=True, null=True)),
+                ('outstanding_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('next_due_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledgers', to='fitness.gym')),
+            ],
+            options={
+                'db_table': 'member_ledgers',
+            },
+        ),
+        migrations.RunPython(backfill_ledgers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness', '0001_initial'),
+        ('members', '0003_member_visit_streaks'),
+        ('payments', '0003_member_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='reconciled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='reconciliation_reference',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['gym', 'reconciled_at'], name='payments_gym_id_baae54_idx'),
+        ),
+    ]
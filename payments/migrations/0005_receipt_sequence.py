@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:44
+
+import django.db.models.deletion
+from datetime import datetime
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each (gym, day) counter after the highest receipt number already issued"""
+    Receipt = apps.get_model('payments', 'Receipt')
+    ReceiptSequence = apps.get_model('payments', 'ReceiptSequence')
+
+    highest = {}
+    for gym_id, number in Receipt.objects.values_list('gym_id', 'receipt_number').iterator():
+        try:
+            _, _, day, seq = number.rsplit('-', 3)
+            key = (gym_id, datetime.strptime(day, '%Y%m%d').date())
+            highest[key] = max(highest.get(key, 0), int(seq))
+        except ValueError:
+            continue
+
+    ReceiptSequence.objects.bulk_create([
+        ReceiptSequence(gym_id=gym_id, day=day, last_value=last_value)
+        for (gym_id, day), last_value in highest.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness', '0001_initial'),
+        ('payments', '0004_payment_reconciliation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceiptSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('last_value', models.PositiveIntegerField(default=0)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipt_sequences', to='fitness.gym')),
+            ],
+            options={
+                'db_table': 'receipt_sequences',
+                'unique_together': {('gym', 'day')},
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:46
+
+from django.db import migrations, models
+
+
+def mark_existing_ready(apps, schema_editor):
+    """Receipts rendered by the old synchronous view already have a file"""
+    Receipt = apps.get_model('payments', 'Receipt')
+    Receipt.objects.exclude(receipt_pdf__isnull=True).exclude(receipt_pdf='').update(pdf_status='READY')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_receipt_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receipt',
+            name='pdf_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='receipt',
+            name='pdf_rendered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='receipt',
+            name='pdf_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('RENDERING', 'Rendering'), ('READY', 'Ready'), ('FAILED', 'Failed')], db_index=True, default='PENDING', max_length=20),
+        ),
+        migrations.RunPython(mark_existing_ready, migrations.RunPython.noop),
+    ]
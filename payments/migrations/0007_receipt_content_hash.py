@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_receipt_pdf_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receipt',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
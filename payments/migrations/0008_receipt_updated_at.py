@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_receipt_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receipt',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
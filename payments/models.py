@@ -2,7 +2,9 @@
 Payments Models
 Optimized for Data Safety & Receipt Generation
 """
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
 from fitness.models import Gym, User
 from members.models import Member
 import uuid
@@ -35,12 +37,18 @@ class Payment(models.Model):
     
     # Monthly tracking (Optional to prevent crash)
     month = models.CharField(max_length=20, help_text="e.g., 'January 2025'", blank=True, null=True)
+    # Range-queryable billing month (always the 1st); derived from `month` / payment_date if not given
+    billing_period = models.DateField(null=True, blank=True, help_text="First day of the billed month")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PAID')
     
     # Transaction details
     transaction_id = models.CharField(max_length=100, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
     
+    # Bank / UPI statement reconciliation
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+    reconciliation_reference = models.CharField(max_length=100, blank=True, null=True)
+    
     # Meta
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -52,10 +60,99 @@ class Payment(models.Model):
         indexes = [
             models.Index(fields=['gym', '-payment_date']),
             models.Index(fields=['member', '-payment_date']),
+            models.Index(fields=['gym', 'billing_period', 'status']),
+            models.Index(fields=['gym', 'reconciled_at']),
         ]
     
     def __str__(self):
         return f"{self.member.name} - ₹{self.amount} - {self.payment_date}"
+    
+    MONTH_FORMATS = ('%B %Y', '%b %Y', '%Y-%m', '%m-%Y', '%m/%Y')
+    
+    @staticmethod
+    def parse_month(value):
+        """'January 2025' / 'Jan 2025' / '2025-01' -> date(2025, 1, 1), else None"""
+        from datetime import datetime
+        if not value:
+            return None
+        for fmt in Payment.MONTH_FORMATS:
+            try:
+                return datetime.strptime(value.strip(), fmt).date().replace(day=1)
+            except ValueError:
+                continue
+        return None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What was loaded, so fill_billing_period() can tell which side of month/billing_period an edit touched
+        if {'month', 'payment_date', 'billing_period'} <= set(field_names):
+            instance._loaded_period = (instance.month, instance.payment_date, instance.billing_period)
+        return instance
+    
+    def fill_billing_period(self):
+        """
+        Keep billing_period and the display `month` label in sync.
+        On edits the changed side wins: a new billing_period relabels `month`,
+        a new `month` re-derives billing_period, and a new payment_date moves
+        a billing_period that was following the old payment date.
+        """
+        payment_date = self.payment_date or date.today()
+        loaded = getattr(self, '_loaded_period', None)
+        if loaded and self.billing_period:
+            old_month, old_payment_date, old_period = loaded
+            if self.billing_period != old_period:
+                self.billing_period = self.billing_period.replace(day=1)
+                if self.month == old_month:
+                    self.month = self.billing_period.strftime('%B %Y')
+            elif self.month != old_month:
+                self.billing_period = Payment.parse_month(self.month) or payment_date.replace(day=1)
+            elif (
+                payment_date != old_payment_date and old_payment_date
+                and old_period == old_payment_date.replace(day=1)
+                and (Payment.parse_month(old_month) or old_period) == old_period
+            ):
+                self.billing_period = payment_date.replace(day=1)
+                self.month = self.billing_period.strftime('%B %Y')
+        elif self.billing_period:
+            self.billing_period = self.billing_period.replace(day=1)
+        else:
+            self.billing_period = Payment.parse_month(self.month) or payment_date.replace(day=1)
+        if not self.month:
+            self.month = self.billing_period.strftime('%B %Y')
+    
+    def save(self, *args, **kwargs):
+        self.fill_billing_period()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'billing_period', 'month'}
+        super().save(*args, **kwargs)
+        self._loaded_period = (self.month, self.payment_date, self.billing_period)
+
+
+class MemberLedger(models.Model):
+    """
+    Denormalized payment summary per member.
+    Refreshed inside the same transaction as every Payment write
+    (see payments/ledger.py), verified by `reconcile_ledgers`.
+    """
+    member = models.OneToOneField(Member, on_delete=models.CASCADE, primary_key=True, related_name='ledger')
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='ledgers')
+    
+    lifetime_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payment_count = models.PositiveIntegerField(default=0)
+    last_payment_date = models.DateField(null=True, blank=True)
+    outstanding_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # First billing month not yet covered by a PAID payment
+    next_due_date = models.DateField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'member_ledgers'
+    
+    def __str__(self):
+        return f"{self.member_id} - ₹{self.lifetime_paid}"
 
 
 class Receipt(models.Model):
@@ -66,14 +163,30 @@ class Receipt(models.Model):
     gym = models.ForeignKey(Gym, on_delete=models.CASCADE)
     member = models.ForeignKey(Member, on_delete=models.CASCADE)
     
+    PDF_STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RENDERING', 'Rendering'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
+    ]
+    
     receipt_number = models.CharField(max_length=50, unique=True, db_index=True)
     receipt_pdf = models.FileField(upload_to='receipts/', null=True, blank=True)
     
+    # Background PDF rendering (see payments/tasks.py)
+    pdf_status = models.CharField(max_length=20, choices=PDF_STATUS_CHOICES, default='PENDING', db_index=True)
+    pdf_error = models.TextField(blank=True, null=True)
+    pdf_rendered_at = models.DateTimeField(null=True, blank=True)
+    # sha256 of the rendered fields (payments/utils.receipt_content_hash); re-render only when it changes
+    content_hash = models.CharField(max_length=64, blank=True, null=True)
+    
     # WhatsApp delivery
     sent_via_whatsapp = models.BooleanField(default=False)
     whatsapp_sent_at = models.DateTimeField(null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also stamped by the queryset claims in payments/tasks.py (auto_now skips .update())
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'receipts'
@@ -85,25 +198,55 @@ class Receipt(models.Model):
     @staticmethod
     def generate_receipt_number(gym):
         """Generate unique receipt number"""
-        from datetime import datetime
-        today = datetime.now()
+        return Receipt.generate_receipt_numbers(gym, 1)[0]
+    
+    @staticmethod
+    def generate_receipt_numbers(gym, count):
+        """
+        Reserve `count` consecutive receipt numbers.
+        O(1) counter increment (no prefix scan); call inside the transaction
+        that creates the receipts so a rollback also releases the numbers.
+        """
+        day = timezone.localdate()
         # Use first 8 chars of UUID to keep it short but unique per gym
-        prefix = f"REC-{gym.id.hex[:8].upper()}-{today.strftime('%Y%m%d')}"
-        
-        # Get last receipt for today
-        last_receipt = Receipt.objects.filter(
-            gym=gym,
-            receipt_number__startswith=prefix
-        ).order_by('-created_at').first()
+        prefix = f"REC-{gym.id.hex[:8].upper()}-{day.strftime('%Y%m%d')}"
+        return [f"{prefix}-{seq:04d}" for seq in ReceiptSequence.reserve(gym, day, count)]
+
+
+class ReceiptSequence(models.Model):
+    """Per-gym, per-day receipt counter"""
+    
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='receipt_sequences')
+    day = models.DateField()
+    last_value = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'receipt_sequences'
+        unique_together = [['gym', 'day']]
+    
+    def __str__(self):
+        return f"{self.gym_id} {self.day}: {self.last_value}"
+    
+    @classmethod
+    def reserve(cls, gym, day, count=1):
+        """
+        Atomically bump the counter and return the reserved range.
+        The UPDATE takes the row lock before we read, so concurrent
+        callers queue on that row instead of racing on a LIKE scan.
+        """
+        if count < 1:
+            return range(0)
         
-        if last_receipt:
-            # Extract sequence number and increment
-            try:
-                last_seq = int(last_receipt.receipt_number.split('-')[-1])
-                new_seq = last_seq + 1
-            except ValueError:
-                new_seq = 1
-        else:
-            new_seq = 1
+        with transaction.atomic():
+            rows = cls.objects.filter(gym=gym, day=day)
+            if not rows.update(last_value=F('last_value') + count):
+                try:
+                    # Savepoint: first receipt of the day creates the row
+                    with transaction.atomic():
+                        cls.objects.create(gym=gym, day=day, last_value=count)
+                except IntegrityError:
+                    # Someone else created it first, fall back to the locked increment
+                    rows.update(last_value=F('last_value') + count)
+            last_value = rows.values_list('last_value', flat=True).get()
         
-        return f"{prefix}-{new_seq:04d}"
\ No newline at end of file
+        return range(last_value - count + 1, last_value + 1)
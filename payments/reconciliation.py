@@ -0,0 +1,247 @@
+"""
+Bank / UPI Statement Reconciliation
+Streams an uploaded CSV statement and ticks off matching payments.
+
+The gym's unreconciled payments are loaded once into two hash indexes:
+  - transaction_id -> [payments]       (exact match; ids typed twice by
+                                        staff are flagged, not overwritten)
+  - (amount, date) -> [payments]       (fuzzy fallback, +/- N days; skips
+                                        payments whose recorded id differs
+                                        from the statement line's)
+so each statement line is an O(1) lookup and the whole file is O(n).
+Matches are written back with chunked bulk UPDATEs.
+"""
+import csv
+import io
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Payment
+
+# Header names seen in Indian bank / UPI app exports (lower-cased, stripped)
+COLUMN_ALIASES = {
+    'transaction_id': (
+        'transaction_id', 'transaction id', 'txn id', 'utr', 'utr no', 'utr number',
+        'reference', 'reference no', 'ref no', 'ref no./cheque no.', 'upi ref no', 'rrn',
+    ),
+    'amount': ('amount', 'credit', 'credit amount', 'deposit', 'deposit amt.', 'cr', 'amount (inr)'),
+    'date': ('date', 'txn date', 'transaction date', 'value date', 'value dt'),
+}
+
+DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%d-%b-%Y', '%d %b %Y', '%d/%m/%y', '%d-%m-%y')
+
+UPDATE_CHUNK_SIZE = 900
+
+
+class StatementFormatError(ValueError):
+    """Statement header is missing required columns"""
+
+
+@dataclass
+class _Candidate:
+    pk: object
+    amount: Decimal
+    payment_date: object
+    txn: str
+
+
+def _normalize_txn(value):
+    return ''.join(value.split()).upper() if value else ''
+
+
+def _parse_amount(value):
+    cleaned = (value or '').replace(',', '').replace('₹', '').replace('Rs.', '').strip()
+    if not cleaned:
+        return None
+    try:
+        return Decimal(cleaned).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return None
+
+
+def _parse_date(value):
+    value = (value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _column_map(header):
+    normalized = [column.strip().lower() for column in header]
+    columns = {}
+    for key, aliases in COLUMN_ALIASES.items():
+        for position, name in enumerate(normalized):
+            if name in aliases:
+                columns[key] = position
+                break
+    if 'amount' not in columns or ('transaction_id' not in columns and 'date' not in columns):
+        raise StatementFormatError(
+            "Statement needs an amount column plus a transaction id and/or date column"
+        )
+    return columns
+
+
+def _build_indexes(gym, since=None):
+    """Load unreconciled PAID payments once (values only, no model instances)"""
+    payments = Payment.objects.filter(gym=gym, status='PAID', reconciled_at__isnull=True)
+    if since:
+        payments = payments.filter(payment_date__gte=since)
+
+    by_txn = defaultdict(list)
+    by_amount_date = defaultdict(list)
+    for pk, txn, amount, payment_date in payments.values_list(
+        'pk', 'transaction_id', 'amount', 'payment_date'
+    ).iterator(chunk_size=5000):
+        candidate = _Candidate(pk, amount, payment_date, _normalize_txn(txn))
+        if candidate.txn:
+            by_txn[candidate.txn].append(candidate)
+        by_amount_date[(amount, payment_date)].append(candidate)
+    return by_txn, by_amount_date
+
+
+def _mark_reconciled(claimed):
+    """
+    Exact matches: chunked UPDATE ... WHERE pk IN (...) copying transaction_id.
+    Fuzzy matches: bulk_update, since each carries its own statement reference.
+    """
+    now = timezone.now()
+    exact = [pk for pk, reference in claimed.items() if reference is None]
+    fuzzy = [
+        Payment(pk=pk, reconciled_at=now, reconciliation_reference=reference[:100])
+        for pk, reference in claimed.items() if reference is not None
+    ]
+
+    with transaction.atomic():
+        for start in range(0, len(exact), UPDATE_CHUNK_SIZE):
+            Payment.objects.filter(pk__in=exact[start:start + UPDATE_CHUNK_SIZE]).update(
+                reconciled_at=now,
+                reconciliation_reference=F('transaction_id')
+            )
+        if fuzzy:
+            Payment.objects.bulk_update(
+                fuzzy, ['reconciled_at', 'reconciliation_reference'], batch_size=UPDATE_CHUNK_SIZE
+            )
+
+
+def reconcile_statement(gym, stream, date_window_days=2, since=None, dry_run=False):
+    """
+    Match a CSV statement (binary or text stream) against unreconciled payments.
+    Returns {'matched': [...], 'unmatched': [...], 'suspicious': [...], 'summary': {...}}
+    """
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+
+    reader = csv.reader(text)
+    try:
+        columns = _column_map(next(reader))
+    except StopIteration:
+        raise StatementFormatError("Statement is empty")
+
+    by_txn, by_amount_date = _build_indexes(gym, since=since)
+    window = [timedelta(days=offset) for offset in range(-date_window_days, date_window_days + 1)]
+
+    claimed = {}  # payment pk -> statement reference (fuzzy matches only carry a new reference)
+    matched, unmatched, suspicious = [], [], []
+
+    def cell(row, key):
+        position = columns.get(key)
+        return row[position].strip() if position is not None and position < len(row) else ''
+
+    for line, row in enumerate(reader, start=2):
+        if not any(row):
+            continue
+
+        reference = cell(row, 'transaction_id')
+        amount = _parse_amount(cell(row, 'amount'))
+        txn_date = _parse_date(cell(row, 'date'))
+        entry = {
+            'line': line,
+            'transaction_id': reference,
+            'amount': str(amount) if amount is not None else cell(row, 'amount'),
+            'date': txn_date,
+        }
+
+        if amount is None:
+            suspicious.append({**entry, 'reason': 'Unreadable amount'})
+            continue
+
+        # 1. Exact transaction id
+        txn = _normalize_txn(reference)
+        hits = by_txn.get(txn, ()) if txn else ()
+        if hits:
+            open_hits = [hit for hit in hits if hit.pk not in claimed]
+            same_amount = [hit for hit in open_hits if hit.amount == amount]
+            if not open_hits:
+                suspicious.append({**entry, 'payment': str(hits[0].pk), 'reason': 'Transaction id repeated in statement'})
+            elif len(same_amount) == 1:
+                claimed[same_amount[0].pk] = None  # reference == stored transaction_id
+                matched.append({**entry, 'payment': str(same_amount[0].pk), 'match': 'transaction_id'})
+            elif same_amount:
+                suspicious.append({
+                    **entry,
+                    'reason': f'{len(same_amount)} payments recorded with this transaction id',
+                    'candidates': [str(hit.pk) for hit in same_amount[:10]],
+                })
+            else:
+                suspicious.append({
+                    **entry, 'payment': str(open_hits[0].pk),
+                    'reason': f'Amount mismatch (recorded ₹{open_hits[0].amount})'
+                })
+            continue
+
+        # 2. Fuzzy: same amount within +/- N days, must be unambiguous
+        if txn_date is None:
+            unmatched.append(entry)
+            continue
+
+        nearby = [
+            candidate
+            for offset in window
+            for candidate in by_amount_date.get((amount, txn_date + offset), ())
+            if candidate.pk not in claimed
+        ]
+        # A payment recorded with a different transaction id is someone else's money
+        candidates = [candidate for candidate in nearby if not (txn and candidate.txn and candidate.txn != txn)]
+        if len(candidates) == 1:
+            claimed[candidates[0].pk] = reference or f'line {line}'
+            matched.append({**entry, 'payment': str(candidates[0].pk), 'match': 'amount_date'})
+        elif candidates:
+            suspicious.append({
+                **entry,
+                'reason': f'{len(candidates)} payments with same amount near this date',
+                'candidates': [str(candidate.pk) for candidate in candidates[:10]],
+            })
+        elif nearby:
+            suspicious.append({
+                **entry,
+                'reason': 'Same amount near this date, but recorded transaction id differs',
+                'candidates': [str(candidate.pk) for candidate in nearby[:10]],
+            })
+        else:
+            unmatched.append(entry)
+
+    if claimed and not dry_run:
+        _mark_reconciled(claimed)
+
+    return {
+        'summary': {
+            'matched': len(matched),
+            'unmatched': len(unmatched),
+            'suspicious': len(suspicious),
+            'dry_run': dry_run,
+        },
+        'matched': matched,
+        'unmatched': unmatched,
+        'suspicious': suspicious,
+    }
@@ -0,0 +1,92 @@
+"""
+Membership Renewal
+One transaction for the most common front-desk action:
+lock member -> record payment -> extend membership -> create receipt.
+"""
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from fitness.models import ActivityLog
+from members.models import Member
+from .models import Payment, Receipt
+from .ledger import refresh_member_ledgers
+from .tasks import queue_receipt_pdf
+
+
+def renewal_period(member, plan, today=None):
+    """
+    New (start, end) for a plan purchase.
+    Active members extend from the day after their current end date,
+    lapsed members restart from today. End date is inclusive.
+    """
+    today = today or date.today()
+    if member.membership_end_date and member.membership_end_date >= today:
+        start = member.membership_end_date + timedelta(days=1)
+    else:
+        start = today
+    return start, start + timedelta(days=plan.duration_days - 1)
+
+
+def renew_membership(*, gym, user, member_id, plan, amount=None, payment_method='CASH',
+                     transaction_id=None, notes=None, generate_receipt=True, ip_address=None):
+    """
+    Renew a member on `plan`. Raises Member.DoesNotExist for unknown / other-gym members.
+    Returns (member, payment, receipt_or_None).
+    """
+    with transaction.atomic():
+        # 🛡️ Row lock: concurrent renewals / edits queue up instead of racing on end date
+        member = Member.objects.select_for_update().get(pk=member_id, gym=gym)
+
+        start, end = renewal_period(member, plan)
+        amount = plan.price if amount is None else amount
+
+        payment = Payment.objects.create(
+            gym=gym,
+            member=member,
+            amount=amount,
+            payment_method=payment_method,
+            month=start.strftime('%B %Y'),
+            billing_period=start.replace(day=1),
+            status='PAID',
+            transaction_id=transaction_id,
+            notes=notes,
+            created_by=user,
+        )
+
+        refresh_member_ledgers([member.pk])
+
+        update_fields = ['membership_end_date', 'membership_fee', 'is_active', 'updated_at']
+        if member.membership_end_date is None or member.membership_end_date < start - timedelta(days=1):
+            # Lapsed membership starts a fresh term
+            member.membership_start_date = start
+            update_fields.append('membership_start_date')
+        if plan.duration in dict(Member.MEMBERSHIP_TYPE_CHOICES):
+            member.membership_type = plan.duration
+            update_fields.append('membership_type')
+
+        member.membership_end_date = end
+        member.membership_fee = plan.price
+        member.is_active = True
+        member.save(update_fields=update_fields)
+
+        receipt = None
+        if generate_receipt:
+            receipt = Receipt.objects.create(
+                payment=payment,
+                gym=gym,
+                member=member,
+                receipt_number=Receipt.generate_receipt_number(gym)
+            )
+            queue_receipt_pdf(receipt)
+
+        # Single log entry for the whole renewal
+        ActivityLog.objects.create(
+            user=user,
+            gym=gym,
+            action='PAYMENT_ADD',
+            description=f'Membership renewed: {member.name} - {plan.name} (₹{amount}) valid till {end.strftime("%d-%b-%Y")}',
+            ip_address=ip_address
+        )
+
+    return member, payment, receipt
@@ -4,8 +4,10 @@ Optimized for Data Integrity & Frontend Compatibility
 """
 from rest_framework import serializers
 from .models import Payment, Receipt
+from .batch_receipts import BATCH_FORMATS, MAX_BATCH_RECEIPTS
 # Note: MemberListSerializer import rakha hai agar future me nested use karna ho
 from members.serializers import MemberListSerializer
+from members.models import Member, MembershipPlan
 
 class PaymentSerializer(serializers.ModelSerializer):
     member_name = serializers.CharField(source='member.name', read_only=True)
@@ -15,10 +17,10 @@ class PaymentSerializer(serializers.ModelSerializer):
         model = Payment
         fields = [
             'id', 'member', 'member_name', 'member_phone', 'amount',
-            'payment_method', 'payment_date', 'month', 'status',
-            'transaction_id', 'notes', 'created_at', 'updated_at'
+            'payment_method', 'payment_date', 'month', 'billing_period', 'status',
+            'transaction_id', 'notes', 'reconciled_at', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'reconciled_at', 'created_at', 'updated_at']
 
     # 🛡️ SECURITY FIX: Amount Validation
     def validate_amount(self, value):
@@ -51,7 +53,93 @@ class ReceiptSerializer(serializers.ModelSerializer):
         model = Receipt
         fields = [
             'id', 'payment', 'payment_details', 'member', 'member_name',
-            'receipt_number', 'receipt_pdf', 'sent_via_whatsapp',
+            'receipt_number', 'receipt_pdf', 'pdf_status', 'sent_via_whatsapp',
             'whatsapp_sent_at', 'created_at'
         ]
-        read_only_fields = ['id', 'receipt_number', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'receipt_number', 'pdf_status', 'created_at']
+
+
+class MembershipRenewalSerializer(serializers.Serializer):
+    """Input for one-call renewal (payment + plan extension + receipt)"""
+    member = serializers.IntegerField()
+    plan = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    payment_method = serializers.ChoiceField(choices=Payment.PAYMENT_METHOD_CHOICES, default='CASH')
+    transaction_id = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    generate_receipt = serializers.BooleanField(default=True)
+
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Payment amount must be greater than zero.")
+        return value
+
+    def validate_plan(self, value):
+        gym = self.context['gym']
+        try:
+            return MembershipPlan.objects.get(pk=value, gym=gym, is_active=True)
+        except MembershipPlan.DoesNotExist:
+            raise serializers.ValidationError("Membership plan not found.")
+
+
+class BatchPaymentItemSerializer(serializers.ModelSerializer):
+    """One row of a batch entry. Member is a plain id, validated for the whole batch at once."""
+    member = serializers.IntegerField()
+    
+    class Meta:
+        model = Payment
+        fields = [
+            'member', 'amount', 'payment_method', 'payment_date', 'month',
+            'billing_period', 'status', 'transaction_id', 'notes'
+        ]
+
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Payment amount must be greater than zero.")
+        return value
+
+
+class BatchPaymentSerializer(serializers.Serializer):
+    """End-of-day cash entry: many payments in one request"""
+    MAX_BATCH_SIZE = 500
+    
+    payments = BatchPaymentItemSerializer(many=True, allow_empty=False)
+    generate_receipts = serializers.BooleanField(default=False)
+
+    def validate_payments(self, items):
+        if len(items) > self.MAX_BATCH_SIZE:
+            raise serializers.ValidationError(f"Maximum {self.MAX_BATCH_SIZE} payments per batch.")
+        
+        # 🛡️ One IN query for every member id in the batch
+        member_ids = {item['member'] for item in items}
+        found = set(
+            Member.objects.filter(gym=self.context['gym'], pk__in=member_ids).values_list('pk', flat=True)
+        )
+        missing = sorted(member_ids - found)
+        if missing:
+            raise serializers.ValidationError(f"Members not found: {missing}")
+        return items
+
+
+class BatchReceiptSerializer(serializers.Serializer):
+    """Receipts for a list of payments or a payment date range"""
+    payment_ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    format = serializers.ChoiceField(choices=BATCH_FORMATS, default='pdf')
+
+    def validate(self, data):
+        if not data.get('payment_ids') and not (data.get('start_date') and data.get('end_date')):
+            raise serializers.ValidationError("Provide payment_ids or both start_date and end_date.")
+        if data.get('start_date') and data.get('end_date') and data['start_date'] > data['end_date']:
+            raise serializers.ValidationError("start_date must be before end_date.")
+        if len(data.get('payment_ids') or ()) > MAX_BATCH_RECEIPTS:
+            raise serializers.ValidationError(f"Maximum {MAX_BATCH_RECEIPTS} receipts per batch.")
+        return data
+
+
+class StatementReconcileSerializer(serializers.Serializer):
+    """Form fields of a statement upload (the file itself is checked by the view)"""
+    date_window = serializers.IntegerField(default=2)
+    since = serializers.DateField(required=False, allow_null=True)
+    dry_run = serializers.BooleanField(default=False)
@@ -0,0 +1,116 @@
+"""
+Payments Background Tasks
+Receipt PDFs are rendered off the request thread by a small per-process
+worker pool. Work is submitted only after the surrounding transaction
+commits, so a rolled-back payment never gets a PDF.
+
+Receipt.pdf_status tracks PENDING -> RENDERING -> READY / FAILED.
+Receipt.content_hash skips renders whose printed fields did not change.
+The pool lives in the web process, so a restart drops whatever was still
+queued: `render_pending_receipts` (Render cron) sweeps those up.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import Receipt
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'RECEIPT_RENDER_WORKERS', 2),
+                thread_name_prefix='receipt-pdf'
+            )
+        return _executor
+
+
+def render_receipt(receipt_id, force=False):
+    """
+    Build and attach the PDF for one receipt.
+    The PENDING/FAILED -> RENDERING claim is a conditional UPDATE, so a
+    receipt queued twice is still rendered once. If the content hash
+    matches the stored file nothing is rendered. Returns True if rendered.
+    """
+    from .utils import receipt_content_hash, receipt_context, render_receipt_bytes
+
+    claimable = ['PENDING', 'FAILED'] + (['RENDERING', 'READY'] if force else [])
+    if not Receipt.objects.filter(pk=receipt_id, pdf_status__in=claimable).update(
+        pdf_status='RENDERING', updated_at=timezone.now()
+    ):
+        return False
+
+    receipt = Receipt.objects.select_related('payment', 'member', 'gym').get(pk=receipt_id)
+    try:
+        ctx = receipt_context(receipt)
+        digest = receipt_content_hash(ctx)
+        pdf = receipt.receipt_pdf
+
+        if not force and digest == receipt.content_hash and pdf and pdf.storage.exists(pdf.name):
+            # ✅ Nothing printed on it changed -> keep the existing file
+            Receipt.objects.filter(pk=receipt_id).update(pdf_status='READY', pdf_error=None, updated_at=timezone.now())
+            return False
+
+        pdf_content = render_receipt_bytes(ctx)
+        if pdf:
+            # Replace, don't pile up receipt_X_abc123.pdf copies
+            pdf.delete(save=False)
+        receipt.receipt_pdf.save(f"receipt_{receipt.receipt_number}.pdf", ContentFile(pdf_content), save=False)
+        receipt.content_hash = digest
+        receipt.pdf_status = 'READY'
+        receipt.pdf_error = None
+        receipt.pdf_rendered_at = timezone.now()
+        receipt.save(update_fields=['receipt_pdf', 'content_hash', 'pdf_status', 'pdf_error', 'pdf_rendered_at'])
+        return True
+    except Exception as e:
+        logger.exception("Receipt PDF render failed for %s", receipt.receipt_number)
+        Receipt.objects.filter(pk=receipt_id).update(
+            pdf_status='FAILED', pdf_error=str(e)[:500], updated_at=timezone.now()
+        )
+        return False
+
+
+def _render_in_worker(receipt_ids):
+    try:
+        for receipt_id in receipt_ids:
+            try:
+                render_receipt(receipt_id)
+            except Exception:
+                logger.exception("Receipt PDF worker crashed on %s", receipt_id)
+    finally:
+        # Pool threads outlive the request, don't leak their DB connections
+        connections.close_all()
+
+
+def queue_receipt_pdfs(receipts):
+    """Render receipts in the background once the current transaction commits"""
+    receipt_ids = [receipt.pk for receipt in receipts]
+    if not receipt_ids:
+        return
+
+    def _submit():
+        if getattr(settings, 'RECEIPT_RENDER_WORKERS', 2) <= 0:
+            # Inline mode (management commands / debugging)
+            for receipt_id in receipt_ids:
+                render_receipt(receipt_id)
+        else:
+            _get_executor().submit(_render_in_worker, receipt_ids)
+
+    transaction.on_commit(_submit)
+
+
+def queue_receipt_pdf(receipt):
+    """Single-receipt variant of queue_receipt_pdfs"""
+    queue_receipt_pdfs([receipt])
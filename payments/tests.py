@@ -1,3 +1,334 @@
-from django.test import TestCase
+"""
+Payments Tests
+"""
+import os
+import shutil
+import tempfile
+import threading
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from pypdf import PdfReader
+from rest_framework.test import APIClient
+
+from fitness.testing import create_gym, create_member
+from .batch_receipts import batch_payments, ensure_receipts, render_merged_pdf
+from .models import MemberLedger, Payment, Receipt, ReceiptSequence
+from .reconciliation import reconcile_statement
+from .utils import receipt_context
+
+
+class ReceiptSequenceTests(TestCase):
+    def setUp(self):
+        self.gym = create_gym()
+
+    def test_numbers_are_consecutive_per_day(self):
+        first = Receipt.generate_receipt_number(self.gym)
+        batch = Receipt.generate_receipt_numbers(self.gym, 3)
+
+        self.assertTrue(first.endswith('-0001'))
+        self.assertEqual([number[-4:] for number in batch], ['0002', '0003', '0004'])
+        self.assertEqual(ReceiptSequence.objects.get(gym=self.gym).last_value, 4)
+
+    def test_sequences_are_independent_per_gym(self):
+        other = create_gym('other@example.com')
+        Receipt.generate_receipt_number(self.gym)
+
+        self.assertTrue(Receipt.generate_receipt_number(other).endswith('-0001'))
+
+
+class ReceiptSequenceConcurrencyTests(TransactionTestCase):
+    THREADS = 8
+    PER_THREAD = 10
+
+    def test_concurrent_reservations_are_unique_and_gap_free(self):
+        gym = create_gym()
+        member = create_member(gym, days_left=0)
+        payments = Payment.objects.bulk_create([
+            Payment(gym=gym, member=member, amount=100) for _ in range(self.THREADS * self.PER_THREAD)
+        ])
+
+        errors = []
+        barrier = threading.Barrier(self.THREADS)
+
+        def worker(chunk):
+            try:
+                barrier.wait()
+                for payment in chunk:
+                    Receipt.objects.create(
+                        payment=payment, gym=gym, member=member,
+                        receipt_number=Receipt.generate_receipt_number(gym)
+                    )
+            except Exception as e:  # surfaced via assertion below
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=worker, args=(payments[i::self.THREADS],))
+            for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        numbers = sorted(Receipt.objects.values_list('receipt_number', flat=True))
+        total = self.THREADS * self.PER_THREAD
+        self.assertEqual(len(set(numbers)), total)
+        self.assertEqual([int(number[-4:]) for number in numbers], list(range(1, total + 1)))
+
+
+class BillingPeriodTests(TestCase):
+    def setUp(self):
+        self.gym = create_gym()
+        self.member = create_member(self.gym)
+        self.client = APIClient()
+        self.client.force_authenticate(self.gym.owner)
+
+    def make_payment(self, **fields):
+        return Payment.objects.create(**{
+            'gym': self.gym, 'member': self.member, 'amount': 1000, 'payment_date': date(2025, 1, 10), **fields
+        })
+
+    def patch(self, payment, data):
+        response = self.client.patch(
+            reverse('payments:payment-detail', args=[payment.pk]), data, format='json', secure=True
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        payment.refresh_from_db()
+        return payment
+
+    def test_derived_from_payment_date_on_create(self):
+        payment = self.make_payment()
+        self.assertEqual((payment.billing_period, payment.month), (date(2025, 1, 1), 'January 2025'))
+
+    def test_changing_month_moves_billing_period(self):
+        payment = self.patch(self.make_payment(), {'month': 'March 2025'})
+        self.assertEqual((payment.billing_period, payment.month), (date(2025, 3, 1), 'March 2025'))
+
+    def test_changing_billing_period_relabels_month(self):
+        payment = self.patch(self.make_payment(), {'billing_period': '2025-02-01'})
+        self.assertEqual((payment.billing_period, payment.month), (date(2025, 2, 1), 'February 2025'))
+
+    def test_changing_payment_date_moves_a_following_billing_period(self):
+        payment = self.patch(self.make_payment(), {'payment_date': '2025-02-03'})
+        self.assertEqual((payment.billing_period, payment.month), (date(2025, 2, 1), 'February 2025'))
+
+    def test_payment_date_change_keeps_an_explicit_other_month(self):
+        # Paid in January for December
+        payment = self.patch(self.make_payment(month='December 2024'), {'payment_date': '2025-01-20'})
+        self.assertEqual((payment.billing_period, payment.month), (date(2024, 12, 1), 'December 2024'))
+
+
+class LedgerWriteTests(TestCase):
+    def setUp(self):
+        self.gym = create_gym()
+        self.member = create_member(self.gym)
+        self.client = APIClient()
+        self.client.force_authenticate(self.gym.owner)
+
+    def post_payment(self, amount):
+        return self.client.post(
+            reverse('payments:payment-list'), {'member': str(self.member.pk), 'amount': amount}, format='json',
+            secure=True
+        )
+
+    def test_create_refreshes_the_ledger(self):
+        self.post_payment(500)
+        self.post_payment(700)
+
+        ledger = MemberLedger.objects.get(member=self.member)
+        self.assertEqual((ledger.lifetime_paid, ledger.payment_count), (1200, 2))
+
+    def test_ledger_failure_is_not_swallowed(self):
+        with mock.patch('payments.views.refresh_member_ledgers', side_effect=RuntimeError('ledger down')):
+            with self.assertRaises(RuntimeError), self.assertLogs('django.request', 'ERROR'):
+                self.post_payment(500)
+
+        self.assertFalse(Payment.objects.exists())
+
+
+class BatchReceiptTests(TestCase):
+    def setUp(self):
+        self.gym = create_gym()
+        self.member = create_member(self.gym)
+        self.payments = [
+            Payment.objects.create(gym=self.gym, member=self.member, amount=1000, payment_date=date(2025, 1, day))
+            for day in (5, 6, 7)
+        ]
+
+    def test_ensure_receipts_keeps_a_receipt_created_concurrently(self):
+        payments = list(batch_payments(self.gym))  # loaded before the other caller's insert
+        other = Receipt.objects.create(
+            payment=self.payments[1], gym=self.gym, member=self.member,
+            receipt_number=Receipt.generate_receipt_number(self.gym)
+        )
+
+        receipts, created = ensure_receipts(self.gym, payments)
+
+        self.assertEqual(created, 2)
+        self.assertEqual(receipts[1].pk, other.pk)
+        self.assertEqual(Receipt.objects.filter(gym=self.gym).count(), 3)
+        self.assertEqual(ensure_receipts(self.gym, list(batch_payments(self.gym)))[1], 0)
+
+    def test_merged_pdf_has_a_page_per_receipt_in_every_mode(self):
+        receipts, _ = ensure_receipts(self.gym, list(batch_payments(self.gym)))
+        contexts = [receipt_context(receipt) for receipt in receipts]
+
+        for mode in ('platypus', 'canvas'):
+            with self.subTest(mode=mode):
+                output = BytesIO()
+                render_merged_pdf(contexts, output, mode=mode)
+                self.assertEqual(len(PdfReader(BytesIO(output.getvalue())).pages), 3)
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.gym = create_gym()
+        self.member = create_member(self.gym)
+
+    def make_payment(self, amount=1000, day=10, txn=None):
+        return Payment.objects.create(
+            gym=self.gym, member=self.member, amount=amount, payment_date=date(2025, 1, day), transaction_id=txn
+        )
+
+    def reconcile(self, *lines, **kwargs):
+        statement = StringIO('\n'.join(['Txn Date,UTR,Amount', *lines]))
+        return reconcile_statement(self.gym, statement, **kwargs)
+
+    def test_exact_and_fuzzy_matches(self):
+        by_utr = self.make_payment(txn='utr 111')
+        by_amount = self.make_payment(amount=700, day=12)
+
+        result = self.reconcile('10/01/2025,UTR111,1000', '13/01/2025,UTR222,700.00')
+
+        self.assertEqual(
+            [(row['payment'], row['match']) for row in result['matched']],
+            [(str(by_utr.pk), 'transaction_id'), (str(by_amount.pk), 'amount_date')]
+        )
+        by_amount.refresh_from_db()
+        self.assertEqual(by_amount.reconciliation_reference, 'UTR222')
+
+    def test_amount_mismatch_and_repeats_are_suspicious(self):
+        self.make_payment(txn='UTR1')
+
+        result = self.reconcile('10/01/2025,UTR1,999', '10/01/2025,UTR1,1000', '10/01/2025,UTR1,1000')
+
+        self.assertEqual(result['summary'], {'matched': 1, 'unmatched': 0, 'suspicious': 2, 'dry_run': False})
+
+    def test_duplicate_recorded_transaction_ids_are_not_overwritten(self):
+        first = self.make_payment(txn='UTR1')
+        second = self.make_payment(amount=500, day=11, txn='UTR1')
+
+        result = self.reconcile('11/01/2025,UTR1,500', '10/01/2025,UTR1,1000')
+
+        self.assertEqual([row['payment'] for row in result['matched']], [str(second.pk), str(first.pk)])
+
+    def test_fuzzy_match_skips_a_contradicting_transaction_id(self):
+        self.make_payment(txn='UTR1')
+
+        result = self.reconcile('10/01/2025,UTR9,1000', '10/01/2025,,1000', dry_run=True)
+
+        self.assertEqual(result['suspicious'][0]['line'], 2)
+        self.assertEqual(result['matched'][0]['line'], 3)
+        self.assertFalse(Payment.objects.filter(reconciled_at__isnull=False).exists())
+
+    def test_invalid_since_is_a_400(self):
+        client = APIClient()
+        client.force_authenticate(self.gym.owner)
+
+        response = client.post(
+            reverse('payments:reconcile'),
+            {'file': SimpleUploadedFile('s.csv', b'Date,Amount\n'), 'since': '2025-13-45'},
+            format='multipart', secure=True
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('since', response.data)
+
+
+class GenerateReceiptTests(TestCase):
+    def setUp(self):
+        self.gym = create_gym()
+        self.payment = Payment.objects.create(
+            gym=self.gym, member=create_member(self.gym), amount=1000, payment_date=date(2025, 1, 10)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.gym.owner)
+
+    def test_receipt_created_concurrently_is_reused(self):
+        theirs = Receipt.objects.create(
+            payment=self.payment, gym=self.gym, member=self.payment.member,
+            receipt_number=Receipt.generate_receipt_number(self.gym)
+        )
+        real = Receipt.objects.select_related
+        # Our lookup ran just before the other request's insert committed
+        lookups = iter([lambda *fields: Receipt.objects.none()])
+
+        with mock.patch.object(Receipt.objects, 'select_related',
+                               side_effect=lambda *fields: next(lookups, real)(*fields)), \
+                mock.patch('payments.views.queue_receipt_pdf'):
+            response = self.client.post(
+                reverse('payments:generate-receipt', args=[self.payment.pk]), secure=True
+            )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['receipt']['id'], str(theirs.pk))
+        self.assertEqual(Receipt.objects.count(), 1)
+
+
+class RenderPendingReceiptsTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        self.gym = create_gym()
+        member = create_member(self.gym)
+        self.receipts = []
+        for day in (1, 2):
+            payment = Payment.objects.create(gym=self.gym, member=member, amount=900, payment_date=date(2025, 1, day))
+            self.receipts.append(Receipt.objects.create(
+                payment=payment, gym=self.gym, member=member,
+                receipt_number=Receipt.generate_receipt_number(self.gym), pdf_status='RENDERING'
+            ))
+
+    def test_stuck_only_takes_over_old_renders(self):
+        crashed, running = self.receipts
+        Receipt.objects.filter(pk=crashed.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        call_command('render_pending_receipts', '--stuck', stdout=StringIO())
+
+        statuses = dict(Receipt.objects.values_list('pk', 'pdf_status'))
+        self.assertEqual((statuses[crashed.pk], statuses[running.pk]), ('READY', 'RENDERING'))
+
+
+class CleanupReceiptFilesTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media))
+        os.makedirs(os.path.join(self.media, 'receipts'))
+
+    def write(self, name, age_minutes):
+        path = os.path.join(self.media, 'receipts', name)
+        with open(path, 'wb') as handle:
+            handle.write(b'%PDF-fake')
+        stamp = (timezone.now() - timedelta(minutes=age_minutes)).timestamp()
+        os.utime(path, (stamp, stamp))
+
+    def test_recent_unreferenced_files_are_kept(self):
+        self.write('orphan.pdf', age_minutes=120)
+        self.write('just_rendered.pdf', age_minutes=1)  # row update not committed yet
+
+        call_command('cleanup_receipt_files', stdout=StringIO())
+
+        self.assertEqual(os.listdir(os.path.join(self.media, 'receipts')), ['just_rendered.pdf'])
@@ -4,7 +4,9 @@ Payments URLs
 from django.urls import path
 from .views import (
     PaymentListCreateView, PaymentDetailView, GenerateReceiptView,
-    ReceiptListView, PaymentStatsView
+    ReceiptListView, PaymentStatsView, MembershipRenewalView, BatchPaymentCreateView,
+    StatementReconcileView, ReceiptStatusView, BatchReceiptView,
+    ReceiptDownloadView
 )
 
 app_name = 'payments'
@@ -12,10 +14,16 @@ app_name = 'payments'
 urlpatterns = [
     # Payments
     path('', PaymentListCreateView.as_view(), name='payment-list'),
+    path('batch/', BatchPaymentCreateView.as_view(), name='payment-batch'),
     path('<uuid:pk>/', PaymentDetailView.as_view(), name='payment-detail'),
     path('<uuid:payment_id>/generate-receipt/', GenerateReceiptView.as_view(), name='generate-receipt'),
     path('stats/', PaymentStatsView.as_view(), name='stats'),
+    path('renew/', MembershipRenewalView.as_view(), name='renew'),
+    path('reconcile/', StatementReconcileView.as_view(), name='reconcile'),
     
     # Receipts
     path('receipts/', ReceiptListView.as_view(), name='receipt-list'),
+    path('receipts/batch/', BatchReceiptView.as_view(), name='receipt-batch'),
+    path('receipts/<uuid:pk>/status/', ReceiptStatusView.as_view(), name='receipt-status'),
+    path('receipts/<uuid:pk>/download/', ReceiptDownloadView.as_view(), name='receipt-download'),
 ]
\ No newline at end of file
@@ -1,141 +1,290 @@
 """
 Payment Utilities - PDF Generation
 Optimized for Standard Fonts (Replaced ₹ with Rs.)
+
+Receipts have a fixed one-page layout, so everything constant is built
+once per process: paragraph and table styles, plus the gym header
+strings (memoised per gym details). The Table / Paragraph flowables are
+still built per render: layout mutates them, and renders run on several
+threads. Rendering works off a plain dict from receipt_context(), which
+keeps it independent of the ORM.
+
+Two engines, picked by settings.RECEIPT_RENDER_MODE:
+  - 'platypus' (default): flowable layout, same look as always
+  - 'canvas': draws straight onto the page, no layout pass (fastest)
 """
-from reportlab.lib.pagesizes import A4
+import hashlib
+import json
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
 from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT
-from django.core.files.base import ContentFile
-from io import BytesIO
-from datetime import datetime
 
-def generate_receipt_pdf(receipt):
-    """Generate PDF receipt"""
-    
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#2C3E50'),
-        spaceAfter=30,
-        alignment=TA_CENTER
+RENDER_MODES = ('platypus', 'canvas')
+
+HEADER_GREY = colors.HexColor('#ECF0F1')
+TOTAL_BLUE = colors.HexColor('#3498DB')
+TITLE_DARK = colors.HexColor('#2C3E50')
+
+FOOTER_TEXT = "This is a computer-generated receipt. Thank you for your payment!"
+
+
+# ==============================================
+# 🎨 CACHED STYLES (built once per process)
+# ==============================================
+
+@lru_cache(maxsize=1)
+def _styles():
+    base = getSampleStyleSheet()
+    return {
+        'normal': base['Normal'],
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=base['Heading1'],
+            fontSize=24,
+            textColor=TITLE_DARK,
+            spaceAfter=30,
+            alignment=TA_CENTER
+        ),
+        'footer': ParagraphStyle('Footer', parent=base['Normal'], fontSize=9, alignment=TA_CENTER),
+    }
+
+
+GYM_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+RECEIPT_TABLE_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+])
+
+DETAILS_TABLE_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 4), (0, 4), 'Helvetica-Bold'),
+    ('BACKGROUND', (0, 0), (-1, 0), HEADER_GREY),
+    ('BACKGROUND', (0, 4), (-1, 4), HEADER_GREY),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+])
+
+TOTAL_TABLE_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 14),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('BACKGROUND', (0, 0), (-1, -1), TOTAL_BLUE),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ('PADDING', (0, 0), (-1, -1), 12),
+])
+
+
+@lru_cache(maxsize=256)
+def _gym_header_lines(name, address, city, state, pincode, phone, email):
+    """Gym header strings, memoised per gym details (key changes if the gym edits them)"""
+    return (
+        name,
+        address,
+        f"{city}, {state} - {pincode}",
+        f"Phone: {phone}",
+        f"Email: {email}",
     )
-    
-    # Title
-    elements.append(Paragraph("PAYMENT RECEIPT", title_style))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Gym details
+
+
+# ==============================================
+# 📄 RECEIPT CONTEXT
+# ==============================================
+
+def receipt_context(receipt):
+    """
+    Everything the renderers need, as plain strings.
+    Expects receipt.gym / member / payment loaded (select_related).
+    """
     gym = receipt.gym
-    gym_info = [
-        [Paragraph(f"<b>{gym.name}</b>", styles['Normal'])],
-        [gym.address],
-        [f"{gym.city}, {gym.state} - {gym.pincode}"],
-        [f"Phone: {gym.phone}"],
-        [f"Email: {gym.email}"],
-    ]
-    
-    gym_table = Table(gym_info, colWidths=[6*inch])
-    gym_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(gym_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Receipt details
-    receipt_info = [
-        ['Receipt Number:', receipt.receipt_number],
-        ['Date:', receipt.created_at.strftime('%d-%b-%Y')],
-    ]
-    
-    receipt_table = Table(receipt_info, colWidths=[2*inch, 4*inch])
-    receipt_table.setStyle(TableStyle([
-        ('FONTSIZE', (0, 0), (-1, -1), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-    ]))
-    elements.append(receipt_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Member & Payment details
-    payment = receipt.payment
     member = receipt.member
-    
-    # 🛡️ Safe Month Handling
-    month_display = payment.month if payment.month else "N/A"
-    
-    details_data = [
+    payment = receipt.payment
+    return {
+        'receipt_number': receipt.receipt_number,
+        'receipt_date': receipt.created_at.strftime('%d-%b-%Y'),
+        'gym_header': _gym_header_lines(
+            gym.name, gym.address, gym.city, gym.state, gym.pincode, gym.phone, gym.email
+        ),
+        'member_name': member.name,
+        'member_phone': member.phone,
+        # 🛡️ Changed ₹ to Rs. to prevent PDF Font Error
+        'amount': f"Rs. {payment.amount}",
+        'payment_method': payment.get_payment_method_display(),
+        'payment_date': payment.payment_date.strftime('%d-%b-%Y'),
+        # 🛡️ Safe Month Handling
+        'month': payment.month or "N/A",
+        'status': payment.get_status_display(),
+        'transaction_id': payment.transaction_id or '',
+    }
+
+
+def receipt_content_hash(ctx):
+    """Fingerprint of everything printed on the receipt; same hash = same PDF"""
+    payload = json.dumps(ctx, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _detail_rows(ctx):
+    rows = [
         ['Member Details', ''],
-        ['Name:', member.name],
-        ['Phone:', member.phone],
+        ['Name:', ctx['member_name']],
+        ['Phone:', ctx['member_phone']],
         ['', ''],
         ['Payment Details', ''],
-        # 🛡️ Changed ₹ to Rs. to prevent PDF Font Error
-        ['Amount:', f"Rs. {payment.amount}"], 
-        ['Payment Method:', payment.get_payment_method_display()],
-        ['Payment Date:', payment.payment_date.strftime('%d-%b-%Y')],
-        ['Month:', month_display],
-        ['Status:', payment.get_status_display()],
-    ]
-    
-    if payment.transaction_id:
-        details_data.append(['Transaction ID:', payment.transaction_id])
-    
-    details_table = Table(details_data, colWidths=[2*inch, 4*inch])
-    details_table.setStyle(TableStyle([
-        ('FONTSIZE', (0, 0), (-1, -1), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-        ('FONTNAME', (0, 4), (0, 4), 'Helvetica-Bold'),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#ECF0F1')),
-        ('BACKGROUND', (0, 4), (-1, 4), colors.HexColor('#ECF0F1')),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-    ]))
-    elements.append(details_table)
-    elements.append(Spacer(1, 0.5*inch))
-    
-    # Total amount (highlighted)
-    total_data = [
-        ['Total Amount Paid:', f"Rs. {payment.amount}"],
+        ['Amount:', ctx['amount']],
+        ['Payment Method:', ctx['payment_method']],
+        ['Payment Date:', ctx['payment_date']],
+        ['Month:', ctx['month']],
+        ['Status:', ctx['status']],
     ]
-    
-    total_table = Table(total_data, colWidths=[4*inch, 2*inch])
-    total_table.setStyle(TableStyle([
-        ('FONTSIZE', (0, 0), (-1, -1), 14),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#3498DB')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('PADDING', (0, 0), (-1, -1), 12),
-    ]))
-    elements.append(total_table)
-    elements.append(Spacer(1, 0.5*inch))
-    
-    # Footer
-    footer_text = Paragraph(
-        "<i>This is a computer-generated receipt. Thank you for your payment!</i>",
-        ParagraphStyle('Footer', parent=styles['Normal'], fontSize=9, alignment=TA_CENTER)
+    if ctx['transaction_id']:
+        rows.append(['Transaction ID:', ctx['transaction_id']])
+    return rows
+
+
+# ==============================================
+# 🧱 PLATYPUS ENGINE
+# ==============================================
+
+def render_receipt_platypus(ctx):
+    """Flowable layout (original receipt look), returns PDF bytes"""
+    styles = _styles()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+
+    header = ctx['gym_header']
+    gym_table = Table(
+        [[Paragraph(f"<b>{header[0]}</b>", styles['normal'])]] + [[line] for line in header[1:]],
+        colWidths=[6*inch]
     )
-    elements.append(footer_text)
-    
-    # Build PDF
-    try:
-        doc.build(elements)
-        pdf_content = buffer.getvalue()
-        buffer.close()
-        filename = f"receipt_{receipt.receipt_number}.pdf"
-        return ContentFile(pdf_content, filename)
-    except Exception as e:
-        print(f"PDF Build Error: {e}")
-        return None
\ No newline at end of file
+    gym_table.setStyle(GYM_TABLE_STYLE)
+
+    receipt_table = Table(
+        [['Receipt Number:', ctx['receipt_number']], ['Date:', ctx['receipt_date']]],
+        colWidths=[2*inch, 4*inch]
+    )
+    receipt_table.setStyle(RECEIPT_TABLE_STYLE)
+
+    details_table = Table(_detail_rows(ctx), colWidths=[2*inch, 4*inch])
+    details_table.setStyle(DETAILS_TABLE_STYLE)
+
+    total_table = Table([['Total Amount Paid:', ctx['amount']]], colWidths=[4*inch, 2*inch])
+    total_table.setStyle(TOTAL_TABLE_STYLE)
+
+    doc.build([
+        Paragraph("PAYMENT RECEIPT", styles['title']),
+        Spacer(1, 0.3*inch),
+        gym_table,
+        Spacer(1, 0.3*inch),
+        receipt_table,
+        Spacer(1, 0.3*inch),
+        details_table,
+        Spacer(1, 0.5*inch),
+        total_table,
+        Spacer(1, 0.5*inch),
+        Paragraph(f"<i>{FOOTER_TEXT}</i>", styles['footer']),
+    ])
+    return buffer.getvalue()
+
+
+# ==============================================
+# ⚡ CANVAS ENGINE (no layout pass)
+# ==============================================
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+LEFT = (PAGE_WIDTH - 6*inch) / 2
+RIGHT = LEFT + 6*inch
+CENTER = PAGE_WIDTH / 2
+ROW_HEIGHT = 22
+
+
+def draw_receipt(c, ctx):
+    """Draw one receipt on the current page of canvas `c`"""
+    y = PAGE_HEIGHT - 1.3*inch
+
+    c.setFillColor(TITLE_DARK)
+    c.setFont('Helvetica-Bold', 24)
+    c.drawCentredString(CENTER, y, "PAYMENT RECEIPT")
+    c.setFillColor(colors.black)
+    y -= 0.75*inch
+
+    header = ctx['gym_header']
+    c.setFont('Helvetica-Bold', 10)
+    c.drawCentredString(CENTER, y, header[0])
+    c.setFont('Helvetica', 10)
+    for line in header[1:]:
+        y -= 18
+        c.drawCentredString(CENTER, y, line)
+    y -= 0.5*inch
+
+    c.setFont('Helvetica', 11)
+    for label, value in (('Receipt Number:', ctx['receipt_number']), ('Date:', ctx['receipt_date'])):
+        c.drawString(LEFT, y, label)
+        c.drawRightString(RIGHT, y, value)
+        y -= ROW_HEIGHT
+    y -= 0.3*inch
+
+    for label, value in _detail_rows(ctx):
+        if label.endswith('Details'):
+            c.setFillColor(HEADER_GREY)
+            c.rect(LEFT, y - 6, 6*inch, ROW_HEIGHT, stroke=0, fill=1)
+            c.setFillColor(colors.black)
+            c.setFont('Helvetica-Bold', 11)
+            c.drawString(LEFT + 6, y, label)
+            c.setFont('Helvetica', 11)
+        elif label:
+            c.drawString(LEFT + 6, y, label)
+            c.drawRightString(RIGHT - 6, y, value)
+        y -= ROW_HEIGHT
+    y -= 0.4*inch
+
+    c.setFillColor(TOTAL_BLUE)
+    c.rect(LEFT, y - 14, 6*inch, 38, stroke=0, fill=1)
+    c.setFillColor(colors.white)
+    c.setFont('Helvetica-Bold', 14)
+    c.drawString(LEFT + 12, y, 'Total Amount Paid:')
+    c.drawRightString(RIGHT - 12, y, ctx['amount'])
+    c.setFillColor(colors.black)
+    y -= 0.9*inch
+
+    c.setFont('Helvetica-Oblique', 9)
+    c.drawCentredString(CENTER, y, FOOTER_TEXT)
+
+
+def render_receipt_canvas(ctx):
+    """Direct canvas drawing, returns PDF bytes"""
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    draw_receipt(c, ctx)
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def render_receipt_bytes(ctx, mode=None):
+    """Render a receipt context with the configured (or given) engine"""
+    mode = mode or getattr(settings, 'RECEIPT_RENDER_MODE', 'platypus')
+    if mode == 'canvas':
+        return render_receipt_canvas(ctx)
+    return render_receipt_platypus(ctx)
+
+
+def generate_receipt_pdf(receipt, mode=None):
+    """Generate PDF receipt"""
+    pdf_content = render_receipt_bytes(receipt_context(receipt), mode=mode)
+    return ContentFile(pdf_content, f"receipt_{receipt.receipt_number}.pdf")
@@ -6,19 +6,28 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser, FormParser
+from django.db import IntegrityError, transaction
+from django.http import FileResponse
+from django.urls import reverse
 from django.db.models import Sum, Count
 from datetime import date, timedelta
 from .models import Payment, Receipt
-from .serializers import PaymentSerializer, ReceiptSerializer
+from .serializers import (
+    PaymentSerializer, ReceiptSerializer, MembershipRenewalSerializer, BatchPaymentSerializer,
+    BatchReceiptSerializer, StatementReconcileSerializer
+)
+from .renewals import renew_membership
+from .tasks import queue_receipt_pdf, queue_receipt_pdfs
+from .ledger import refresh_member_ledgers
+from .files import serve_receipt_file
+from .utils import receipt_content_hash, receipt_context
+from .batch_receipts import MAX_BATCH_RECEIPTS, batch_payments, build_receipt_batch, ensure_receipts
+from .reconciliation import reconcile_statement, StatementFormatError
 from fitness.models import ActivityLog
-
-# Ensure utils exists, otherwise handle gracefully
-try:
-    from .utils import generate_receipt_pdf
-except ImportError:
-    # Fallback to prevent crash if utils.py is missing
-    def generate_receipt_pdf(receipt):
-        return None
+from reports.cache import invalidate_payment_dates
+from members.models import Member
+from members.serializers import MemberSerializer
 
 class PaymentListCreateView(generics.ListCreateAPIView):
     """List all payments or create new payment"""
@@ -34,10 +43,14 @@ class PaymentListCreateView(generics.ListCreateAPIView):
             if member_id:
                 queryset = queryset.filter(member_id=member_id)
             
-            # Filter by month
+            # Filter by month ('2025-01' or 'January 2025' -> indexed billing_period)
             month = self.request.query_params.get('month')
             if month:
-                queryset = queryset.filter(month=month)
+                billing_period = Payment.parse_month(month)
+                if billing_period:
+                    queryset = queryset.filter(billing_period=billing_period)
+                else:
+                    queryset = queryset.filter(month=month)
             
             # Filter by date range
             start_date = self.request.query_params.get('start_date')
@@ -48,17 +61,25 @@ class PaymentListCreateView(generics.ListCreateAPIView):
             if end_date:
                 queryset = queryset.filter(payment_date__lte=end_date)
             
+            # Filter by statement reconciliation state
+            reconciled = self.request.query_params.get('reconciled')
+            if reconciled in ('true', 'false'):
+                queryset = queryset.filter(reconciled_at__isnull=(reconciled == 'false'))
+            
             return queryset
         except Exception as e:
             return Payment.objects.none() # Return empty list on error
     
     def perform_create(self, serializer):
-        try:
+        # Payment + ledger succeed or fail together; errors here must surface
+        with transaction.atomic():
             payment = serializer.save(
                 gym=self.request.user.gym,
                 created_by=self.request.user
             )
-            
+            refresh_member_ledgers([payment.member_id])
+        
+        try:
             # Log activity safely
             ip = self.request.META.get('REMOTE_ADDR')
             ActivityLog.objects.create(
@@ -73,70 +94,307 @@ class PaymentListCreateView(generics.ListCreateAPIView):
             pass
 
 
+class BatchPaymentCreateView(APIView):
+    """
+    Record many payments at once (end-of-day cash reconciliation).
+    One member validation query, one bulk insert, one summary log.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        gym = request.user.gym
+        serializer = BatchPaymentSerializer(data=request.data, context={'gym': gym})
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['payments']
+        
+        payments = [
+            Payment(gym=gym, created_by=request.user, member_id=item.pop('member'), **item)
+            for item in items
+        ]
+        # bulk_create skips save(), so derive billing periods here
+        for payment in payments:
+            payment.fill_billing_period()
+        
+        with transaction.atomic():
+            Payment.objects.bulk_create(payments)
+            refresh_member_ledgers(payment.member_id for payment in payments)
+            # bulk_create sends no signals -> drop cached reports for these months ourselves
+            payment_dates = {payment.payment_date for payment in payments}
+            transaction.on_commit(lambda: invalidate_payment_dates(gym.pk, payment_dates))
+            
+            receipts = []
+            if serializer.validated_data['generate_receipts']:
+                paid = [payment for payment in payments if payment.status == 'PAID']
+                numbers = Receipt.generate_receipt_numbers(gym, len(paid))
+                receipts = Receipt.objects.bulk_create([
+                    Receipt(payment=payment, gym=gym, member_id=payment.member_id, receipt_number=number)
+                    for payment, number in zip(paid, numbers)
+                ])
+                queue_receipt_pdfs(receipts)
+            
+            total = sum(payment.amount for payment in payments)
+            ActivityLog.objects.create(
+                user=request.user,
+                gym=gym,
+                action='PAYMENT_ADD',
+                description=f'Batch payments recorded: {len(payments)} payments, ₹{total}',
+                ip_address=request.META.get('REMOTE_ADDR')
+            )
+        
+        return Response({
+            'created': len(payments),
+            'total_amount': float(total),
+            'payment_ids': [str(payment.id) for payment in payments],
+            'receipts': [
+                {'payment': str(receipt.payment_id), 'receipt_number': receipt.receipt_number}
+                for receipt in receipts
+            ],
+        }, status=status.HTTP_201_CREATED)
+
+
+class StatementReconcileView(APIView):
+    """
+    Upload a bank / UPI statement CSV and auto-tick matching payments.
+    Form fields: file, date_window (days, default 2), since (YYYY-MM-DD), dry_run
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = (MultiPartParser, FormParser)
+    
+    def post(self, request):
+        statement = request.FILES.get('file')
+        if not statement:
+            return Response({'error': 'Statement CSV file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = StatementReconcileSerializer(data={
+            key: value for key, value in request.data.items() if key != 'file' and value != ''
+        })
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        options = serializer.validated_data
+        try:
+            result = reconcile_statement(
+                request.user.gym,
+                statement.file,
+                date_window_days=max(0, min(options['date_window'], 7)),
+                since=options.get('since'),
+                dry_run=options['dry_run'],
+            )
+        except StatementFormatError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(result)
+
+
 class PaymentDetailView(generics.RetrieveUpdateDestroyAPIView):
-    """Get, update or delete a payment"""
+    """Get, update or delete a payment (keeps member ledgers in sync)"""
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
         return Payment.objects.filter(gym=self.request.user.gym)
+    
+    def perform_update(self, serializer):
+        previous_member_id = serializer.instance.member_id
+        with transaction.atomic():
+            payment = serializer.save()
+            # Member may have been changed -> refresh both sides
+            refresh_member_ledgers([previous_member_id, payment.member_id])
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            member_id = instance.member_id
+            instance.delete()
+            refresh_member_ledgers([member_id])
 
 
-class GenerateReceiptView(APIView):
-    """Generate PDF receipt for a payment (Safe Mode)"""
+class MembershipRenewalView(APIView):
+    """
+    Renew a membership in one call:
+    payment + end date extension + receipt, all in one transaction.
+    """
     permission_classes = [IsAuthenticated]
     
-    def post(self, request, payment_id):
+    def post(self, request):
+        gym = request.user.gym
+        serializer = MembershipRenewalSerializer(data=request.data, context={'gym': gym})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
         try:
-            payment = Payment.objects.get(id=payment_id, gym=request.user.gym)
-            
-            # Check if receipt already exists
-            if hasattr(payment, 'receipt'):
-                receipt = payment.receipt
-            else:
-                # Generate receipt number
-                receipt_number = Receipt.generate_receipt_number(request.user.gym)
-                
-                receipt = Receipt.objects.create(
-                    payment=payment,
-                    gym=request.user.gym,
-                    member=payment.member,
-                    receipt_number=receipt_number
-                )
-            
-            # 📄 PDF Generation (Risky Process - Wrapped in Try/Except)
-            try:
-                pdf_file = generate_receipt_pdf(receipt)
-                if pdf_file:
-                    receipt.receipt_pdf = pdf_file
-                    receipt.save()
-                else:
-                    # PDF fail hua toh bhi Data return karo
-                    print("PDF Generation returned None")
-            except Exception as pdf_error:
-                print(f"PDF Error: {pdf_error}")
-            
-            # Log activity
-            ActivityLog.objects.create(
+            member, payment, receipt = renew_membership(
+                gym=gym,
                 user=request.user,
-                gym=request.user.gym,
-                action='RECEIPT_GENERATED',
-                description=f'Receipt generated: {receipt.receipt_number}'
+                member_id=data['member'],
+                plan=data['plan'],
+                amount=data.get('amount'),
+                payment_method=data['payment_method'],
+                transaction_id=data.get('transaction_id') or None,
+                notes=data.get('notes'),
+                generate_receipt=data['generate_receipt'],
+                ip_address=request.META.get('REMOTE_ADDR')
             )
-            
-            serializer = ReceiptSerializer(receipt)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        except Member.DoesNotExist:
+            return Response({'error': 'Member not found'}, status=status.HTTP_404_NOT_FOUND)
         
+        return Response({
+            'member': MemberSerializer(member).data,
+            'payment': PaymentSerializer(payment).data,
+            'receipt': ReceiptSerializer(receipt).data if receipt else None,
+        }, status=status.HTTP_201_CREATED)
+
+
+class GenerateReceiptView(APIView):
+    """
+    Create the receipt for a payment and render its PDF in the background.
+    Already-rendered receipts come back immediately (200); otherwise
+    202 + status_url to poll while the worker pool builds the PDF.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, payment_id):
+        try:
+            payment = Payment.objects.select_related('member').get(id=payment_id, gym=request.user.gym)
         except Payment.DoesNotExist:
             return Response(
                 {'error': 'Payment not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
-        except Exception as e:
+        
+        receipt = Receipt.objects.select_related('gym').filter(payment=payment).first()
+        created = False
+        if receipt is None:
+            try:
+                # Number + row in one transaction so a failed insert doesn't burn a number
+                with transaction.atomic():
+                    receipt = Receipt.objects.create(
+                        payment=payment,
+                        gym=request.user.gym,
+                        member=payment.member,
+                        receipt_number=Receipt.generate_receipt_number(request.user.gym)
+                    )
+                    
+                    ActivityLog.objects.create(
+                        user=request.user,
+                        gym=request.user.gym,
+                        action='RECEIPT_GENERATED',
+                        description=f'Receipt generated: {receipt.receipt_number}'
+                    )
+                created = True
+            except IntegrityError:
+                # 🔁 A concurrent generate / batch call created it first (OneToOne payment) -> use theirs
+                receipt = Receipt.objects.select_related('gym').get(payment=payment)
+        receipt.payment = payment
+        receipt.member = payment.member
+        
+        # ✅ Rendered and nothing printed on it changed -> serve as-is, no re-render
+        if (receipt.pdf_status == 'READY' and receipt.receipt_pdf
+                and receipt.content_hash == receipt_content_hash(receipt_context(receipt))):
+            serializer = ReceiptSerializer(receipt)
+            return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+        
+        if receipt.pdf_status in ('FAILED', 'READY'):
+            # Failed before, or payment / member / gym details changed -> render again
+            Receipt.objects.filter(pk=receipt.pk).update(pdf_status='PENDING', pdf_error=None)
+            receipt.pdf_status = 'PENDING'
+        
+        queue_receipt_pdf(receipt)
+        
+        return Response({
+            'receipt': ReceiptSerializer(receipt).data,
+            'status_url': reverse('payments:receipt-status', kwargs={'pk': receipt.pk}),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class ReceiptStatusView(APIView):
+    """Poll receipt PDF rendering status"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        try:
+            receipt = Receipt.objects.get(pk=pk, gym=request.user.gym)
+        except Receipt.DoesNotExist:
+            return Response({'error': 'Receipt not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'id': receipt.id,
+            'receipt_number': receipt.receipt_number,
+            'pdf_status': receipt.pdf_status,
+            'pdf_error': receipt.pdf_error,
+            'receipt_pdf': request.build_absolute_uri(receipt.receipt_pdf.url) if receipt.receipt_pdf else None,
+            'pdf_rendered_at': receipt.pdf_rendered_at,
+        })
+
+
+class ReceiptDownloadView(APIView):
+    """Download receipt PDF (ETag / 304, Range / 206, optional X-Accel-Redirect)"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        try:
+            receipt = Receipt.objects.get(pk=pk, gym=request.user.gym)
+        except Receipt.DoesNotExist:
+            return Response({'error': 'Receipt not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if receipt.pdf_status != 'READY' or not receipt.receipt_pdf:
             return Response(
-                {'error': f'Failed to generate receipt: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'Receipt PDF not ready', 'pdf_status': receipt.pdf_status},
+                status=status.HTTP_409_CONFLICT
             )
+        
+        try:
+            return serve_receipt_file(request, receipt)
+        except FileNotFoundError:
+            return Response({'error': 'Receipt file missing, generate it again'}, status=status.HTTP_404_NOT_FOUND)
+
+
+class BatchReceiptView(APIView):
+    """
+    Month-end printing: receipts for many payments as one merged PDF or a ZIP.
+    Body: {"payment_ids": [...]} or {"start_date": ..., "end_date": ...}, "format": "pdf" | "zip"
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        serializer = BatchReceiptSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        gym = request.user.gym
+        payments = list(batch_payments(
+            gym,
+            payment_ids=data.get('payment_ids'),
+            start_date=data.get('start_date'),
+            end_date=data.get('end_date'),
+        )[:MAX_BATCH_RECEIPTS + 1])
+        
+        if not payments:
+            return Response({'error': 'No payments found'}, status=status.HTTP_404_NOT_FOUND)
+        if len(payments) > MAX_BATCH_RECEIPTS:
+            return Response(
+                {'error': f'More than {MAX_BATCH_RECEIPTS} payments, narrow the date range'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        receipts, created = ensure_receipts(gym, payments)
+        if created:
+            ActivityLog.objects.create(
+                user=request.user,
+                gym=gym,
+                action='RECEIPT_GENERATED',
+                description=f'Batch receipts generated: {created} new of {len(receipts)}'
+            )
+        
+        fmt = data['format']
+        output = build_receipt_batch(receipts, fmt=fmt)
+        filename = f"receipts_{date.today().strftime('%Y%m%d')}.{fmt}"
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=filename,
+            content_type='application/zip' if fmt == 'zip' else 'application/pdf'
+        )
 
 
 class ReceiptListView(generics.ListAPIView):
@@ -2,7 +2,7 @@
 Reminders Admin
 """
 from django.contrib import admin
-from .models import Reminder
+from .models import Reminder, ReminderTemplate, ReminderRunCheckpoint
 
 
 @admin.register(Reminder)
@@ -11,4 +11,17 @@ class ReminderAdmin(admin.ModelAdmin):
     list_filter = ['status', 'reminder_type', 'gym', 'created_at']
     search_fields = ['member__name', 'member__phone', 'message']
     date_hierarchy = 'created_at'
-    readonly_fields = ['created_at']
\ No newline at end of file
+    readonly_fields = ['created_at']
+
+@admin.register(ReminderTemplate)
+class ReminderTemplateAdmin(admin.ModelAdmin):
+    list_display = ['gym', 'reminder_type', 'updated_at']
+    list_filter = ['reminder_type']
+    search_fields = ['gym__name', 'body']
+
+
+@admin.register(ReminderRunCheckpoint)
+class ReminderRunCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['run_date', 'gym', 'shard', 'status', 'reminders_created', 'messages_queued', 'duration_ms']
+    list_filter = ['status', 'run_date']
+    readonly_fields = ['finished_at']
@@ -0,0 +1,66 @@
+"""
+Reminder Generation
+Set-based: one query for candidates, one for reminders that already
+exist, one bulk insert for the rest, and a count of the rows that
+actually went in (it feeds ReminderRunCheckpoint.reminders_created). The conditional unique constraint
+(uniq_live_reminder) is what actually guarantees no duplicates; the
+pre-fetch just avoids sending rows we know would be ignored.
+Rows carry a template reference, not text (see messages.py).
+"""
+from datetime import date, timedelta
+
+from members.models import Member
+from .messages import get_template
+from .models import Reminder
+
+LIVE_STATUSES = ['PENDING', 'SENT']
+INSERT_BATCH_SIZE = 500
+
+
+def generate_expiring_reminders(gym, user=None, days_ahead=7, today=None):
+    """MEMBERSHIP_EXPIRING reminders for active members ending within `days_ahead` days. Returns count created."""
+    today = today or date.today()
+    until = today + timedelta(days=days_ahead)
+
+    candidates = Member.objects.filter(
+        gym=gym,
+        is_active=True,
+        membership_end_date__gte=today,
+        membership_end_date__lte=until
+    ).order_by().values_list('id', 'membership_end_date', 'membership_fee')
+
+    existing = set(
+        Reminder.objects.filter(
+            gym=gym,
+            reminder_type='MEMBERSHIP_EXPIRING',
+            due_date__gte=today,
+            due_date__lte=until,
+            status__in=LIVE_STATUSES
+        ).values_list('member_id', 'due_date')
+    )
+
+    # Text is rendered from the template at send time; rows only point at it
+    template = get_template(gym, 'MEMBERSHIP_EXPIRING')
+
+    new_reminders = [
+        Reminder(
+            gym=gym,
+            member_id=member_id,
+            reminder_type='MEMBERSHIP_EXPIRING',
+            template=template,
+            due_date=end_date,
+            amount=fee,
+            created_by=user,
+        )
+        for member_id, end_date, fee in candidates
+        if (member_id, end_date) not in existing
+    ]
+
+    # ignore_conflicts: a concurrent run inserting the same key is skipped by the constraint, not an error
+    Reminder.objects.bulk_create(new_reminders, batch_size=INSERT_BATCH_SIZE, ignore_conflicts=True)
+    # Skipped rows don't count: ids are generated client-side, so ours are the ones that exist
+    ids = [reminder.pk for reminder in new_reminders]
+    return sum(
+        Reminder.objects.filter(pk__in=ids[start:start + INSERT_BATCH_SIZE]).count()
+        for start in range(0, len(ids), INSERT_BATCH_SIZE)
+    )
@@ -0,0 +1,71 @@
+"""
+Daily reminder scheduler for gyms with auto reminders enabled.
+    python manage.py schedule_reminders                      # all shards, one process
+    python manage.py schedule_reminders --shards 4           # 4 worker processes, one shard each
+    python manage.py schedule_reminders --shards 4 --shard 2 # only shard 2 (one cron entry per box)
+
+Re-running the same day resumes: gyms already checkpointed DONE are skipped.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from reminders.scheduler import run_shard
+
+
+def _run_shard(args):
+    return run_shard(*args)
+
+
+class Command(BaseCommand):
+    help = 'Generate expiry reminders and queue WhatsApp sends for every opted-in gym'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, default=1, help='Number of shards (= worker processes)')
+        parser.add_argument('--shard', type=int, help='Run only this shard (0-based)')
+        parser.add_argument('--date', help='Run date YYYY-MM-DD (default: today)')
+        parser.add_argument('--days-ahead', type=int, default=7, help='Remind memberships ending within N days')
+
+    def handle(self, *args, **options):
+        shard_count = options['shards']
+        if shard_count < 1:
+            raise CommandError('--shards must be at least 1')
+        if options['shard'] is not None and not 0 <= options['shard'] < shard_count:
+            raise CommandError(f"--shard must be between 0 and {shard_count - 1}")
+        try:
+            run_date = date.fromisoformat(options['date']) if options['date'] else date.today()
+        except ValueError:
+            raise CommandError('--date must look like 2025-01-31')
+
+        shards = [options['shard']] if options['shard'] is not None else list(range(shard_count))
+        jobs = [(shard, shard_count, run_date, options['days_ahead']) for shard in shards]
+
+        if len(jobs) == 1:
+            results = [_run_shard(jobs[0])]
+        else:
+            # Forked children must open their own DB connections
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=len(jobs), mp_context=context) as pool:
+                results = list(pool.map(_run_shard, jobs))
+
+        self.stdout.write(
+            f"Reminder run {run_date} ({shard_count} shard(s))\n"
+            f"{'shard':>6}{'gyms':>7}{'resumed':>9}{'failed':>8}{'created':>9}{'queued':>8}{'seconds':>9}"
+        )
+        for stats in results:
+            self.stdout.write(
+                f"{stats['shard']:>6}{stats['gyms']:>7}{stats['skipped']:>9}{stats['failed']:>8}"
+                f"{stats['created']:>9}{stats['queued']:>8}{stats['seconds']:>9.2f}"
+            )
+
+        failed = sum(stats['failed'] for stats in results)
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} gym(s) failed; re-run to retry them"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Created {sum(s['created'] for s in results)}, queued {sum(s['queued'] for s in results)}"
+            ))
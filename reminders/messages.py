@@ -0,0 +1,176 @@
+"""
+Reminder Messages
+Reminders store a template + a few params instead of ~400 bytes of text
+per row; the text is rendered when the message is actually sent, so a
+template edit also changes reminders that are still waiting.
+
+Templates use str.format placeholders:
+    {name} {phone} {due_date} {end_date} {days_left} {amount} {fee}
+    {gym_name} {gym_phone}
+plus any key stored in Reminder.params.
+
+A template body is parsed once per (body, gym name, gym phone) and the
+gym fields are substituted at compile time, so rendering a batch is just
+string joins of the per-member pieces.
+
+Format specs are allowed ({fee:>8}), but a saved template must render for
+every member, including ones without an amount (blank); check_template()
+proves that by rendering sample members. Rendering errors raise
+TemplateError, which callers handle per reminder.
+"""
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+from string import Formatter
+
+from .models import ReminderTemplate
+
+GYM_FIELDS = ('gym_name', 'gym_phone')
+MEMBER_FIELDS = ('name', 'phone', 'due_date', 'end_date', 'days_left', 'amount', 'fee')
+ALLOWED_FIELDS = set(GYM_FIELDS + MEMBER_FIELDS)
+
+DEFAULT_BODIES = {
+    'MEMBERSHIP_EXPIRING': """Dear {name},
+
+Your gym membership at {gym_name} is expiring in {days_left} days on {end_date}.
+
+Please renew your membership to continue enjoying our services.
+
+Membership Fee: ₹{fee}
+
+Contact us: {gym_phone}
+
+Thank you!
+{gym_name}""",
+    'PAYMENT_DUE': """Dear {name},
+
+This is a reminder that your payment of ₹{amount} at {gym_name} is due on {due_date}.
+
+Contact us: {gym_phone}
+
+Thank you!
+{gym_name}""",
+    'RENEWAL': """Dear {name},
+
+We miss you at {gym_name}! Renew your membership today and get back on track.
+
+Contact us: {gym_phone}
+
+Thank you!
+{gym_name}""",
+}
+
+
+class TemplateError(ValueError):
+    """A template body that can't be rendered (bad braces / format spec)"""
+
+
+def template_fields(body):
+    """Placeholder names used in a template body. Raises ValueError on malformed braces."""
+    return {field for _, field, _, _ in Formatter().parse(body) if field is not None}
+
+
+def get_template(gym, reminder_type):
+    """The gym's template for a type, created from the default on first use"""
+    template, _ = ReminderTemplate.objects.get_or_create(
+        gym=gym,
+        reminder_type=reminder_type,
+        defaults={'body': DEFAULT_BODIES[reminder_type]}
+    )
+    return template
+
+
+@lru_cache(maxsize=512)
+def compile_template(body, gym_name='', gym_phone=''):
+    """
+    Tuple of (literal, field, format_spec) pieces with the gym fields already
+    folded into the literals. Keyed on the text itself, so edits need no invalidation.
+    """
+    constants = {'gym_name': gym_name, 'gym_phone': gym_phone}
+    pieces = []
+    literal = ''
+    for text, field, spec, conversion in Formatter().parse(body):
+        literal += text
+        if field is None:
+            continue
+        if field in constants:
+            literal += format(constants[field], spec or '')
+            continue
+        pieces.append((literal, field, spec or ''))
+        literal = ''
+    pieces.append((literal, None, ''))
+    return tuple(pieces)
+
+
+def _context(reminder, today):
+    member = reminder.member
+    due = reminder.due_date.strftime('%d-%b-%Y')
+    amount = reminder.amount if reminder.amount is not None else ''
+    context = {
+        'name': member.name,
+        'phone': member.phone,
+        'due_date': due,
+        'end_date': due,
+        'days_left': max((reminder.due_date - today).days, 0),
+        'amount': amount,
+        'fee': amount,
+    }
+    context.update(reminder.params or {})
+    return context
+
+
+def render_body(body, context, gym_name='', gym_phone=''):
+    """Render a template body. Raises TemplateError instead of ValueError / TypeError / KeyError."""
+    try:
+        parts = []
+        for literal, field, spec in compile_template(body, gym_name, gym_phone):
+            parts.append(literal)
+            if field is not None:
+                value = context.get(field, '')
+                parts.append(format(value, spec) if spec else str(value))
+        return ''.join(parts)
+    except (ValueError, TypeError, KeyError, IndexError) as e:
+        raise TemplateError(str(e)) from e
+
+
+def render_reminder(reminder, today=None):
+    """Text of one reminder (member, gym and template should be preloaded). Raises TemplateError."""
+    if not reminder.template_id:
+        return reminder.message
+    today = today or date.today()
+    gym = reminder.gym
+    return render_body(reminder.template.body, _context(reminder, today), gym.name, gym.phone)
+
+
+def render_reminders(reminders, today=None):
+    """
+    ({reminder.pk: text}, {reminder.pk: TemplateError}) for a batch, so one
+    broken template doesn't fail the others; use select_related('member', 'gym', 'template')
+    """
+    today = today or date.today()
+    texts, errors = {}, {}
+    for reminder in reminders:
+        try:
+            texts[reminder.pk] = render_reminder(reminder, today)
+        except TemplateError as e:
+            errors[reminder.pk] = e
+    return texts, errors
+
+
+# Members a saved template must work for: with and without an amount
+SAMPLE_CONTEXTS = (
+    {'name': 'Rahul Sharma', 'phone': '9876543210', 'due_date': '05-Jan-2026', 'end_date': '05-Jan-2026',
+     'days_left': 3, 'amount': Decimal('1500.00'), 'fee': Decimal('1500.00')},
+    {'name': 'Rahul Sharma', 'phone': '9876543210', 'due_date': '05-Jan-2026', 'end_date': '05-Jan-2026',
+     'days_left': 0, 'amount': '', 'fee': ''},
+)
+
+
+def check_template(body, gym_name='Sample Gym', gym_phone='9000000000'):
+    """Raise TemplateError unless body renders for every sample member"""
+    for context in SAMPLE_CONTEXTS:
+        try:
+            render_body(body, context, gym_name, gym_phone)
+        except TemplateError as e:
+            blank = ' when the amount is blank' if context['amount'] == '' else ''
+            raise TemplateError(f"Template can't be rendered{blank}: {e}") from e
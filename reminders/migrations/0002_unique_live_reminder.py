@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def dedupe_live_reminders(apps, schema_editor):
+    """Keep one PENDING/SENT reminder per key (SENT first, then oldest); mark the rest FAILED"""
+    Reminder = apps.get_model('reminders', 'Reminder')
+    seen = set()
+    duplicates = []
+    live = Reminder.objects.filter(status__in=['PENDING', 'SENT']).order_by(
+        'member_id', 'reminder_type', 'due_date', '-status', 'created_at'
+    ).values_list('pk', 'member_id', 'reminder_type', 'due_date')
+    for pk, member_id, reminder_type, due_date in live.iterator():
+        key = (member_id, reminder_type, due_date)
+        if key in seen:
+            duplicates.append(pk)
+        else:
+            seen.add(key)
+    for start in range(0, len(duplicates), 500):
+        Reminder.objects.filter(pk__in=duplicates[start:start + 500]).update(
+            status='FAILED', error_message='Duplicate reminder'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness', '0001_initial'),
+        ('members', '0003_member_visit_streaks'),
+        ('reminders', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_live_reminders, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reminder',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['PENDING', 'SENT'])), fields=('member', 'reminder_type', 'due_date'), name='uniq_live_reminder'),
+        ),
+    ]
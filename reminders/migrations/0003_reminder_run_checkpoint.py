@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:06
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness', '0001_initial'),
+        ('reminders', '0002_unique_live_reminder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderRunCheckpoint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('run_date', models.DateField()),
+                ('shard', models.PositiveIntegerField()),
+                ('shard_count', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('DONE', 'Done'), ('FAILED', 'Failed')], max_length=10)),
+                ('reminders_created', models.PositiveIntegerField(default=0)),
+                ('messages_queued', models.PositiveIntegerField(default=0)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(auto_now=True)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminder_checkpoints', to='fitness.gym')),
+            ],
+            options={
+                'db_table': 'reminder_run_checkpoints',
+                'ordering': ['-run_date', 'shard'],
+                'constraints': [models.UniqueConstraint(fields=('run_date', 'gym'), name='uniq_reminder_run_gym')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:07
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness', '0001_initial'),
+        ('reminders', '0003_reminder_run_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminder',
+            name='params',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='reminder',
+            name='message',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.CreateModel(
+            name='ReminderTemplate',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('reminder_type', models.CharField(choices=[('PAYMENT_DUE', 'Payment Due'), ('MEMBERSHIP_EXPIRING', 'Membership Expiring'), ('RENEWAL', 'Renewal Reminder')], max_length=30)),
+                ('body', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminder_templates', to='fitness.gym')),
+            ],
+            options={
+                'db_table': 'reminder_templates',
+                'ordering': ['reminder_type'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reminder',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='reminders', to='reminders.remindertemplate'),
+        ),
+        migrations.AddConstraint(
+            model_name='remindertemplate',
+            constraint=models.UniqueConstraint(fields=('gym', 'reminder_type'), name='uniq_gym_reminder_template'),
+        ),
+    ]
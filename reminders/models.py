@@ -28,7 +28,12 @@ class Reminder(models.Model):
     member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='reminders')
     
     reminder_type = models.CharField(max_length=30, choices=TYPE_CHOICES)
-    message = models.TextField()
+    # Either a literal message (manual reminders) or a template + params rendered at send time
+    message = models.TextField(blank=True, default='')
+    template = models.ForeignKey(
+        'ReminderTemplate', on_delete=models.RESTRICT, null=True, blank=True, related_name='reminders'
+    )
+    params = models.JSONField(default=dict, blank=True)
     due_date = models.DateField()
     amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     
@@ -49,6 +54,66 @@ class Reminder(models.Model):
             models.Index(fields=['gym', 'status']),
             models.Index(fields=['member', '-created_at']),
         ]
+        constraints = [
+            # One live reminder per member / type / due date; FAILED ones may be retried
+            models.UniqueConstraint(
+                fields=['member', 'reminder_type', 'due_date'],
+                condition=models.Q(status__in=['PENDING', 'SENT']),
+                name='uniq_live_reminder',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_reminder_type_display()} - {self.member.name}"
+
+
+class ReminderTemplate(models.Model):
+    """Per-gym message text for a reminder type (see reminders/messages.py for placeholders)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='reminder_templates')
+    reminder_type = models.CharField(max_length=30, choices=Reminder.TYPE_CHOICES)
+    body = models.TextField()
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'reminder_templates'
+        ordering = ['reminder_type']
+        constraints = [
+            models.UniqueConstraint(fields=['gym', 'reminder_type'], name='uniq_gym_reminder_template'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_reminder_type_display()} template - {self.gym.name}"
+
+
+class ReminderRunCheckpoint(models.Model):
+    """One row per gym per scheduler day; a DONE row means the gym is skipped on resume"""
+    STATUS_CHOICES = [
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    run_date = models.DateField()
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='reminder_checkpoints')
+    shard = models.PositiveIntegerField()
+    shard_count = models.PositiveIntegerField()
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    reminders_created = models.PositiveIntegerField(default=0)
+    messages_queued = models.PositiveIntegerField(default=0)
+    duration_ms = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    finished_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'reminder_run_checkpoints'
+        ordering = ['-run_date', 'shard']
+        constraints = [
+            models.UniqueConstraint(fields=['run_date', 'gym'], name='uniq_reminder_run_gym'),
+        ]
     
     def __str__(self):
-        return f"{self.get_reminder_type_display()} - {self.member.name}"
\ No newline at end of file
+        return f"{self.run_date} shard {self.shard}/{self.shard_count} - {self.status}"
@@ -0,0 +1,100 @@
+"""
+Reminder Scheduler
+Daily pass over every gym with auto_reminders_enabled:
+generate expiry reminders, then queue them on the WhatsApp outbox.
+
+Gyms are split into N shards by crc32(gym id) % N (stable across
+processes and restarts, unlike hash()), so N workers never touch the same
+gym. Each finished gym writes a ReminderRunCheckpoint in the same
+transaction as its reminders; a crashed or re-run day skips DONE gyms
+and retries FAILED ones.
+"""
+import logging
+import time
+import zlib
+from datetime import date
+
+from django.db import transaction
+
+from fitness.models import Gym
+from whatsapp.outbox import enqueue_reminders
+from .generation import generate_expiring_reminders
+from .models import Reminder, ReminderRunCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(gym_id, shard_count):
+    return zlib.crc32(str(gym_id).encode()) % shard_count
+
+
+def shard_gym_ids(shard, shard_count):
+    """Opted-in gym ids belonging to this shard"""
+    gym_ids = Gym.objects.filter(auto_reminders_enabled=True).order_by('pk').values_list('pk', flat=True)
+    return [gym_id for gym_id in gym_ids if shard_of(gym_id, shard_count) == shard]
+
+
+def process_gym(gym, run_date, shard, shard_count, days_ahead=7):
+    """Generate + enqueue for one gym and checkpoint it, all or nothing. Returns the checkpoint."""
+    started = time.perf_counter()
+    with transaction.atomic():
+        created = generate_expiring_reminders(gym, days_ahead=days_ahead, today=run_date)
+        queued = 0
+        if gym.whatsapp_enabled:
+            pending = Reminder.objects.filter(gym=gym, status='PENDING').select_related('member')
+            queued = len(enqueue_reminders(pending))
+        checkpoint, _ = ReminderRunCheckpoint.objects.update_or_create(
+            run_date=run_date,
+            gym=gym,
+            defaults={
+                'shard': shard,
+                'shard_count': shard_count,
+                'status': 'DONE',
+                'reminders_created': created,
+                'messages_queued': queued,
+                'duration_ms': int((time.perf_counter() - started) * 1000),
+                'error': None,
+            }
+        )
+    return checkpoint
+
+
+def run_shard(shard, shard_count, run_date=None, days_ahead=7):
+    """Process every not-yet-DONE gym of a shard. Returns per-shard stats."""
+    run_date = run_date or date.today()
+    started = time.perf_counter()
+    stats = {'shard': shard, 'gyms': 0, 'skipped': 0, 'failed': 0, 'created': 0, 'queued': 0}
+
+    gym_ids = shard_gym_ids(shard, shard_count)
+    done = set(
+        ReminderRunCheckpoint.objects.filter(run_date=run_date, gym_id__in=gym_ids, status='DONE')
+        .values_list('gym_id', flat=True)
+    )
+    stats['skipped'] = len(done)
+
+    for gym in Gym.objects.filter(pk__in=[gym_id for gym_id in gym_ids if gym_id not in done]).iterator():
+        gym_started = time.perf_counter()
+        try:
+            checkpoint = process_gym(gym, run_date, shard, shard_count, days_ahead=days_ahead)
+        except Exception as e:
+            # One bad gym must not block the rest of the shard
+            logger.exception("Reminder run failed for gym %s", gym.pk)
+            ReminderRunCheckpoint.objects.update_or_create(
+                run_date=run_date,
+                gym=gym,
+                defaults={
+                    'shard': shard,
+                    'shard_count': shard_count,
+                    'status': 'FAILED',
+                    'duration_ms': int((time.perf_counter() - gym_started) * 1000),
+                    'error': str(e)[:1000],
+                }
+            )
+            stats['failed'] += 1
+            continue
+        stats['gyms'] += 1
+        stats['created'] += checkpoint.reminders_created
+        stats['queued'] += checkpoint.messages_queued
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
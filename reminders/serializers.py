@@ -3,7 +3,8 @@ Reminders Serializers
 Optimized for Reliability & Data Integrity
 """
 from rest_framework import serializers
-from .models import Reminder
+from .messages import ALLOWED_FIELDS, TemplateError, check_template, render_reminder, template_fields
+from .models import Reminder, ReminderTemplate
 
 class ReminderSerializer(serializers.ModelSerializer):
     member_name = serializers.CharField(source='member.name', read_only=True)
@@ -19,6 +20,24 @@ class ReminderSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'status', 'sent_at', 'delivery_status', 'error_message', 'created_at']
 
+    def validate(self, attrs):
+        # Manual reminders have no template, so they need their own text
+        message = attrs.get('message', getattr(self.instance, 'message', ''))
+        if not message and not getattr(self.instance, 'template_id', None):
+            raise serializers.ValidationError({'message': 'This field may not be blank.'})
+        return attrs
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.template_id:
+            try:
+                data['message'] = render_reminder(instance)
+            except TemplateError as e:
+                # A broken template must not take the whole list down
+                data['message'] = ''
+                data['render_error'] = str(e)
+        return data
+
     # 🛡️ LOGIC: Amount Negative nahi hona chahiye
     def validate_amount(self, value):
         if value is not None and value < 0:
@@ -40,4 +59,28 @@ class ReminderSerializer(serializers.ModelSerializer):
             if field in data and data[field] == "":
                 data[field] = None
             
-        return super().to_internal_value(data)
\ No newline at end of file
+        return super().to_internal_value(data)
+
+
+class ReminderTemplateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReminderTemplate
+        fields = ['id', 'reminder_type', 'body', 'updated_at']
+        read_only_fields = ['id', 'reminder_type', 'updated_at']
+
+    def validate_body(self, value):
+        try:
+            unknown = template_fields(value) - ALLOWED_FIELDS
+        except ValueError:
+            raise serializers.ValidationError("Unbalanced { } in template. Use {{ and }} for literal braces.")
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown placeholder(s): {', '.join(sorted(unknown))}. "
+                f"Allowed: {', '.join(sorted(ALLOWED_FIELDS))}"
+            )
+        # Format specs ({fee:.2f}) only fail on real values, so render sample members
+        try:
+            check_template(value)
+        except TemplateError as e:
+            raise serializers.ValidationError(str(e))
+        return value
@@ -1,3 +1,169 @@
+"""
+Reminders Tests
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from fitness.testing import create_gym, create_member
+from whatsapp.models import OutboundMessage
+from whatsapp.outbox import claim_batch, deliver, enqueue_reminders
+from .generation import generate_expiring_reminders
+from .messages import TemplateError, check_template, get_template, render_reminder, render_reminders
+from .models import Reminder
+
+
+class RenderTests(TestCase):
+    def setUp(self):
+        self.gym = create_gym()
+        self.member = create_member(self.gym, name='Asha')
+
+    def make_reminder(self, body, amount=None, member=None):
+        template = get_template(self.gym, 'PAYMENT_DUE')
+        template.body = body
+        template.save()
+        return Reminder.objects.create(
+            gym=self.gym, member=member or self.member, reminder_type='PAYMENT_DUE', template=template,
+            due_date=date.today() + timedelta(days=3), amount=amount
+        )
+
+    def test_renders_member_and_gym_fields(self):
+        reminder = self.make_reminder(
+            '{name}: ₹{amount} due {due_date} ({days_left}d) - {gym_name}', Decimal('500.00')
+        )
+
+        self.assertEqual(
+            render_reminder(reminder),
+            f"Asha: ₹500.00 due {reminder.due_date:%d-%b-%Y} (3d) - Test Gym"
+        )
+
+    def test_blank_amount_renders_empty(self):
+        reminder = self.make_reminder('Pay ₹{amount}.')
+
+        self.assertEqual(render_reminder(reminder), 'Pay ₹.')
+
+    def test_format_spec_that_fails_raises_template_error(self):
+        reminder = self.make_reminder('Fee {fee:.2f}')
+
+        with self.assertRaises(TemplateError):
+            render_reminder(reminder)
+
+    def test_batch_keeps_going_past_a_broken_reminder(self):
+        good = self.make_reminder('Hi {name}', Decimal('10'))
+        other_gym = create_gym('other@example.com')
+        template = get_template(other_gym, 'PAYMENT_DUE')
+        template.body = 'Hi {name:d}'
+        template.save()
+        bad = Reminder.objects.create(
+            gym=other_gym, member=create_member(other_gym, 1), reminder_type='PAYMENT_DUE', template=template,
+            due_date=date.today()
+        )
+
+        texts, errors = render_reminders([good, bad])
+
+        self.assertEqual(texts, {good.pk: 'Hi Asha'})
+        self.assertEqual(set(errors), {bad.pk})
+
+    def test_check_template(self):
+        check_template('{name} {fee:>10} {days_left:02d} {gym_name:.4}')
+        for body in ('Fee {fee:.2f}', '{name:d}', '{days_left:%}x{name:,}'):
+            with self.subTest(body=body), self.assertRaises(TemplateError):
+                check_template(body)
+
+    def test_unrenderable_message_is_dead_lettered_without_failing_the_batch(self):
+        good = self.make_reminder('Hi {name}')
+        bad_gym = create_gym('other@example.com')
+        template = get_template(bad_gym, 'PAYMENT_DUE')
+        template.body = 'Fee {fee:.2f}'
+        template.save()
+        bad = Reminder.objects.create(
+            gym=bad_gym, member=create_member(bad_gym, 1), reminder_type='PAYMENT_DUE', template=template,
+            due_date=date.today()
+        )
+        enqueue_reminders(Reminder.objects.filter(pk__in=[good.pk, bad.pk]).select_related('member'))
+        sent = []
+
+        class Service:
+            def send_message(self, phone, text):
+                sent.append(text)
+                return {'success': True, 'message_id': 'wamid.1'}
+
+        counts = deliver(claim_batch(10), concurrency=1, service=Service())
+
+        self.assertEqual(counts, {'sent': 1, 'retry': 0, 'dead': 1})
+        self.assertEqual(sent, ['Hi Asha'])
+        dead = OutboundMessage.objects.get(reminder=bad)
+        self.assertEqual(dead.status, 'DEAD')
+        self.assertIn('Template error', dead.last_error)
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, 'FAILED')
+
+
+class TemplateApiTests(TestCase):
+    def setUp(self):
+        self.gym = create_gym()
+        self.client = APIClient()
+        self.client.force_authenticate(self.gym.owner)
+        self.template = get_template(self.gym, 'PAYMENT_DUE')
+
+    def patch(self, body):
+        return self.client.patch(
+            reverse('reminders:template-detail', args=[self.template.pk]), {'body': body}, format='json', secure=True
+        )
+
+    def test_rejects_format_spec_that_fails_on_blank_amount(self):
+        response = self.patch('Fee {fee:.2f}')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('blank', str(response.data['body']))
+
+    def test_rejects_unknown_placeholder(self):
+        self.assertEqual(self.patch('Hi {nickname}').status_code, 400)
+
+    def test_accepts_spec_valid_for_every_member(self):
+        self.assertEqual(self.patch('Fee {fee:>8}').status_code, 200)
+
+    def test_list_survives_a_broken_template(self):
+        # Saved before validation existed
+        self.template.body = 'Fee {fee:.2f}'
+        self.template.save()
+        Reminder.objects.create(
+            gym=self.gym, member=create_member(self.gym), reminder_type='PAYMENT_DUE', template=self.template,
+            due_date=date.today()
+        )
+
+        response = self.client.get(reverse('reminders:reminder-list'), secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertIn('render_error', rows[0])
+
+
+class GenerationTests(TestCase):
+    def setUp(self):
+        self.gym = create_gym()
+        self.members = [create_member(self.gym, index, days_left=3) for index in range(3)]
+
+    def test_counts_only_rows_actually_inserted(self):
+        self.assertEqual(generate_expiring_reminders(self.gym), 3)
+        self.assertEqual(generate_expiring_reminders(self.gym), 0)
+
+    def test_rows_skipped_by_the_constraint_are_not_counted(self):
+        Reminder.objects.create(
+            gym=self.gym, member=self.members[0], reminder_type='MEMBERSHIP_EXPIRING',
+            due_date=self.members[0].membership_end_date
+        )
+        real = Reminder.objects.filter
+        # The concurrent run's insert landed after our pre-fetch
+        lookups = iter([lambda *args, **kwargs: Reminder.objects.none()])
+
+        with mock.patch.object(Reminder.objects, 'filter',
+                               side_effect=lambda *args, **kwargs: next(lookups, real)(*args, **kwargs)):
+            created = generate_expiring_reminders(self.gym)
 
-# Create your tests here.
+        self.assertEqual(created, 2)
+        self.assertEqual(Reminder.objects.count(), 3)
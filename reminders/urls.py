@@ -4,7 +4,8 @@ Reminders URLs
 from django.urls import path
 from .views import (
     ReminderListCreateView, ReminderDetailView, SendReminderView,
-    AutoGenerateRemindersView, BulkSendRemindersView
+    AutoGenerateRemindersView, BulkSendRemindersView,
+    ReminderTemplateListView, ReminderTemplateDetailView
 )
 
 app_name = 'reminders'
@@ -15,4 +16,6 @@ urlpatterns = [
     path('<uuid:reminder_id>/send/', SendReminderView.as_view(), name='send'),
     path('auto-generate/', AutoGenerateRemindersView.as_view(), name='auto-generate'),
     path('bulk-send/', BulkSendRemindersView.as_view(), name='bulk-send'),
-]
\ No newline at end of file
+    path('templates/', ReminderTemplateListView.as_view(), name='template-list'),
+    path('templates/<uuid:pk>/', ReminderTemplateDetailView.as_view(), name='template-detail'),
+]
@@ -5,11 +5,12 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
-from datetime import date, timedelta
-from .models import Reminder
-from .serializers import ReminderSerializer
-from members.models import Member
-from whatsapp.services import WhatsAppService
+from django.db import transaction
+from .messages import DEFAULT_BODIES, get_template
+from .models import Reminder, ReminderTemplate
+from .serializers import ReminderSerializer, ReminderTemplateSerializer
+from .generation import generate_expiring_reminders
+from whatsapp.outbox import enqueue_reminders
 
 
 class ReminderListCreateView(generics.ListCreateAPIView):
@@ -18,7 +19,8 @@ class ReminderListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        queryset = Reminder.objects.filter(gym=self.request.user.gym)
+        # Templated messages are rendered per row -> member, gym and template joined in
+        queryset = Reminder.objects.filter(gym=self.request.user.gym).select_related('member', 'gym', 'template')
         
         # Filter by status
         status_filter = self.request.query_params.get('status')
@@ -45,105 +47,50 @@ class ReminderDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Reminder.objects.filter(gym=self.request.user.gym)
+        return Reminder.objects.filter(gym=self.request.user.gym).select_related('member', 'gym', 'template')
 
 
 class SendReminderView(APIView):
-    """Send a reminder via WhatsApp"""
+    """Queue a reminder for WhatsApp delivery (outbox worker sends it)"""
     permission_classes = [IsAuthenticated]
     
     def post(self, request, reminder_id):
         try:
-            reminder = Reminder.objects.get(id=reminder_id, gym=request.user.gym)
-            
-            # Check if WhatsApp is enabled
-            if not request.user.gym.whatsapp_enabled:
-                return Response(
-                    {'error': 'WhatsApp notifications are disabled for your gym'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Send WhatsApp message
-            whatsapp_service = WhatsAppService()
-            result = whatsapp_service.send_reminder(reminder)
-            
-            if result['success']:
-                reminder.status = 'SENT'
-                reminder.sent_at = date.today()
-                reminder.delivery_status = 'Delivered'
-            else:
-                reminder.status = 'FAILED'
-                reminder.error_message = result.get('error', 'Unknown error')
-            
-            reminder.save()
-            
-            serializer = ReminderSerializer(reminder)
-            return Response(serializer.data)
-        
+            reminder = Reminder.objects.select_related('member', 'gym', 'template').get(id=reminder_id, gym=request.user.gym)
         except Reminder.DoesNotExist:
             return Response(
                 {'error': 'Reminder not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        # Check if WhatsApp is enabled
+        if not request.user.gym.whatsapp_enabled:
+            return Response(
+                {'error': 'WhatsApp notifications are disabled for your gym'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        with transaction.atomic():
+            if reminder.status == 'FAILED':
+                # Manual resend of a dead reminder
+                reminder.status = 'PENDING'
+                reminder.error_message = None
+                reminder.save(update_fields=['status', 'error_message'])
+            queued = enqueue_reminders([reminder])
+        
+        return Response({
+            'reminder': ReminderSerializer(reminder).data,
+            'queued': bool(queued),
+            'outbox_id': queued[0].id if queued else None,
+        }, status=status.HTTP_202_ACCEPTED)
 
 
 class AutoGenerateRemindersView(APIView):
-    """Auto-generate reminders for expiring memberships"""
+    """Auto-generate reminders for expiring memberships (members ending in the next 7 days)"""
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        gym = request.user.gym
-        today = date.today()
-        reminder_date = today + timedelta(days=7)
-        
-        # Find members expiring in 7 days
-        expiring_members = Member.objects.filter(
-            gym=gym,
-            status='ACTIVE',
-            membership_end_date__gte=today,
-            membership_end_date__lte=reminder_date
-        )
-        
-        created_count = 0
-        
-        for member in expiring_members:
-            # Check if reminder already exists
-            existing = Reminder.objects.filter(
-                gym=gym,
-                member=member,
-                reminder_type='MEMBERSHIP_EXPIRING',
-                due_date=member.membership_end_date,
-                status__in=['PENDING', 'SENT']
-            ).exists()
-            
-            if not existing:
-                days_left = (member.membership_end_date - today).days
-                
-                message = f"""
-Dear {member.name},
-
-Your gym membership at {gym.name} is expiring in {days_left} days on {member.membership_end_date.strftime('%d-%b-%Y')}.
-
-Please renew your membership to continue enjoying our services.
-
-Membership Fee: ₹{member.membership_fee}
-
-Contact us: {gym.phone}
-
-Thank you!
-{gym.name}
-                """.strip()
-                
-                Reminder.objects.create(
-                    gym=gym,
-                    member=member,
-                    reminder_type='MEMBERSHIP_EXPIRING',
-                    message=message,
-                    due_date=member.membership_end_date,
-                    amount=member.membership_fee,
-                    created_by=request.user
-                )
-                created_count += 1
+        created_count = generate_expiring_reminders(request.user.gym, user=request.user)
         
         return Response({
             'message': f'Created {created_count} reminders',
@@ -164,33 +111,39 @@ class BulkSendRemindersView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get pending reminders
+        # Get pending reminders (member joined in, phones needed for every message)
         pending_reminders = Reminder.objects.filter(
             gym=gym,
             status='PENDING'
-        )
+        ).select_related('member')
         
-        whatsapp_service = WhatsAppService()
-        sent_count = 0
-        failed_count = 0
-        
-        for reminder in pending_reminders:
-            result = whatsapp_service.send_reminder(reminder)
-            
-            if result['success']:
-                reminder.status = 'SENT'
-                reminder.sent_at = date.today()
-                reminder.delivery_status = 'Delivered'
-                sent_count += 1
-            else:
-                reminder.status = 'FAILED'
-                reminder.error_message = result.get('error', 'Unknown error')
-                failed_count += 1
-            
-            reminder.save()
+        # 📥 Into the outbox in one insert; the worker sends in parallel with retries
+        with transaction.atomic():
+            queued = enqueue_reminders(pending_reminders)
         
         return Response({
-            'message': f'Sent {sent_count} reminders, {failed_count} failed',
-            'sent': sent_count,
-            'failed': failed_count
-        })
\ No newline at end of file
+            'message': f'Queued {len(queued)} reminders for sending',
+            'queued': len(queued)
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class ReminderTemplateListView(generics.ListAPIView):
+    """Message templates of the gym (one per reminder type, defaults created on first visit)"""
+    serializer_class = ReminderTemplateSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+    
+    def get_queryset(self):
+        gym = self.request.user.gym
+        for reminder_type in DEFAULT_BODIES:
+            get_template(gym, reminder_type)
+        return ReminderTemplate.objects.filter(gym=gym)
+
+
+class ReminderTemplateDetailView(generics.RetrieveUpdateAPIView):
+    """Edit a template; reminders not yet sent pick up the new text"""
+    serializer_class = ReminderTemplateSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return ReminderTemplate.objects.filter(gym=self.request.user.gym)
@@ -1 +1,11 @@
-default_app_config = 'whatsapp.apps.WhatsappConfig'
\ No newline at end of file
+default_app_config = 'whatsapp.apps.WhatsappConfig'
+
+from django.contrib import admin
+from .models import ReportJob
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ['gym', 'report_type', 'period_start', 'period_end', 'status', 'finished_at']
+    list_filter = ['status', 'report_type']
+    readonly_fields = ['source_fingerprint', 'created_at', 'started_at', 'finished_at']
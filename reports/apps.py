@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'reports'
\ No newline at end of file
+    name = 'reports'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (report cache invalidation)
@@ -0,0 +1,155 @@
+"""
+Report Cache
+Caches report JSON and PDF bytes per gym / report / period.
+
+Invalidation is by generation stamps, one per (gym, scope, month):
+  report-gen:payments:<gym>:2025-01
+A cache key embeds the stamps of every month its period covers, so a
+payment written for January only orphans reports that include January;
+last year's report stays cached. Stamps are rows in report_cache_stamps,
+not cache entries: the cache is per-process LocMem unless REDIS_URL is
+set, and a backdated payment saved by another gunicorn worker or a
+management command must still invalidate this process's entries. That is
+one indexed query per report request.
+
+Closed periods (ending before today) get a long TTL, periods that
+include today a short one - today's numbers still move without a write
+hitting the cache layer (e.g. queryset.update()). Cached PDFs print
+"Generated on <date>", so they are keyed by day and expire at midnight.
+
+Writes reach us via signals (reports/signals.py); bulk_create and
+queryset.update() bypass signals, so those callers invoke
+invalidate_payment_dates() / invalidate_members() themselves.
+"""
+import hashlib
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ReportCacheStamp
+
+PAYMENTS = 'payments'
+MEMBERS = 'members'
+
+
+def _month(day):
+    return day.strftime('%Y-%m')
+
+
+def _months(start, end):
+    current = start.replace(day=1)
+    while current <= end:
+        yield _month(current)
+        current = current.replace(year=current.year + 1, month=1) if current.month == 12 \
+            else current.replace(month=current.month + 1)
+
+
+def _gen_key(scope, gym_id, month):
+    return f"report-gen:{scope}:{gym_id}:{month}"
+
+
+def _stamps(keys):
+    stamps = dict(ReportCacheStamp.objects.filter(key__in=keys).values_list('key', 'value'))
+    missing = [key for key in keys if key not in stamps]
+    if missing:
+        # First use: seed; ignore_conflicts + re-read lets a concurrent seeder win
+        now = time.time_ns()
+        ReportCacheStamp.objects.bulk_create(
+            [ReportCacheStamp(key=key, value=now) for key in missing], ignore_conflicts=True
+        )
+        stamps.update(ReportCacheStamp.objects.filter(key__in=missing).values_list('key', 'value'))
+    return [str(stamps[key]) for key in keys]
+
+
+def _bump(keys):
+    now = time.time_ns()
+    ReportCacheStamp.objects.bulk_create(
+        [ReportCacheStamp(key=key, value=now) for key in keys],
+        update_conflicts=True, unique_fields=['key'], update_fields=['value'],
+    )
+
+
+def report_ttl(end_date, today=None):
+    today = today or date.today()
+    if end_date < today:
+        return getattr(settings, 'REPORT_CACHE_CLOSED_TTL', 7 * 24 * 3600)
+    return getattr(settings, 'REPORT_CACHE_CURRENT_TTL', 300)
+
+
+def report_key(gym_id, report, start_date, end_date, scope=PAYMENTS, extra=''):
+    """Cache key for a report over [start_date, end_date] that depends on `scope` writes"""
+    keys = [_gen_key(scope, gym_id, month) for month in _months(start_date, end_date)]
+    digest = hashlib.md5(':'.join(_stamps(keys)).encode()).hexdigest()[:16]
+    return f"report:{report}:{gym_id}:{start_date.isoformat()}:{end_date.isoformat()}:{extra}:{digest}"
+
+
+def cached_report(gym_id, report, start_date, end_date, build, scope=PAYMENTS, extra='', max_bytes=None):
+    """
+    Return cached `build()` result for this period, computing and storing on miss.
+    `max_bytes` skips caching oversized bytes results (huge PDFs).
+    """
+    key = report_key(gym_id, report, start_date, end_date, scope=scope, extra=extra)
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    result = build()
+    if max_bytes is None or not isinstance(result, bytes) or len(result) <= max_bytes:
+        cache.set(key, result, timeout=report_ttl(end_date))
+    return result
+
+
+def cached_report_file(gym_id, report, start_date, end_date, build, extra=''):
+    """
+    File-producing variant of cached_report. `build()` returns a rewound
+    binary file; results up to REPORT_CACHE_MAX_FILE_BYTES are cached as
+    bytes, bigger ones are returned uncached. Always returns a readable file.
+    """
+    today = date.today()
+    key = report_key(gym_id, report, start_date, end_date, extra=f"{extra}:{today.isoformat()}")
+    content = cache.get(key)
+    if content is not None:
+        return BytesIO(content)
+
+    output = build()
+    size = output.seek(0, 2)
+    output.seek(0)
+    if size <= getattr(settings, 'REPORT_CACHE_MAX_FILE_BYTES', 5 * 1024 * 1024):
+        # The file carries today's date, so tomorrow it's a different (re-rendered) file
+        midnight = datetime.combine(today + timedelta(days=1), dt_time.min)
+        timeout = min(report_ttl(end_date, today), max(int((midnight - datetime.now()).total_seconds()), 1))
+        cache.set(key, output.read(), timeout=timeout)
+        output.seek(0)
+    return output
+
+
+# ==============================================
+# 🧹 INVALIDATION
+# ==============================================
+
+def invalidate_payment_dates(gym_id, dates):
+    """Payments dated on `dates` changed for this gym"""
+    months = {_month(day) for day in dates if day}
+    if months:
+        _bump([_gen_key(PAYMENTS, gym_id, month) for month in sorted(months)])
+
+
+def invalidate_members(gym_id):
+    """Member data changed; member reports are current-state so one stamp per gym"""
+    _bump([_gen_key(MEMBERS, gym_id, 'all')])
+
+
+def cached_member_report(gym_id, build, today=None):
+    """Member statistics are 'as of today': keyed by day + member stamp, short TTL"""
+    today = today or date.today()
+    digest = hashlib.md5(''.join(_stamps([_gen_key(MEMBERS, gym_id, 'all')])).encode()).hexdigest()[:16]
+    key = f"report:members:{gym_id}:{today.isoformat()}:{digest}"
+
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, timeout=report_ttl(today, today))
+    return result
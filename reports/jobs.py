@@ -0,0 +1,144 @@
+"""
+Report Jobs
+Renders heavy reports outside web requests and keeps the files.
+
+  enqueue_report()     -> QUEUED row (reuses an in-flight job for the same period)
+  run_pending_jobs()   -> worker loop body (`run_report_jobs` command)
+  fresh_artifact()     -> DONE job whose data hasn't changed since rendering
+
+Freshness is checked against the database, not the cache: a job stores a
+fingerprint (row count, amount total, latest updated_at) of the payments
+it rendered, and the artifact is served only while that still matches.
+One small indexed aggregate instead of a full render.
+"""
+import logging
+from datetime import timedelta
+
+from django.core.files import File
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from payments.models import Payment
+from .models import ReportJob
+from .utils import render_income_report_pdf
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('QUEUED', 'RUNNING')
+STALE_RUNNING_AFTER = timedelta(minutes=30)
+
+
+def source_fingerprint(gym, report_type, start_date, end_date):
+    # Every status counts: a PENDING -> PAID edit must invalidate too
+    stats = Payment.objects.filter(
+        gym=gym, payment_date__gte=start_date, payment_date__lte=end_date
+    ).aggregate(count=Count('id'), total=Sum('amount'), updated=Max('updated_at'))
+    updated = stats['updated'].isoformat() if stats['updated'] else '-'
+    return f"{stats['count']}:{stats['total'] or 0}:{updated}"
+
+
+def fresh_artifact(gym, report_type, start_date, end_date):
+    """Latest DONE job for this period if its data is unchanged, else None"""
+    job = (
+        ReportJob.objects.filter(
+            gym=gym, report_type=report_type, period_start=start_date, period_end=end_date, status='DONE'
+        )
+        .exclude(artifact='')
+        .order_by('-finished_at')
+        .first()
+    )
+    if job and job.source_fingerprint == source_fingerprint(gym, report_type, start_date, end_date):
+        return job
+    return None
+
+
+def enqueue_report(gym, report_type, start_date, end_date, period_label='', user=None):
+    """QUEUED job for the period; an already queued/running one is returned instead of a duplicate"""
+    existing = ReportJob.objects.filter(
+        gym=gym, report_type=report_type, period_start=start_date, period_end=end_date,
+        status__in=ACTIVE_STATUSES
+    ).first()
+    if existing:
+        return existing
+    return ReportJob.objects.create(
+        gym=gym,
+        report_type=report_type,
+        period_start=start_date,
+        period_end=end_date,
+        period_label=period_label,
+        requested_by=user,
+    )
+
+
+# ==============================================
+# 🏭 WORKER
+# ==============================================
+
+def _render(job):
+    if job.report_type == 'INCOME_PDF':
+        filename = f"income_{job.gym_id}_{job.period_start:%Y%m%d}_{job.period_end:%Y%m%d}.pdf"
+        label = job.period_label or f"{job.period_start:%d-%b-%Y} to {job.period_end:%d-%b-%Y}"
+        return filename, render_income_report_pdf(job.gym, job.period_start, job.period_end, label)
+    raise ValueError(f"Unknown report type {job.report_type}")
+
+
+def claim_next_job():
+    """Oldest QUEUED job, claimed with a conditional UPDATE (safe with several workers)"""
+    while True:
+        job_id = (
+            ReportJob.objects.filter(status='QUEUED').order_by('created_at').values_list('pk', flat=True).first()
+        )
+        if job_id is None:
+            return None
+        if ReportJob.objects.filter(pk=job_id, status='QUEUED').update(status='RUNNING', started_at=timezone.now()):
+            return ReportJob.objects.select_related('gym').get(pk=job_id)
+        # Another worker won this one, try the next
+
+
+def run_job(job):
+    """Render a claimed (RUNNING) job. Returns True on success."""
+    try:
+        # Fingerprint BEFORE reading rows: a write during the render makes the artifact stale, never wrong-but-fresh
+        job.source_fingerprint = source_fingerprint(job.gym, job.report_type, job.period_start, job.period_end)
+        filename, output = _render(job)
+        with output:
+            job.artifact.save(filename, File(output), save=False)
+        job.status = 'DONE'
+        job.error = None
+        job.finished_at = timezone.now()
+        job.save(update_fields=['artifact', 'source_fingerprint', 'status', 'error', 'finished_at'])
+    except Exception as e:
+        logger.exception("Report job %s failed", job.pk)
+        ReportJob.objects.filter(pk=job.pk).update(status='FAILED', error=str(e)[:1000], finished_at=timezone.now())
+        return False
+
+    # Older artifacts for the same period are superseded
+    for old in ReportJob.objects.filter(
+        gym_id=job.gym_id, report_type=job.report_type,
+        period_start=job.period_start, period_end=job.period_end, status='DONE'
+    ).exclude(pk=job.pk):
+        if old.artifact:
+            old.artifact.delete(save=False)
+        old.delete()
+    return True
+
+
+def requeue_stale_jobs():
+    """RUNNING jobs whose worker died mid-render go back to the queue"""
+    return ReportJob.objects.filter(
+        status='RUNNING', started_at__lt=timezone.now() - STALE_RUNNING_AFTER
+    ).update(status='QUEUED', started_at=None)
+
+
+def run_pending_jobs(limit=None):
+    """Process queued jobs until the queue is empty (or `limit`). Returns (done, failed)."""
+    done = failed = 0
+    while limit is None or done + failed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        if run_job(job):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
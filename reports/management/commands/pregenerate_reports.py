@@ -0,0 +1,49 @@
+"""
+Nightly: queue last month's income PDF for every gym so the
+1st-of-the-month rush downloads a ready file.
+    python manage.py pregenerate_reports [--month 2025-01] [--gym <id>] [--run]
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fitness.models import Gym
+from payments.models import Payment
+from reports.jobs import enqueue_report, fresh_artifact, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Queue (and optionally render) the previous month's income report for each gym"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='YYYY-MM (default: previous month)')
+        parser.add_argument('--gym', help='Only this gym id')
+        parser.add_argument('--run', action='store_true', help='Render right away instead of leaving it to the worker')
+
+    def handle(self, *args, **options):
+        if options['month']:
+            start = Payment.parse_month(options['month'])
+            if start is None:
+                raise CommandError('--month must look like 2025-01')
+        else:
+            start = (date.today().replace(day=1) - timedelta(days=1)).replace(day=1)
+        end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        label = start.strftime('%B %Y')
+
+        gyms = Gym.objects.all()
+        if options['gym']:
+            gyms = gyms.filter(pk=options['gym'])
+
+        queued = skipped = 0
+        for gym in gyms.iterator():
+            if fresh_artifact(gym, 'INCOME_PDF', start, end):
+                skipped += 1
+                continue
+            enqueue_report(gym, 'INCOME_PDF', start, end, period_label=label)
+            queued += 1
+
+        self.stdout.write(f"{label}: queued {queued}, already fresh {skipped}")
+
+        if options['run']:
+            done, failed = run_pending_jobs()
+            self.stdout.write(self.style.SUCCESS(f"Rendered {done}, failed {failed}"))
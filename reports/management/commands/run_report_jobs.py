@@ -0,0 +1,36 @@
+"""
+Report job worker.
+    python manage.py run_report_jobs            # keep polling
+    python manage.py run_report_jobs --once     # drain the queue and exit (cron)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from reports.jobs import requeue_stale_jobs, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Render queued report jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--sleep', type=float, default=5, help='Seconds between polls when idle')
+        parser.add_argument('--limit', type=int, help='Max jobs per pass')
+
+    def handle(self, *args, **options):
+        while True:
+            requeued = requeue_stale_jobs()
+            if requeued:
+                self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale job(s)"))
+
+            done, failed = run_pending_jobs(limit=options['limit'])
+            if done or failed:
+                self.stdout.write(self.style.SUCCESS(f"Reports rendered: {done}, failed: {failed}"))
+
+            if options['once']:
+                return
+            if not (done or failed):
+                close_old_connections()
+                time.sleep(options['sleep'])
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:57
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('fitness', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('report_type', models.CharField(choices=[('INCOME_PDF', 'Income Report PDF')], default='INCOME_PDF', max_length=20)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('period_label', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='QUEUED', max_length=10)),
+                ('artifact', models.FileField(blank=True, null=True, upload_to='reports/')),
+                ('source_fingerprint', models.CharField(blank=True, max_length=100)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to='fitness.gym')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'report_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='report_jobs_status_a52eae_idx'), models.Index(fields=['gym', 'report_type', 'period_start', 'period_end', 'status'], name='report_jobs_gym_id_e9be0b_idx')],
+            },
+        ),
+    ]
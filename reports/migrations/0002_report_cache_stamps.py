@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_report_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCacheStamp',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'report_cache_stamps',
+            },
+        ),
+    ]
@@ -1,7 +1,66 @@
 """
 Reports Models
+Reports are computed from existing data; ReportJob only tracks
+pre-rendered artifacts (nightly / on-demand, see reports/jobs.py).
 """
 from django.db import models
+from fitness.models import Gym, User
+import uuid
 
-# Reports app doesn't need models
-# All reports are generated from existing data
\ No newline at end of file
+
+class ReportJob(models.Model):
+    """Off-request report render + its output file"""
+    REPORT_TYPE_CHOICES = [
+        ('INCOME_PDF', 'Income Report PDF'),
+    ]
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='report_jobs')
+    report_type = models.CharField(max_length=20, choices=REPORT_TYPE_CHOICES, default='INCOME_PDF')
+    period_start = models.DateField()
+    period_end = models.DateField()
+    period_label = models.CharField(max_length=100, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    artifact = models.FileField(upload_to='reports/', null=True, blank=True)
+    # count:sum:last-update of the source rows when rendering started (staleness check)
+    source_fingerprint = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True, null=True)
+
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'report_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['gym', 'report_type', 'period_start', 'period_end', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} {self.period_start}..{self.period_end} ({self.status})"
+
+
+class ReportCacheStamp(models.Model):
+    """
+    Generation stamp for cached reports (see reports/cache.py). Lives in the
+    DB, not the cache, so a write in any process invalidates every process's
+    cached reports even when the cache itself is per-process.
+    """
+    key = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'report_cache_stamps'
+
+    def __str__(self):
+        return f"{self.key}={self.value}"
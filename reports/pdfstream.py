@@ -0,0 +1,172 @@
+"""
+Streaming PDF Writer
+Minimal page-at-a-time PDF writer for long tabular reports.
+
+reportlab's Canvas / SimpleDocTemplate keep every page in memory until
+save(), so memory grows with the report. Here each page's content stream
+is compressed and written to the output file as soon as the page is
+finished; only the byte offsets of written objects are kept (a few bytes
+per page). Text uses the standard Helvetica fonts (no embedding) and
+reportlab's font metrics for right-aligned columns.
+
+Those fonts only cover WinAnsi (cp1252). Anything outside it is folded
+to ASCII on purpose: accents are dropped ("Rāhul Śarmā" -> "Rahul
+Sarma") and characters with no Latin form (Devanagari etc.) become "?".
+"""
+import unicodedata
+import zlib
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+FONTS = {
+    'Helvetica': 'F1',
+    'Helvetica-Bold': 'F2',
+    'Helvetica-Oblique': 'F3',
+}
+
+# Object ids reserved up-front; pages start after these
+CATALOG_ID, PAGES_ID = 1, 2
+FIRST_FONT_ID = 3
+FIRST_FREE_ID = FIRST_FONT_ID + len(FONTS)
+
+
+def _winansi(text):
+    """Text as the standard fonts can draw it (see module docstring)"""
+    chars = []
+    for char in str(text):
+        try:
+            char.encode('cp1252')
+        except UnicodeEncodeError:
+            char = unicodedata.normalize('NFKD', char).encode('ascii', 'ignore').decode() or '?'
+        chars.append(char)
+    return ''.join(chars)
+
+
+def _pdf_string(text):
+    """Escape for a PDF literal string in WinAnsi (Latin-1 subset) encoding"""
+    raw = _winansi(text).encode('cp1252')
+    return raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _color(rgb):
+    return ' '.join(f'{channel:.3f}' for channel in rgb)
+
+
+class _Page:
+    """Drawing operations for one page (PDF coordinates, origin bottom-left)"""
+
+    def __init__(self):
+        self._ops = []
+
+    def text(self, x, y, text, font='Helvetica', size=9, color=(0, 0, 0)):
+        self._ops.append(
+            b'%s rg BT /%s %d Tf %.2f %.2f Td (%s) Tj ET' % (
+                _color(color).encode(), FONTS[font].encode(), size, x, y, _pdf_string(text)
+            )
+        )
+
+    def text_right(self, x, y, text, font='Helvetica', size=9, color=(0, 0, 0)):
+        self.text(x - stringWidth(_winansi(text), font, size), y, text, font, size, color)
+
+    def text_center(self, x, y, text, font='Helvetica', size=9, color=(0, 0, 0)):
+        self.text(x - stringWidth(_winansi(text), font, size) / 2, y, text, font, size, color)
+
+    def rect(self, x, y, width, height, fill):
+        self._ops.append(b'%s rg %.2f %.2f %.2f %.2f re f' % (_color(fill).encode(), x, y, width, height))
+
+    def line(self, x1, y1, x2, y2, width=0.5, color=(0.5, 0.5, 0.5)):
+        self._ops.append(
+            b'%s RG %.2f w %.2f %.2f m %.2f %.2f l S' % (_color(color).encode(), width, x1, y1, x2, y2)
+        )
+
+    def content(self):
+        return b'\n'.join(self._ops)
+
+
+class StreamingPDFWriter:
+    """
+    Usage:
+        writer = StreamingPDFWriter(fileobj)
+        page = writer.new_page(); page.text(...); ...   # previous page is flushed
+        writer.close()
+    `fileobj` only needs write() and tell().
+    """
+
+    def __init__(self, fileobj, pagesize=A4, title=None):
+        self.out = fileobj
+        self.width, self.height = pagesize
+        self.title = title
+        self.page_count = 0
+        self._offsets = {}
+        self._page_ids = []
+        self._next_id = FIRST_FREE_ID
+        self._page = None
+
+        self.out.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        for position, font in enumerate(FONTS):
+            self._write_object(
+                FIRST_FONT_ID + position,
+                b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % font.encode()
+            )
+
+    def _allocate(self):
+        object_id = self._next_id
+        self._next_id += 1
+        return object_id
+
+    def _write_object(self, object_id, body):
+        self._offsets[object_id] = self.out.tell()
+        self.out.write(b'%d 0 obj\n' % object_id)
+        self.out.write(body)
+        self.out.write(b'\nendobj\n')
+
+    def _flush_page(self):
+        if self._page is None:
+            return
+        stream = zlib.compress(self._page.content())
+        content_id, page_id = self._allocate(), self._allocate()
+        self._write_object(
+            content_id,
+            b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(stream), stream)
+        )
+        fonts = b' '.join(
+            b'/%s %d 0 R' % (alias.encode(), FIRST_FONT_ID + position)
+            for position, alias in enumerate(FONTS.values())
+        )
+        self._write_object(
+            page_id,
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] '
+            b'/Resources << /Font << %s >> >> /Contents %d 0 R >>' % (
+                PAGES_ID, self.width, self.height, fonts, content_id
+            )
+        )
+        self._page_ids.append(page_id)
+        self._page = None
+
+    def new_page(self):
+        self._flush_page()
+        self._page = _Page()
+        self.page_count += 1
+        return self._page
+
+    def close(self):
+        self._flush_page()
+
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self._page_ids)
+        self._write_object(PAGES_ID, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self._page_ids)))
+        self._write_object(CATALOG_ID, b'<< /Type /Catalog /Pages %d 0 R >>' % PAGES_ID)
+
+        info_id = self._allocate()
+        title = b' /Title (%s)' % _pdf_string(self.title) if self.title else b''
+        self._write_object(info_id, b'<< /Producer (Gym Fitness Backend)%s >>' % title)
+
+        xref_offset = self.out.tell()
+        self.out.write(b'xref\n0 %d\n0000000000 65535 f \n' % self._next_id)
+        for object_id in range(1, self._next_id):
+            self.out.write(b'%010d 00000 n \n' % self._offsets[object_id])
+        self.out.write(
+            b'trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+                self._next_id, CATALOG_ID, info_id, xref_offset
+            )
+        )
@@ -2,7 +2,10 @@
 Reports Serializers
 Read-Only Serializers for Analytics & Dashboard Charts
 """
+from django.urls import reverse
 from rest_framework import serializers
+from .models import ReportJob
+from .utils import PERIODS, resolve_period
 
 class IncomeReportSerializer(serializers.Serializer):
     """
@@ -25,4 +28,38 @@ class MemberReportSerializer(serializers.Serializer):
     inactive_members = serializers.IntegerField(read_only=True)
     expired_members = serializers.IntegerField(read_only=True)
     new_this_month = serializers.IntegerField(read_only=True)
-    gender_distribution = serializers.DictField(read_only=True) # Example: {'M': 50, 'F': 20}
\ No newline at end of file
+    gender_distribution = serializers.DictField(read_only=True) # Example: {'M': 50, 'F': 20}
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """Report job status + download link"""
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'report_type', 'period_start', 'period_end', 'period_label', 'status',
+            'error', 'created_at', 'started_at', 'finished_at', 'download_url'
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != 'DONE' or not obj.artifact:
+            return None
+        return reverse('reports:job-download', kwargs={'pk': obj.pk})
+
+
+class ReportJobCreateSerializer(serializers.Serializer):
+    """Request an off-request report render"""
+    report_type = serializers.ChoiceField(choices=ReportJob.REPORT_TYPE_CHOICES, default='INCOME_PDF')
+    period = serializers.ChoiceField(choices=PERIODS, default='this_month')
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate(self, data):
+        try:
+            data['period_start'], data['period_end'], data['period_label'] = resolve_period(
+                data['period'], data.get('start_date'), data.get('end_date')
+            )
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return data
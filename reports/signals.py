@@ -0,0 +1,66 @@
+"""
+Report cache invalidation hooks (connected in ReportsConfig.ready)
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from members.models import Member
+from payments.models import Payment
+from .cache import invalidate_members, invalidate_payment_dates
+
+
+@receiver(pre_save, sender=Payment)
+def remember_payment_date(sender, instance, **kwargs):
+    # A backdated edit moves the payment out of its old month too
+    if not instance._state.adding and instance.pk:
+        instance._report_previous_date = (
+            Payment.objects.filter(pk=instance.pk).values_list('payment_date', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def payment_changed(sender, instance, **kwargs):
+    dates = {instance.payment_date, getattr(instance, '_report_previous_date', None)}
+    gym_id = instance.gym_id
+    # After commit: a reader between our bump and the commit would re-cache stale data
+    transaction.on_commit(lambda: invalidate_payment_dates(gym_id, dates))
+
+
+def _payment_months(member):
+    # One date per month that has a payment by this member
+    return list(Payment.objects.filter(member=member).dates('payment_date', 'month'))
+
+
+@receiver(pre_save, sender=Member)
+def remember_member_name(sender, instance, update_fields=None, **kwargs):
+    # Income reports print member names: a rename must re-render that member's months
+    if not instance._state.adding and instance.pk and (update_fields is None or 'name' in update_fields):
+        instance._report_previous_name = (
+            Member.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+        )
+
+
+@receiver(pre_delete, sender=Member)
+def remember_member_payment_months(sender, instance, **kwargs):
+    # Payments are still there before the cascade
+    instance._report_payment_months = _payment_months(instance)
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def member_changed(sender, instance, **kwargs):
+    gym_id = instance.gym_id
+    months = getattr(instance, '_report_payment_months', None)
+    previous_name = getattr(instance, '_report_previous_name', None)
+    if months is None and previous_name is not None and previous_name != instance.name:
+        months = _payment_months(instance)
+    instance._report_previous_name = None
+
+    def invalidate():
+        invalidate_members(gym_id)
+        if months:
+            invalidate_payment_dates(gym_id, months)
+
+    transaction.on_commit(invalidate)
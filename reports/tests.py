@@ -1,3 +1,191 @@
-from django.test import TestCase
+"""
+Reports Tests
+"""
+import shutil
+import tempfile
+from datetime import date
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from pypdf import PdfReader
+
+from fitness.testing import create_gym, create_member
+from members.models import Member
+from payments.models import Payment
+
+from .cache import cached_report, cached_report_file, invalidate_payment_dates, report_key
+from .jobs import claim_next_job, enqueue_report, fresh_artifact, run_job
+from .models import ReportCacheStamp, ReportJob
+from .utils import write_income_report
+
+
+class ReportCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.jan = (date(2025, 1, 1), date(2025, 1, 31))
+
+    def test_stamps_live_in_the_database(self):
+        key = report_key(1, 'income', *self.jan)
+
+        # Another process's cache is empty, but it derives the same key...
+        cache.clear()
+        self.assertEqual(report_key(1, 'income', *self.jan), key)
+
+        # ...and a bump written by any process changes it
+        ReportCacheStamp.objects.filter(key='report-gen:payments:1:2025-01').update(value=1)
+        self.assertNotEqual(report_key(1, 'income', *self.jan), key)
+
+    def test_member_rename_or_delete_invalidates_their_payment_months(self):
+        gym = create_gym()
+        member = create_member(gym, name='Old Name')
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(gym=gym, member=member, amount=500, payment_date=date(2025, 1, 15))
+        feb = (date(2025, 2, 1), date(2025, 2, 28))
+        keys = lambda: (report_key(gym.pk, 'income', *self.jan), report_key(gym.pk, 'income', *feb))  # noqa: E731
+        before = keys()
+
+        member.phone = '9111111111'
+        with self.captureOnCommitCallbacks(execute=True):
+            member.save()
+        self.assertEqual(keys(), before)
+
+        member.name = 'New Name'
+        with self.captureOnCommitCallbacks(execute=True):
+            member.save()
+        renamed = keys()
+        self.assertNotEqual(renamed[0], before[0])
+        self.assertEqual(renamed[1], before[1])  # no payments in February
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Member.objects.filter(pk=member.pk).first().delete()
+        self.assertNotEqual(keys()[0], renamed[0])
+
+    def test_payment_in_a_month_only_invalidates_that_month(self):
+        builds = []
+        build = lambda: builds.append(1) or {'total': len(builds)}  # noqa: E731
+        feb = (date(2025, 2, 1), date(2025, 2, 28))
+
+        cached_report(1, 'income', *self.jan, build)
+        cached_report(1, 'income', *feb, build)
+        invalidate_payment_dates(1, [date(2025, 1, 15)])
+        cached_report(1, 'income', *self.jan, build)
+        cached_report(1, 'income', *feb, build)
+
+        self.assertEqual(len(builds), 3)
+
+    def test_cached_file_is_reused_within_the_day(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return BytesIO(b'%PDF-fake')
+
+        first = cached_report_file(1, 'income-pdf', *self.jan, build).read()
+        second = cached_report_file(1, 'income-pdf', *self.jan, build).read()
+
+        self.assertEqual((first, second, len(builds)), (b'%PDF-fake', b'%PDF-fake', 1))
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        self.gym = create_gym()
+        self.payment = Payment.objects.create(
+            gym=self.gym, member=create_member(self.gym), amount=1500, payment_date=date(2025, 1, 10)
+        )
+        self.jan = (date(2025, 1, 1), date(2025, 1, 31))
+
+    def queue(self):
+        return enqueue_report(self.gym, 'INCOME_PDF', *self.jan, period_label='January 2025')
+
+    def test_claim_takes_the_oldest_queued_job_once(self):
+        first = self.queue()
+        second = ReportJob.objects.create(gym=self.gym, period_start=date(2025, 2, 1), period_end=date(2025, 2, 28))
+
+        self.assertEqual(self.queue(), first)  # in-flight job reused
+        self.assertEqual(claim_next_job().pk, first.pk)
+        self.assertEqual(claim_next_job().pk, second.pk)
+        self.assertIsNone(claim_next_job())
+        self.assertEqual(ReportJob.objects.get(pk=first.pk).status, 'RUNNING')
+
+    def test_run_job_stores_a_fresh_artifact(self):
+        self.queue()
+
+        self.assertTrue(run_job(claim_next_job()))
+
+        job = fresh_artifact(self.gym, 'INCOME_PDF', *self.jan)
+        self.assertIsNotNone(job)
+        with job.artifact.open('rb') as artifact:
+            self.assertTrue(artifact.read().startswith(b'%PDF'))
+
+    def test_payment_edit_after_generation_makes_it_stale_and_regenerates(self):
+        self.queue()
+        run_job(claim_next_job())
+        old = ReportJob.objects.get()
+
+        self.payment.amount = 2000
+        self.payment.save()
+        self.assertIsNone(fresh_artifact(self.gym, 'INCOME_PDF', *self.jan))
+
+        self.queue()
+        self.assertTrue(run_job(claim_next_job()))
+        job = fresh_artifact(self.gym, 'INCOME_PDF', *self.jan)
+        self.assertNotEqual(job.pk, old.pk)
+        self.assertFalse(ReportJob.objects.filter(pk=old.pk).exists())  # superseded
+
+    def test_render_failure_marks_the_job_failed(self):
+        self.queue()
+
+        with mock.patch('reports.jobs.render_income_report_pdf', side_effect=RuntimeError('boom')), \
+                self.assertLogs('reports.jobs', 'ERROR'):
+            self.assertFalse(run_job(claim_next_job()))
+
+        job = ReportJob.objects.get()
+        self.assertEqual((job.status, job.error), ('FAILED', 'boom'))
+        self.assertIsNone(fresh_artifact(self.gym, 'INCOME_PDF', *self.jan))
+
+
+class IncomeReportPdfTests(TestCase):
+    def setUp(self):
+        self.gym = create_gym()
+
+    def render(self):
+        output = BytesIO()
+        pages = write_income_report(
+            output, self.gym, date(2025, 1, 1), date(2025, 1, 31), 'January 2025', today=date(2025, 2, 1)
+        )
+        reader = PdfReader(BytesIO(output.getvalue()))
+        return pages, reader, '\n'.join(page.extract_text() for page in reader.pages)
+
+    def test_long_report_lists_every_payment_across_pages(self):
+        member = create_member(self.gym)
+        for index in range(120):
+            Payment.objects.create(
+                gym=self.gym, member=member, amount=100 + index, payment_date=date(2025, 1, 1 + index % 28),
+                transaction_id=f'TXN{index:04d}'
+            )
+
+        pages, reader, text = self.render()
+
+        self.assertGreater(pages, 1)
+        self.assertEqual(len(reader.pages), pages)
+        missing = [index for index in range(120) if f'TXN{index:04d}' not in text]
+        self.assertEqual(missing, [])  # no 50-row cut-off
+        self.assertIn('Total Payments', text)
+
+    def test_names_outside_winansi_fall_back_to_ascii(self):
+        for index, name in enumerate(('José Gómez', 'Rāhul Śarmā', 'राम')):
+            Payment.objects.create(
+                gym=self.gym, member=create_member(self.gym, index, name=name), amount=500,
+                payment_date=date(2025, 1, 5)
+            )
+
+        _, _, text = self.render()
+
+        self.assertIn('José Gómez', text)  # cp1252 covers it
+        self.assertIn('Rahul Sarma', text)  # accents dropped
+        self.assertIn('???', text)  # no Latin form
@@ -4,7 +4,8 @@ Reports URLs
 from django.urls import path
 from .views import (
     IncomeReportView, MemberReportView, MonthlyDueListView,
-    ExportIncomeReportPDFView
+    ExportIncomeReportPDFView, ReportJobListCreateView, ReportJobDetailView,
+    ReportJobDownloadView
 )
 
 app_name = 'reports'
@@ -14,4 +15,9 @@ urlpatterns = [
     path('members/', MemberReportView.as_view(), name='members'),
     path('monthly-due/', MonthlyDueListView.as_view(), name='monthly-due'),
     path('income/export-pdf/', ExportIncomeReportPDFView.as_view(), name='income-pdf'),
+    
+    # Off-request report jobs
+    path('jobs/', ReportJobListCreateView.as_view(), name='job-list'),
+    path('jobs/<uuid:pk>/', ReportJobDetailView.as_view(), name='job-detail'),
+    path('jobs/<uuid:pk>/download/', ReportJobDownloadView.as_view(), name='job-download'),
 ]
\ No newline at end of file
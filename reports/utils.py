@@ -1,124 +1,223 @@
 """
 Reports Utilities - PDF Generation
+
+The income report is written page by page (reports/pdfstream.py) while
+payment rows stream from the database, so a 100k-payment year costs the
+same memory as a 50-payment week. Output goes to a SpooledTemporaryFile:
+small reports stay in RAM, large ones spill to disk.
 """
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
-from io import BytesIO
 from datetime import date, timedelta
-from django.db.models import Sum
+from tempfile import SpooledTemporaryFile
+
+from django.db.models import Count, Sum
+from django.utils.dateparse import parse_date
+
 from payments.models import Payment
+from .pdfstream import StreamingPDFWriter
 
+PERIODS = ('today', 'this_week', 'this_month', 'this_year', 'custom')
 
-def generate_income_report_pdf(gym, period='this_month'):
-    """Generate income report PDF"""
-    
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.HexColor('#2C3E50'),
-        spaceAfter=20,
-        alignment=TA_CENTER
-    )
-    
-    elements.append(Paragraph(f"{gym.name}", title_style))
-    elements.append(Paragraph("INCOME REPORT", title_style))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Period calculation
-    today = date.today()
-    if period == 'this_month':
-        start_date = today.replace(day=1)
-        end_date = today
-        period_text = f"{today.strftime('%B %Y')}"
-    elif period == 'this_year':
-        start_date = today.replace(month=1, day=1)
-        end_date = today
-        period_text = f"Year {today.year}"
-    else:
-        start_date = today.replace(day=1)
-        end_date = today
-        period_text = "Custom Period"
-    
-    elements.append(Paragraph(f"Period: {period_text}", styles['Normal']))
-    elements.append(Paragraph(f"Generated on: {today.strftime('%d-%b-%Y')}", styles['Normal']))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Get payments
-    payments = Payment.objects.filter(
+SPOOL_MAX_SIZE = 4 * 1024 * 1024
+ROW_FETCH_SIZE = 2000
+
+
+def resolve_period(period, start_date=None, end_date=None, today=None):
+    """
+    (start_date, end_date, label) for a report period.
+    Unknown periods fall back to this_month; bad custom dates raise ValueError.
+    """
+    today = today or date.today()
+
+    if period == 'today':
+        return today, today, today.strftime('%d %B %Y')
+    if period == 'this_week':
+        return today - timedelta(days=today.weekday()), today, 'This Week'
+    if period == 'this_year':
+        return today.replace(month=1, day=1), today, f"Year {today.year}"
+    if period == 'custom':
+        if not start_date or not end_date:
+            raise ValueError('start_date and end_date required for custom period')
+        try:
+            start, end = parse_date(str(start_date)), parse_date(str(end_date))
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            raise ValueError('start_date and end_date must be YYYY-MM-DD')
+        if start > end:
+            raise ValueError('start_date must be before end_date')
+        return start, end, f"{start.strftime('%d-%b-%Y')} to {end.strftime('%d-%b-%Y')}"
+    return today.replace(day=1), today, today.strftime('%B %Y')
+
+
+def paid_payments(gym, start_date, end_date):
+    return Payment.objects.filter(
         gym=gym,
         payment_date__gte=start_date,
         payment_date__lte=end_date,
         status='PAID'
     )
-    
-    total_income = payments.aggregate(total=Sum('amount'))['total'] or 0
-    total_count = payments.count()
-    
-    # Summary table
-    summary_data = [
-        ['Total Payments', str(total_count)],
-        ['Total Income', f"₹{total_income}"],
+
+
+def income_summary(payments):
+    """Totals + per-method breakdown in ONE grouped query"""
+    labels = dict(Payment.PAYMENT_METHOD_CHOICES)
+    methods = {label: {'amount': 0, 'count': 0} for label in labels.values()}
+    total_income, total_count = 0, 0
+
+    for row in payments.order_by().values('payment_method').annotate(total=Sum('amount'), count=Count('id')):
+        label = labels.get(row['payment_method'], row['payment_method'])
+        methods[label] = {'amount': row['total'] or 0, 'count': row['count']}
+        total_income += row['total'] or 0
+        total_count += row['count']
+
+    return {
+        'total_income': total_income,
+        'total_payments': total_count,
+        'payment_methods': methods,
+    }
+
+
+# ==============================================
+# 📄 INCOME REPORT PDF
+# ==============================================
+
+DARK = (0.173, 0.243, 0.314)     # #2C3E50
+BLUE = (0.204, 0.596, 0.859)     # #3498DB
+GREY = (0.925, 0.941, 0.945)     # #ECF0F1
+WHITE = (1, 1, 1)
+
+MARGIN = 50
+ROW_HEIGHT = 14
+# Details table columns: (x, header, align)
+COLUMNS = (
+    (MARGIN, 'Date', 'left'),
+    (MARGIN + 75, 'Member', 'left'),
+    (MARGIN + 300, 'Amount', 'right'),
+    (MARGIN + 320, 'Method', 'left'),
+    (MARGIN + 400, 'Transaction ID', 'left'),
+)
+
+
+class _IncomeReportLayout:
+    """Cursor-based layout: starts a new page whenever the next row won't fit"""
+
+    def __init__(self, writer, gym_name):
+        self.writer = writer
+        self.gym_name = gym_name
+        self.page = None
+        self.y = 0
+
+    def new_page(self):
+        self.page = self.writer.new_page()
+        self.page.text(MARGIN, 30, self.gym_name, size=8, color=DARK)
+        self.page.text_right(self.writer.width - MARGIN, 30, f"Page {self.writer.page_count}", size=8, color=DARK)
+        self.y = self.writer.height - MARGIN
+
+    def ensure_space(self, height):
+        if self.page is None or self.y - height < MARGIN + 10:
+            self.new_page()
+            return True
+        return False
+
+    def table_header(self):
+        width = self.writer.width - 2 * MARGIN
+        self.page.rect(MARGIN - 4, self.y - 4, width + 8, ROW_HEIGHT, GREY)
+        for x, header, align in COLUMNS:
+            if align == 'right':
+                self.page.text_right(x, self.y, header, font='Helvetica-Bold')
+            else:
+                self.page.text(x, self.y, header, font='Helvetica-Bold')
+        self.y -= ROW_HEIGHT + 2
+
+    def row(self, cells):
+        if self.ensure_space(ROW_HEIGHT):
+            self.table_header()
+        for (x, _, align), value in zip(COLUMNS, cells):
+            if align == 'right':
+                self.page.text_right(x, self.y, value)
+            else:
+                self.page.text(x, self.y, value)
+        self.y -= ROW_HEIGHT
+
+
+def write_income_report(output, gym, start_date, end_date, period_text, today=None):
+    """Write the full income report PDF to `output` (any writable binary file)"""
+    today = today or date.today()
+    payments = paid_payments(gym, start_date, end_date)
+    summary = income_summary(payments)
+
+    writer = StreamingPDFWriter(output, title=f"{gym.name} - Income Report")
+    layout = _IncomeReportLayout(writer, gym.name)
+    layout.new_page()
+    page, center = layout.page, writer.width / 2
+
+    # Title block
+    layout.y -= 10
+    page.text_center(center, layout.y, gym.name, font='Helvetica-Bold', size=20, color=DARK)
+    layout.y -= 28
+    page.text_center(center, layout.y, "INCOME REPORT", font='Helvetica-Bold', size=20, color=DARK)
+    layout.y -= 36
+    page.text(MARGIN, layout.y, f"Period: {period_text}", size=10)
+    layout.y -= 14
+    page.text(MARGIN, layout.y, f"Generated on: {today.strftime('%d-%b-%Y')}", size=10)
+    layout.y -= 30
+
+    # Summary (🛡️ Rs. instead of ₹: standard PDF fonts have no rupee glyph)
+    summary_rows = [
+        ('Total Payments', str(summary['total_payments']), True),
+        ('Total Income', f"Rs. {summary['total_income']}", True),
+    ] + [
+        (label, f"Rs. {values['amount']} ({values['count']})", False)
+        for label, values in summary['payment_methods'].items() if values['count']
     ]
-    
-    # Payment method breakdown
-    for method, label in Payment.PAYMENT_METHOD_CHOICES:
-        method_total = payments.filter(payment_method=method).aggregate(total=Sum('amount'))['total'] or 0
-        method_count = payments.filter(payment_method=method).count()
-        if method_count > 0:
-            summary_data.append([f"{label}", f"₹{method_total} ({method_count})"])
-    
-    summary_table = Table(summary_data, colWidths=[3*inch, 3*inch])
-    summary_table.setStyle(TableStyle([
-        ('FONTSIZE', (0, 0), (-1, -1), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (0, 0), (-1, 1), colors.HexColor('#3498DB')),
-        ('TEXTCOLOR', (0, 0), (-1, 1), colors.white),
-        ('FONTNAME', (0, 0), (-1, 1), 'Helvetica-Bold'),
-    ]))
-    
-    elements.append(summary_table)
-    elements.append(Spacer(1, 0.5*inch))
-    
-    # Payment details
-    if payments.exists():
-        elements.append(Paragraph("Payment Details", styles['Heading2']))
-        elements.append(Spacer(1, 0.2*inch))
-        
-        payment_data = [['Date', 'Member', 'Amount', 'Method']]
-        
-        for payment in payments.order_by('-payment_date')[:50]:  # Limit to 50
-            payment_data.append([
-                payment.payment_date.strftime('%d-%b'),
-                payment.member.name[:20],
-                f"₹{payment.amount}",
-                payment.get_payment_method_display()
-            ])
-        
-        payment_table = Table(payment_data, colWidths=[1*inch, 2.5*inch, 1.5*inch, 1.5*inch])
-        payment_table.setStyle(TableStyle([
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#ECF0F1')),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
-        ]))
-        
-        elements.append(payment_table)
-    
-    # Build PDF
-    doc.build(elements)
-    
-    buffer.seek(0)
-    return buffer
\ No newline at end of file
+    box_width = 6 * 72
+    left = (writer.width - box_width) / 2
+    for label, value, highlight in summary_rows:
+        if highlight:
+            page.rect(left, layout.y - 7, box_width, 22, BLUE)
+        color = WHITE if highlight else (0, 0, 0)
+        font = 'Helvetica-Bold' if highlight else 'Helvetica'
+        page.text(left + 8, layout.y, label, font=font, size=12, color=color)
+        page.text_right(left + box_width - 8, layout.y, value, font=font, size=12, color=color)
+        page.line(left, layout.y - 7, left + box_width, layout.y - 7)
+        layout.y -= 22
+    layout.y -= 24
+
+    # Every payment in the period, streamed (no [:50] cut-off, no per-row member query)
+    if summary['total_payments']:
+        layout.ensure_space(60)
+        layout.page.text(MARGIN, layout.y, "Payment Details", font='Helvetica-Bold', size=14, color=DARK)
+        layout.y -= 22
+        layout.table_header()
+
+        labels = dict(Payment.PAYMENT_METHOD_CHOICES)
+        rows = (
+            payments.order_by('-payment_date', '-created_at')
+            .values_list('payment_date', 'member__name', 'amount', 'payment_method', 'transaction_id')
+            .iterator(chunk_size=ROW_FETCH_SIZE)
+        )
+        for payment_date, member_name, amount, method, transaction_id in rows:
+            layout.row((
+                payment_date.strftime('%d-%b-%Y'),
+                (member_name or '')[:40],
+                f"Rs. {amount}",
+                labels.get(method, method),
+                (transaction_id or '')[:24],
+            ))
+
+    writer.close()
+    return writer.page_count
+
+
+def render_income_report_pdf(gym, start_date, end_date, period_text):
+    """Income report PDF for resolved dates, as a rewound SpooledTemporaryFile"""
+    output = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    write_income_report(output, gym, start_date, end_date, period_text)
+    output.seek(0)
+    return output
+
+
+def generate_income_report_pdf(gym, period='this_month', start_date=None, end_date=None):
+    """Income report PDF as a rewound SpooledTemporaryFile"""
+    start, end, period_text = resolve_period(period, start_date, end_date)
+    return render_income_report_pdf(gym, start, end, period_text)
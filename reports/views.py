@@ -4,11 +4,15 @@ Reports Views
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count, Q
+from django.db.models import Sum, Count, Q, Exists, OuterRef
 from datetime import date, timedelta
 from payments.models import Payment
 from members.models import Member
-from .utils import generate_income_report_pdf
+from .models import ReportJob
+from .jobs import enqueue_report, fresh_artifact
+from .serializers import ReportJobSerializer, ReportJobCreateSerializer
+from .cache import cached_member_report, cached_report, cached_report_file
+from .utils import income_summary, paid_payments, render_income_report_pdf, resolve_period
 
 
 class IncomeReportView(APIView):
@@ -20,71 +24,50 @@ class IncomeReportView(APIView):
         
         # Get period (default: this_month)
         period = request.query_params.get('period', 'this_month')
-        today = date.today()
-        
-        if period == 'today':
-            start_date = today
-            end_date = today
-        elif period == 'this_week':
-            start_date = today - timedelta(days=today.weekday())
-            end_date = today
-        elif period == 'this_month':
-            start_date = today.replace(day=1)
-            end_date = today
-        elif period == 'this_year':
-            start_date = today.replace(month=1, day=1)
-            end_date = today
-        elif period == 'custom':
-            start_date = request.query_params.get('start_date')
-            end_date = request.query_params.get('end_date')
-            if not start_date or not end_date:
-                return Response({'error': 'start_date and end_date required for custom period'}, status=400)
-        else:
-            start_date = today.replace(day=1)
-            end_date = today
+        try:
+            start_date, end_date, _ = resolve_period(
+                period,
+                request.query_params.get('start_date'),
+                request.query_params.get('end_date')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
         
-        # Get payments in period
-        payments = Payment.objects.filter(
-            gym=gym,
-            payment_date__gte=start_date,
-            payment_date__lte=end_date,
-            status='PAID'
-        )
-        
-        # Calculate totals
-        total_income = payments.aggregate(total=Sum('amount'))['total'] or 0
-        total_payments = payments.count()
-        
-        # Payment method breakdown
-        payment_methods = {}
-        for method, label in Payment.PAYMENT_METHOD_CHOICES:
-            amount = payments.filter(payment_method=method).aggregate(total=Sum('amount'))['total'] or 0
-            count = payments.filter(payment_method=method).count()
-            payment_methods[label] = {
-                'amount': float(amount),
-                'count': count
+        def build():
+            # Get payments in period
+            payments = paid_payments(gym, start_date, end_date)
+            
+            # Totals + payment method breakdown (one grouped query)
+            summary = income_summary(payments)
+            
+            # Daily breakdown (for charts) - one grouped query, zero-filled
+            per_day = dict(
+                payments.order_by().values_list('payment_date').annotate(total=Sum('amount'))
+            )
+            daily_data = []
+            current_date = start_date
+            while current_date <= end_date:
+                daily_data.append({
+                    'date': current_date.strftime('%Y-%m-%d'),
+                    'amount': float(per_day.get(current_date) or 0)
+                })
+                current_date += timedelta(days=1)
+            
+            return {
+                'period': period,
+                'start_date': start_date,
+                'end_date': end_date,
+                'total_income': float(summary['total_income']),
+                'total_payments': summary['total_payments'],
+                'payment_methods': {
+                    label: {'amount': float(values['amount']), 'count': values['count']}
+                    for label, values in summary['payment_methods'].items()
+                },
+                'daily_breakdown': daily_data
             }
         
-        # Daily breakdown (for charts)
-        daily_data = []
-        current_date = start_date
-        while current_date <= end_date:
-            day_total = payments.filter(payment_date=current_date).aggregate(total=Sum('amount'))['total'] or 0
-            daily_data.append({
-                'date': current_date.strftime('%Y-%m-%d'),
-                'amount': float(day_total)
-            })
-            current_date += timedelta(days=1)
-        
-        return Response({
-            'period': period,
-            'start_date': start_date,
-            'end_date': end_date,
-            'total_income': float(total_income),
-            'total_payments': total_payments,
-            'payment_methods': payment_methods,
-            'daily_breakdown': daily_data
-        })
+        # ⚡ Closed periods are served from cache until a payment in them changes
+        return Response(cached_report(gym.pk, 'income', start_date, end_date, build, extra=period))
 
 
 class MemberReportView(APIView):
@@ -94,95 +77,103 @@ class MemberReportView(APIView):
     def get(self, request):
         gym = request.user.gym
         today = date.today()
+        return Response(cached_member_report(gym.pk, lambda: self.build(gym, today), today=today))
+    
+    @staticmethod
+    def build(gym, today):
         month_start = today.replace(day=1)
+        expiry_date = today + timedelta(days=7)
         
-        # Overall stats
-        total_members = Member.objects.filter(gym=gym).count()
-        active_members = Member.objects.filter(gym=gym, status='ACTIVE').count()
-        inactive_members = Member.objects.filter(gym=gym, status='INACTIVE').count()
-        expired_members = Member.objects.filter(gym=gym, status='EXPIRED').count()
-        
-        # New members this month
-        new_this_month = Member.objects.filter(
-            gym=gym,
-            created_at__gte=month_start
-        ).count()
-        
-        # Gender distribution
-        male = Member.objects.filter(gym=gym, gender='M').count()
-        female = Member.objects.filter(gym=gym, gender='F').count()
-        other = Member.objects.filter(gym=gym, gender='O').count()
+        # Member has no status column: active/expired derive from is_active + end date
+        current = Q(is_active=True, membership_end_date__gte=today)
+        members = Member.objects.filter(gym=gym)
         
-        # Expiring soon (next 7 days)
-        expiry_date = today + timedelta(days=7)
-        expiring_soon = Member.objects.filter(
-            gym=gym,
-            status='ACTIVE',
-            membership_end_date__gte=today,
-            membership_end_date__lte=expiry_date
-        ).count()
+        # Overall stats - one aggregate instead of a COUNT per number
+        stats = members.aggregate(
+            total_members=Count('id'),
+            active_members=Count('id', filter=current),
+            inactive_members=Count('id', filter=Q(is_active=False)),
+            expired_members=Count('id', filter=Q(is_active=True, membership_end_date__lt=today)),
+            new_this_month=Count('id', filter=Q(created_at__date__gte=month_start)),
+            expiring_soon=Count('id', filter=current & Q(membership_end_date__lte=expiry_date)),
+            male=Count('id', filter=Q(gender='M')),
+            female=Count('id', filter=Q(gender='F')),
+            other=Count('id', filter=Q(gender='O')),
+        )
         
         # Membership type distribution
-        membership_types = Member.objects.filter(gym=gym).values('membership_type').annotate(
+        membership_types = members.order_by().values('membership_type').annotate(
             count=Count('id')
         )
         
-        return Response({
-            'total_members': total_members,
-            'active_members': active_members,
-            'inactive_members': inactive_members,
-            'expired_members': expired_members,
-            'new_this_month': new_this_month,
-            'expiring_soon': expiring_soon,
+        return {
+            'total_members': stats['total_members'],
+            'active_members': stats['active_members'],
+            'inactive_members': stats['inactive_members'],
+            'expired_members': stats['expired_members'],
+            'new_this_month': stats['new_this_month'],
+            'expiring_soon': stats['expiring_soon'],
             'gender_distribution': {
-                'male': male,
-                'female': female,
-                'other': other
+                'male': stats['male'],
+                'female': stats['female'],
+                'other': stats['other']
             },
             'membership_types': list(membership_types)
-        })
+        }
 
 
 class MonthlyDueListView(APIView):
-    """List of members with pending payments"""
+    """
+    List of active members with no PAID payment for a billing month.
+    ?month=2025-01 (or 'January 2025'), default current month.
+    Single anti-join query + one SQL aggregate for totals.
+    """
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
         from members.serializers import MemberListSerializer
         
         gym = request.user.gym
-        today = date.today()
-        current_month = today.strftime('%B %Y')
-        
-        # Get all active members
-        active_members = Member.objects.filter(gym=gym, status='ACTIVE')
-        
-        due_members = []
-        for member in active_members:
-            # Check if payment exists for current month
-            has_paid = Payment.objects.filter(
-                gym=gym,
-                member=member,
-                month=current_month,
-                status='PAID'
-            ).exists()
-            
-            if not has_paid:
-                due_members.append({
-                    'member': MemberListSerializer(member).data,
-                    'amount_due': float(member.membership_fee),
-                    'month': current_month
-                })
+        month_param = request.query_params.get('month')
+        if month_param:
+            billing_period = Payment.parse_month(month_param)
+            if billing_period is None:
+                return Response({'error': 'month must look like 2025-01 or January 2025'}, status=400)
+        else:
+            billing_period = date.today().replace(day=1)
+        current_month = billing_period.strftime('%B %Y')
+        
+        # gym first: lets the (gym, billing_period, status) index drive the anti-join
+        paid_for_period = Payment.objects.filter(
+            gym=gym,
+            member=OuterRef('pk'),
+            billing_period=billing_period,
+            status='PAID'
+        )
+        due_members = Member.objects.filter(gym=gym, is_active=True).filter(
+            ~Exists(paid_for_period)
+        ).order_by('name')
+        
+        totals = due_members.aggregate(count=Count('id'), amount=Sum('membership_fee'))
         
         return Response({
             'month': current_month,
-            'total_due': len(due_members),
-            'members': due_members
+            'billing_period': billing_period,
+            'total_due': totals['count'],
+            'total_amount_due': float(totals['amount'] or 0),
+            'members': [
+                {
+                    'member': MemberListSerializer(member).data,
+                    'amount_due': float(member.membership_fee),
+                    'month': current_month
+                }
+                for member in due_members
+            ]
         })
 
 
 class ExportIncomeReportPDFView(APIView):
-    """Export income report as PDF"""
+    """Export income report as PDF (every payment in the period, streamed)"""
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
@@ -191,11 +182,100 @@ class ExportIncomeReportPDFView(APIView):
         gym = request.user.gym
         period = request.query_params.get('period', 'this_month')
         
-        # Generate PDF
-        pdf_file = generate_income_report_pdf(gym, period)
+        try:
+            start_date, end_date, period_text = resolve_period(
+                period,
+                request.query_params.get('start_date'),
+                request.query_params.get('end_date')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        
+        # ⚡ Pre-rendered (nightly / job) artifact with unchanged data -> serve the file
+        job = fresh_artifact(gym, 'INCOME_PDF', start_date, end_date)
+        if job:
+            return FileResponse(
+                job.artifact.open('rb'),
+                as_attachment=True,
+                filename=f'income_report_{period}.pdf',
+                content_type='application/pdf'
+            )
+        
+        # Generate PDF (cached bytes for anything that fits, streamed otherwise)
+        pdf_file = cached_report_file(
+            gym.pk, 'income-pdf', start_date, end_date,
+            lambda: render_income_report_pdf(gym, start_date, end_date, period_text),
+            extra=period
+        )
         
         return FileResponse(
             pdf_file,
             as_attachment=True,
-            filename=f'income_report_{period}.pdf'
-        )
\ No newline at end of file
+            filename=f'income_report_{period}.pdf',
+            content_type='application/pdf'
+        )
+
+
+class ReportJobListCreateView(APIView):
+    """
+    GET: recent report jobs for this gym
+    POST: queue a report render -> 202 (or 200 with the ready job if data is unchanged)
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        jobs = ReportJob.objects.filter(gym=request.user.gym)[:50]
+        return Response(ReportJobSerializer(jobs, many=True).data)
+    
+    def post(self, request):
+        serializer = ReportJobCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        
+        data = serializer.validated_data
+        gym = request.user.gym
+        
+        job = fresh_artifact(gym, data['report_type'], data['period_start'], data['period_end'])
+        if job:
+            return Response(ReportJobSerializer(job).data, status=200)
+        
+        job = enqueue_report(
+            gym, data['report_type'], data['period_start'], data['period_end'],
+            period_label=data['period_label'], user=request.user
+        )
+        return Response(ReportJobSerializer(job).data, status=202)
+
+
+class ReportJobDetailView(APIView):
+    """Poll a report job"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        try:
+            job = ReportJob.objects.get(pk=pk, gym=request.user.gym)
+        except ReportJob.DoesNotExist:
+            return Response({'error': 'Report job not found'}, status=404)
+        return Response(ReportJobSerializer(job).data)
+
+
+class ReportJobDownloadView(APIView):
+    """Download a finished report artifact"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        from django.http import FileResponse
+        
+        try:
+            job = ReportJob.objects.get(pk=pk, gym=request.user.gym)
+        except ReportJob.DoesNotExist:
+            return Response({'error': 'Report job not found'}, status=404)
+        
+        if job.status != 'DONE' or not job.artifact:
+            return Response({'error': 'Report not ready', 'status': job.status}, status=409)
+        
+        return FileResponse(
+            job.artifact.open('rb'),
+            as_attachment=True,
+            filename=f"income_report_{job.period_start:%Y%m%d}_{job.period_end:%Y%m%d}.pdf",
+            content_type='application/pdf'
+        )
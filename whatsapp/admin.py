@@ -2,5 +2,17 @@
 WhatsApp Admin
 """
 from django.contrib import admin
+from .models import OutboundMessage, RateLimitBucket
 
-# WhatsApp app uses services only, no admin needed
\ No newline at end of file
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ['to_phone', 'gym', 'kind', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at']
+    list_filter = ['status', 'kind', 'created_at']
+    search_fields = ['to_phone', 'provider_message_id']
+    readonly_fields = ['claim_token', 'claimed_at', 'provider_message_id', 'created_at']
+
+
+@admin.register(RateLimitBucket)
+class RateLimitBucketAdmin(admin.ModelAdmin):
+    list_display = ['key', 'tokens', 'refilled_at']
@@ -0,0 +1,72 @@
+"""
+WhatsApp Dispatch
+Bulk sends fanned out over a bounded thread pool.
+
+Each send is one blocking HTTPS call that mostly waits on the network,
+so N threads give ~N x throughput until the API rate limit. Worker
+threads only talk to the API; all database writes happen afterwards on
+the calling thread in one bulk_update (see outbox.py).
+
+The API rate limit is shared by every process sending for the same phone
+number, so the calling thread takes a token from the shared bucket
+(ratelimit.py) before handing each message to the pool. A message that
+can't get one within WHATSAPP_RATE_LIMIT_TIMEOUT is not sent and comes
+back as a retryable failure. One token is one HTTP attempt: with the
+limiter on, the transport does not re-POST a 429 by itself (see
+transport.py), the outbox retries it later and takes a new token.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .ratelimit import get_rate_limiter
+from .services import WhatsAppService
+
+RATE_LIMITED = {'success': False, 'error': 'Rate limited (local token bucket)', 'retryable': True}
+
+
+def _concurrency(concurrency):
+    if concurrency is None:
+        concurrency = getattr(settings, 'WHATSAPP_SEND_CONCURRENCY', 8)
+    return max(1, int(concurrency))
+
+
+def dispatch_messages(messages, concurrency=None, service=None, limiter=None):
+    """
+    Send [(key, phone, text), ...] concurrently.
+    Returns {key: result} where result is WhatsAppService.send_message()'s dict.
+    """
+    service = service or WhatsAppService()
+    limiter = limiter or get_rate_limiter()
+    timeout = getattr(settings, 'WHATSAPP_RATE_LIMIT_TIMEOUT', 30)
+    messages = list(messages)
+    if not messages:
+        return {}
+
+    def send(phone, text):
+        try:
+            return service.send_message(phone, text)
+        except Exception as e:  # never let one bad row kill the batch
+            return {'success': False, 'error': str(e)}
+
+    def admitted():
+        return limiter is None or limiter.acquire(block=True, timeout=timeout)
+
+    workers = min(_concurrency(concurrency), len(messages))
+    if workers == 1:
+        return {
+            key: send(phone, text) if admitted() else dict(RATE_LIMITED)
+            for key, phone, text in messages
+        }
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='whatsapp-send') as pool:
+        futures = {}
+        for key, phone, text in messages:
+            if admitted():
+                futures[key] = pool.submit(send, phone, text)
+            else:
+                results[key] = dict(RATE_LIMITED)
+        for key, future in futures.items():
+            results[key] = future.result()
+    return results
@@ -0,0 +1,139 @@
+"""
+Fake WhatsApp Cloud API
+Tiny local stand-in for graph.facebook.com's /messages endpoint, for
+benchmarks, load tests and manual testing. Never used in production code paths.
+
+    server = start_fake_api(latency=0.2, error_rate=0.02, rate_limit=80)   # background thread
+    settings.WHATSAPP_API_BASE = server.url
+    ...
+    server.shutdown()
+
+or as a standalone process: `python manage.py run_fake_whatsapp_api`.
+
+  latency      seconds per call (+/- jitter fraction, uniformly)
+  error_rate   share of calls answered 500 (after the latency)
+  rate_limit   accepted calls per second; beyond that 429 + Retry-After,
+               Graph error code 130429 like the real API
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with keep-alive, Nagle + delayed ACK adds ~40 ms each
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # keep benchmark output clean
+        pass
+
+    def _reply(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+
+        if not self.path.endswith('/messages') or not self.headers.get('Authorization', '').startswith('Bearer '):
+            self._reply(401, {'error': {'message': 'Invalid OAuth access token', 'code': 190}})
+            return
+
+        if not server.take_rate_slot():
+            self._reply(429, {'error': {'message': '(#130429) Rate limit hit', 'code': 130429}},
+                        headers={'Retry-After': str(server.retry_after)})
+            return
+
+        server.simulate_latency()
+
+        if server.should_fail():
+            self._reply(500, {'error': {'message': 'An unknown error has occurred.', 'code': 1}})
+            return
+
+        with server.lock:
+            server.request_count += 1
+
+        self._reply(200, {
+            'messaging_product': 'whatsapp',
+            'contacts': [{'input': body.get('to'), 'wa_id': body.get('to')}],
+            'messages': [{'id': f"wamid.{uuid.uuid4().hex}"}],
+        })
+
+
+class FakeWhatsAppServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # default backlog of 5 refuses connections under load
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate_limit=0, retry_after=1, seed=None):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0      # accepted (200) sends
+        self.error_count = 0        # simulated 500s
+        self.throttled_count = 0    # 429s
+        self._window = None
+        self._window_count = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def take_rate_slot(self):
+        """Fixed one-second windows, like a per-number messages/second cap"""
+        if not self.rate_limit:
+            return True
+        with self.lock:
+            window = int(time.monotonic())
+            if window != self._window:
+                self._window = window
+                self._window_count = 0
+            if self._window_count >= self.rate_limit:
+                self.throttled_count += 1
+                return False
+            self._window_count += 1
+            return True
+
+    def simulate_latency(self):
+        if not self.latency:
+            return
+        with self.lock:
+            spread = self.random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, self.latency * (1 + spread)))
+
+    def should_fail(self):
+        if not self.error_rate:
+            return False
+        with self.lock:
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.error_count += 1
+        return failed
+
+    def stats(self):
+        with self.lock:
+            return {'ok': self.request_count, 'errors': self.error_count, 'throttled': self.throttled_count}
+
+
+def start_fake_api(host='127.0.0.1', port=0, latency=0.0, **options):
+    """Start the fake API on a daemon thread; port 0 picks a free port"""
+    server = FakeWhatsAppServer(host, port, latency=latency, **options)
+    threading.Thread(target=server.serve_forever, daemon=True, name='fake-whatsapp-api').start()
+    return server
@@ -0,0 +1,50 @@
+"""
+Bulk send benchmark against the local fake Graph API (no real messages, no DB writes).
+    python manage.py benchmark_whatsapp_dispatch --count 200 --latency 0.2 --concurrency 1,8,32
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from whatsapp.dispatch import dispatch_messages
+from whatsapp.fake_api import start_fake_api
+from whatsapp.services import WhatsAppService
+from whatsapp.transport import WhatsAppTransport
+
+
+class Command(BaseCommand):
+    help = 'Measure bulk WhatsApp send throughput at different concurrency levels'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200, help='Messages per run')
+        parser.add_argument('--latency', type=float, default=0.2, help='Fake API response time (seconds)')
+        parser.add_argument('--concurrency', default='1,4,8,16,32', help='Comma-separated levels to try')
+
+    def handle(self, *args, **options):
+        server = start_fake_api(latency=options['latency'])
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        messages = [(i, f"98{i:08d}", f"Benchmark message {i}") for i in range(options['count'])]
+
+        try:
+            # Own pool sized for the highest level, so no run is starved of connections
+            service = WhatsAppService(transport=WhatsAppTransport(pool_size=max(levels)))
+            service.base_url = f"{server.url}/{service.api_version}/1234567890/messages"
+            service.access_token = 'benchmark-token'
+
+            self.stdout.write(
+                f"{options['count']} messages, fake API latency {options['latency'] * 1000:.0f} ms\n"
+                f"{'concurrency':>12}{'seconds':>10}{'msg/s':>10}{'speedup':>10}{'failed':>8}"
+            )
+            baseline = None
+            for level in levels:
+                started = time.perf_counter()
+                results = dispatch_messages(messages, concurrency=level, service=service)
+                elapsed = time.perf_counter() - started
+                failed = sum(1 for result in results.values() if not result['success'])
+                baseline = baseline or elapsed
+                self.stdout.write(
+                    f"{level:>12}{elapsed:>10.2f}{len(messages) / elapsed:>10.1f}"
+                    f"{baseline / elapsed:>9.1f}x{failed:>8}"
+                )
+        finally:
+            server.shutdown()
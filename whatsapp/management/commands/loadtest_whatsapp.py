@@ -0,0 +1,196 @@
+"""
+End-to-end WhatsApp load test against the fake Graph API.
+    python manage.py loadtest_whatsapp --members 1000 --receipts 300 --latency 0.2 --error-rate 0.02 --rate-limit 80
+    python manage.py loadtest_whatsapp --api-base http://127.0.0.1:8089     # a running run_fake_whatsapp_api
+
+Creates a throw-away gym (members expiring in 3 days, paid receipts), then
+  1. drives AutoGenerateRemindersView + BulkSendRemindersView and one
+     SendReceiptWhatsAppView call per receipt (timed per request)
+  2. drains the load-test gym's outbox rows with the real worker code until
+     every message is SENT or DEAD (other gyms' messages are never claimed)
+and reports view latency, delivery throughput, HTTP latency percentiles and
+retries (transport and outbox). The gym is deleted afterwards unless --keep.
+"""
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from fitness.models import Gym, User
+from members.models import Member
+from payments.models import Payment, Receipt
+from reminders.views import AutoGenerateRemindersView, BulkSendRemindersView
+from whatsapp.fake_api import start_fake_api
+from whatsapp.models import OutboundMessage
+from whatsapp.outbox import process_outbox
+from whatsapp.transport import transport_stats, get_transport
+from whatsapp.views import SendReceiptWhatsAppView
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return '-'
+    pick = lambda p: samples[min(len(samples) - 1, int(len(samples) * p))] * 1000  # noqa: E731
+    return f"p50 {pick(0.50):.1f} / p95 {pick(0.95):.1f} / p99 {pick(0.99):.1f} ms"
+
+
+class Command(BaseCommand):
+    help = 'Load-test reminder and receipt sending end to end against the fake WhatsApp API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=500, help='Members (= expiry reminders)')
+        parser.add_argument('--receipts', type=int, default=100, help='Receipts sent one request each')
+        parser.add_argument('--api-base', help='Use an already running fake API instead of starting one')
+        parser.add_argument('--latency', type=float, default=0.1, help='Fake API seconds per call')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fake API share of 500s')
+        parser.add_argument('--rate-limit', type=int, default=0, help='Fake API calls/second before 429')
+        parser.add_argument('--concurrency', type=int, default=16, help='Outbox parallel sends')
+        parser.add_argument('--batch-size', type=int, default=100, help='Outbox claim size')
+        parser.add_argument('--backoff', type=float, default=1.0, help='Outbox retry backoff base (seconds)')
+        parser.add_argument('--timeout', type=float, default=300, help='Give up draining after N seconds')
+        parser.add_argument('--keep', action='store_true', help='Keep the load-test gym and its data')
+
+    # ==============================================
+    # 🏗️ FIXTURES
+    # ==============================================
+
+    def _create_gym(self, members, receipts):
+        tag = uuid.uuid4().hex[:8]
+        today = date.today()
+        with transaction.atomic():
+            owner = User.objects.create_user(
+                email=f'loadtest-{tag}@example.invalid', password=uuid.uuid4().hex,
+                first_name='Load', last_name='Test', role='GYM_OWNER'
+            )
+            gym = Gym.objects.create(
+                owner=owner, name=f'Load Test Gym {tag}', address='-', city='-', state='-',
+                pincode='000000', phone='9000000000', email=owner.email, whatsapp_enabled=True
+            )
+            owner.gym = gym
+            owner.save(update_fields=['gym'])
+
+            created = Member.objects.bulk_create([
+                Member(
+                    gym=gym, name=f'Load Member {i}', phone=f'7{i:09d}', membership_fee=1000,
+                    join_date=today - timedelta(days=27), membership_start_date=today - timedelta(days=27),
+                    membership_end_date=today + timedelta(days=3)
+                )
+                for i in range(members)
+            ], batch_size=500)
+
+            payers = created[:receipts]
+            payments = Payment.objects.bulk_create([
+                Payment(gym=gym, member=member, amount=1000, status='PAID') for member in payers
+            ], batch_size=500)
+            numbers = Receipt.generate_receipt_numbers(gym, len(payments))
+            Receipt.objects.bulk_create([
+                Receipt(payment=payment, gym=gym, member=payment.member, receipt_number=number)
+                for payment, number in zip(payments, numbers)
+            ], batch_size=500)
+        return owner, gym
+
+    # ==============================================
+    # 🚀 RUN
+    # ==============================================
+
+    def _call(self, factory, user, view, path, **kwargs):
+        request = factory.post(path, secure=True)
+        force_authenticate(request, user=user)
+        started = time.perf_counter()
+        response = view(request, **kwargs)
+        return time.perf_counter() - started, response
+
+    def _drain(self, gym, options):
+        started = time.perf_counter()
+        while time.perf_counter() - started < options['timeout']:
+            # Only the load-test gym: other gyms' messages must never reach the fake API
+            process_outbox(batch_size=options['batch_size'], concurrency=options['concurrency'], gym=gym)
+            if not OutboundMessage.objects.filter(gym=gym, status__in=['PENDING', 'SENDING']).exists():
+                break
+            time.sleep(0.05)  # remaining ones are waiting out their backoff
+        return time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        server = None
+        api_base = options['api_base']
+        if not api_base:
+            server = start_fake_api(
+                latency=options['latency'], jitter=0.2,
+                error_rate=options['error_rate'], rate_limit=options['rate_limit']
+            )
+            api_base = server.url
+
+        owner, gym = self._create_gym(options['members'], options['receipts'])
+        factory = APIRequestFactory()
+        try:
+            with override_settings(
+                WHATSAPP_API_BASE=api_base,
+                WHATSAPP_PHONE_NUMBER_ID='1',
+                WHATSAPP_ACCESS_TOKEN='loadtest',
+                WHATSAPP_SEND_CONCURRENCY=options['concurrency'],
+                WHATSAPP_OUTBOX_BACKOFF_BASE=options['backoff'],
+                WHATSAPP_OUTBOX_BACKOFF_MAX=options['backoff'] * 16,
+            ):
+                get_transport().metrics.reset()
+
+                generate_time, _ = self._call(
+                    factory, owner, AutoGenerateRemindersView.as_view(), '/api/reminders/auto-generate/'
+                )
+                bulk_time, response = self._call(
+                    factory, owner, BulkSendRemindersView.as_view(), '/api/reminders/bulk-send/'
+                )
+                queued = response.data.get('queued', 0)
+
+                receipt_view = SendReceiptWhatsAppView.as_view()
+                receipt_times = []
+                for receipt_id in Receipt.objects.filter(gym=gym).values_list('pk', flat=True):
+                    elapsed, _ = self._call(
+                        factory, owner, receipt_view, f'/api/whatsapp/send-receipt/{receipt_id}/',
+                        receipt_id=receipt_id
+                    )
+                    receipt_times.append(elapsed)
+
+                drain_time = self._drain(gym, options)
+                http = transport_stats()
+
+            messages = OutboundMessage.objects.filter(gym=gym)
+            sent = messages.filter(status='SENT').count()
+            dead = messages.filter(status='DEAD').count()
+            left = messages.filter(status__in=['PENDING', 'SENDING']).count()
+            retried = messages.filter(attempts__gt=1).count()
+            extra_attempts = sum(n - 1 for n in messages.filter(attempts__gt=1).values_list('attempts', flat=True))
+        finally:
+            if server:
+                server.shutdown()
+            if not options['keep']:
+                owner.delete()  # cascades to the gym and everything in it
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Load test: {options['members']} members, {options['receipts']} receipts, "
+            f"fake API {options['latency'] * 1000:.0f} ms, {options['error_rate']:.0%} errors, "
+            f"rate limit {options['rate_limit'] or 'none'}, concurrency {options['concurrency']}"
+        ))
+        self.stdout.write(
+            f"Views\n"
+            f"  auto-generate        {generate_time * 1000:8.1f} ms\n"
+            f"  bulk-send            {bulk_time * 1000:8.1f} ms  ({queued} queued)\n"
+            f"  send-receipt x{len(receipt_times):<6} {percentiles(receipt_times)}\n"
+            f"Delivery\n"
+            f"  sent {sent}, dead {dead}, unfinished {left} in {drain_time:.2f}s"
+            f"  ({sent / drain_time if drain_time else 0:.1f} msg/s)\n"
+            f"  outbox retries: {retried} message(s), {extra_attempts} extra attempt(s)\n"
+            f"HTTP\n"
+            f"  calls {http['calls']}, ok {http['ok']}, errors {http['errors']} "
+            f"{ {**http['http_errors'], **http['exceptions']} or ''}\n"
+            f"  latency p50 {http['latency_ms']['p50']} / p95 {http['latency_ms']['p95']} / "
+            f"p99 {http['latency_ms']['p99']} ms, transport retries {http['retries']}, "
+            f"breaker {http['circuit']['state']} (rejected {http['rejected_by_breaker']})"
+        )
+        if server:
+            stats = server.stats()
+            self.stdout.write(f"Fake API\n  ok {stats['ok']}, 500s {stats['errors']}, 429s {stats['throttled']}")
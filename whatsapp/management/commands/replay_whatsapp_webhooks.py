@@ -0,0 +1,121 @@
+"""
+Replay signed Graph API status callbacks against the webhook and measure ingestion.
+    python manage.py replay_whatsapp_webhooks --events 5000                  # in-process single worker
+    python manage.py replay_whatsapp_webhooks --url https://host/api/whatsapp/webhook/ --secret ...
+
+Message ids come from SENT outbox rows (delivered + read per message), padded with
+synthetic ids when there are not enough. Without --url the requests go straight into
+this process's WSGI handler on one thread, i.e. the capacity of one sync worker with
+no client or network cost mixed in.
+"""
+import io
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+
+from whatsapp.models import OutboundMessage
+from whatsapp.webhooks import build_status_payload, get_buffer, sign_payload
+
+
+class Command(BaseCommand):
+    help = 'Replay WhatsApp status webhooks and report events/s'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=5000, help='Total status events to send')
+        parser.add_argument('--per-request', type=int, default=1, help='Statuses per callback body')
+        parser.add_argument('--concurrency', type=int, default=8, help='Parallel senders (with --url)')
+        parser.add_argument('--url', help='Webhook URL (default: serve this app in-process)')
+        parser.add_argument('--secret', help='App secret (default WHATSAPP_APP_SECRET)')
+
+    def _events(self, total):
+        ids = list(
+            OutboundMessage.objects.filter(status='SENT').exclude(provider_message_id=None)
+            .values_list('provider_message_id', flat=True)[:(total + 1) // 2]
+        )
+        ids += [f"wamid.replay.{uuid.uuid4().hex}" for _ in range((total + 1) // 2 - len(ids))]
+        now = int(time.time())
+        events = [(message_id, 'delivered', now) for message_id in ids]
+        events += [(message_id, 'read', now + 1) for message_id in ids]
+        return events[:total], len(ids)
+
+    def _post_in_process(self, bodies):
+        """Call the WSGI app directly, one request after another"""
+        app = get_wsgi_application()
+        path = reverse('whatsapp:webhook')
+        codes = []
+        for body, signature in bodies:
+            environ = {
+                'REQUEST_METHOD': 'POST', 'PATH_INFO': path, 'QUERY_STRING': '',
+                'SERVER_NAME': '127.0.0.1', 'SERVER_PORT': '443', 'wsgi.url_scheme': 'https',
+                'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(body)),
+                'HTTP_X_HUB_SIGNATURE_256': signature,
+                'wsgi.input': io.BytesIO(body), 'wsgi.errors': io.StringIO(),
+            }
+            status = []
+            response = app(environ, lambda code, headers: status.append(code))
+            b''.join(response)
+            response.close()
+            codes.append(int(status[0].split()[0]))
+        return codes
+
+    def _post_http(self, url, bodies, concurrency):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        def post(item):
+            body, signature = item
+            response = session.post(url, data=body, timeout=30, headers={
+                'Content-Type': 'application/json', 'X-Hub-Signature-256': signature,
+            })
+            return response.status_code
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(post, bodies))
+
+    def handle(self, *args, **options):
+        secret = options['secret'] or settings.WHATSAPP_APP_SECRET or 'replay-secret'
+        url = options['url']
+        if not url:
+            # Same process: the view checks against the secret we sign with
+            settings.WHATSAPP_APP_SECRET = secret
+
+        events, messages = self._events(options['events'])
+        per_request = max(1, options['per_request'])
+        bodies = []
+        for start in range(0, len(events), per_request):
+            body = json.dumps(build_status_payload(events[start:start + per_request])).encode()
+            bodies.append((body, sign_payload(body, secret)))
+
+        started = time.perf_counter()
+        if url:
+            codes = self._post_http(url, bodies, options['concurrency'])
+        else:
+            codes = self._post_in_process(bodies)
+        received = time.perf_counter() - started
+
+        applied = None
+        if not url:
+            # Drain what the flusher hasn't written yet so the timing is end to end
+            get_buffer().flush()
+            applied = time.perf_counter() - started
+
+        failed = sum(1 for code in codes if code != 200)
+        mode = f"concurrency {options['concurrency']}" if url else 'in-process, 1 worker'
+        self.stdout.write(
+            f"{len(events)} events for {messages} messages in {len(bodies)} requests "
+            f"({per_request}/request, {mode})\n"
+            f"  received: {received:.2f}s  {len(events) / received:.0f} events/s  {len(bodies) / received:.0f} req/s"
+        )
+        if applied is not None:
+            self.stdout.write(f"  applied:  {applied:.2f}s  {len(events) / applied:.0f} events/s end to end")
+        if failed:
+            self.stdout.write(self.style.ERROR(f"{failed} request(s) did not return 200"))
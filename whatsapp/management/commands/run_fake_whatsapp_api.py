@@ -0,0 +1,57 @@
+"""
+Run the fake Graph API in the foreground (Ctrl+C to stop).
+    python manage.py run_fake_whatsapp_api --port 8089 --latency 0.2 --error-rate 0.02 --rate-limit 80
+
+Then point the app at it:
+    WHATSAPP_API_BASE=http://127.0.0.1:8089 WHATSAPP_PHONE_NUMBER_ID=1 WHATSAPP_ACCESS_TOKEN=fake
+"""
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from whatsapp.fake_api import FakeWhatsAppServer
+
+
+class Command(BaseCommand):
+    help = 'Serve a fake WhatsApp Cloud API with configurable latency, errors and rate limits'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8089)
+        parser.add_argument('--latency', type=float, default=0.1, help='Seconds per call')
+        parser.add_argument('--jitter', type=float, default=0.2, help='Latency spread, fraction (0.2 = +/-20%%)')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of calls answered 500')
+        parser.add_argument('--rate-limit', type=int, default=0, help='Calls/second before 429 (0 = unlimited)')
+        parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429')
+        parser.add_argument('--report-every', type=float, default=10, help='Seconds between counter lines (0 = off)')
+
+    def handle(self, *args, **options):
+        server = FakeWhatsAppServer(
+            options['host'], options['port'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            rate_limit=options['rate_limit'],
+            retry_after=options['retry_after'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Fake WhatsApp API on {server.url}"))
+        self.stdout.write(f"  WHATSAPP_API_BASE={server.url} WHATSAPP_PHONE_NUMBER_ID=1 WHATSAPP_ACCESS_TOKEN=fake")
+
+        if options['report_every']:
+            def report():
+                while True:
+                    time.sleep(options['report_every'])
+                    stats = server.stats()
+                    self.stdout.write(f"ok {stats['ok']}  500s {stats['errors']}  429s {stats['throttled']}")
+
+            threading.Thread(target=report, daemon=True).start()
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            stats = server.stats()
+            self.stdout.write(f"\nStopped. ok {stats['ok']}  500s {stats['errors']}  429s {stats['throttled']}")
@@ -0,0 +1,69 @@
+"""
+WhatsApp outbox worker.
+    python manage.py run_whatsapp_outbox                    # keep polling
+    python manage.py run_whatsapp_outbox --once             # drain what's due and exit (cron)
+    python manage.py run_whatsapp_outbox --concurrency 16   # parallel sends per batch
+
+Scale out by running more processes; batch claims never overlap.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from whatsapp.outbox import process_outbox, requeue_stale_claims
+from whatsapp.ratelimit import rate_limiter_stats
+from whatsapp.transport import transport_stats
+from whatsapp.webhooks import purge_unmatched_events
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued WhatsApp messages with retries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when nothing is due')
+        parser.add_argument('--sleep', type=float, default=2, help='Seconds between polls when idle')
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages claimed per batch')
+        parser.add_argument('--concurrency', type=int, help='Parallel sends (default WHATSAPP_SEND_CONCURRENCY)')
+        parser.add_argument('--max-batches', type=int, help='Max batches per pass')
+
+    def handle(self, *args, **options):
+        while True:
+            requeued = requeue_stale_claims()
+            if requeued:
+                self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale claim(s)"))
+            purged = purge_unmatched_events()
+            if purged:
+                self.stdout.write(self.style.WARNING(f"Dropped {purged} status event(s) for unknown message ids"))
+
+            started = time.perf_counter()
+            totals = process_outbox(
+                batch_size=options['batch_size'],
+                concurrency=options['concurrency'],
+                max_batches=options['max_batches'],
+            )
+            handled = totals['sent'] + totals['retry'] + totals['dead']
+            if handled:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(self.style.SUCCESS(
+                    f"Sent: {totals['sent']}, retry later: {totals['retry']}, dead: {totals['dead']} "
+                    f"({totals['batches']} batches, {handled / elapsed:.1f} msg/s)"
+                ))
+                stats = transport_stats()
+                self.stdout.write(
+                    f"  HTTP p50/p95 {stats['latency_ms']['p50']}/{stats['latency_ms']['p95']} ms, "
+                    f"errors {stats['errors']}, retries {stats['retries']}, circuit {stats['circuit']['state']}"
+                )
+                limits = rate_limiter_stats()
+                if limits and limits['waited']:
+                    self.stdout.write(
+                        f"  Rate limit {limits['rate']:g}/s: waited {limits['waited']}x, "
+                        f"avg/p95 {limits['wait_ms']['avg']}/{limits['wait_ms']['p95']} ms, "
+                        f"timed out {limits['rejected']}"
+                    )
+
+            if options['once']:
+                return
+            if not handled:
+                close_old_connections()
+                time.sleep(options['sleep'])
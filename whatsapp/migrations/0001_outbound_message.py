@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:03
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('fitness', '0001_initial'),
+        ('payments', '0007_receipt_content_hash'),
+        ('reminders', '0002_unique_live_reminder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundMessage',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('TEXT', 'Text'), ('REMINDER', 'Reminder'), ('RECEIPT', 'Receipt')], default='TEXT', max_length=20)),
+                ('to_phone', models.CharField(max_length=20)),
+                ('body', models.TextField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SENDING', 'Sending'), ('SENT', 'Sent'), ('DEAD', 'Dead')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField()),
+                ('claim_token', models.UUIDField(blank=True, db_index=True, null=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('provider_message_id', models.CharField(blank=True, db_index=True, max_length=100, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbound_messages', to='fitness.gym')),
+                ('receipt', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbound_messages', to='payments.receipt')),
+                ('reminder', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbound_messages', to='reminders.reminder')),
+            ],
+            options={
+                'db_table': 'whatsapp_outbound_messages',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='whatsapp_ou_status_a99b15_idx'), models.Index(fields=['gym', '-created_at'], name='whatsapp_ou_gym_id_5d3bcd_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whatsapp', '0001_outbound_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundmessage',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='outboundmessage',
+            name='delivery_status',
+            field=models.CharField(blank=True, choices=[('sent', 'Sent'), ('delivered', 'Delivered'), ('read', 'Read'), ('failed', 'Failed')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='outboundmessage',
+            name='read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whatsapp', '0002_delivery_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('tokens', models.FloatField()),
+                ('refilled_at', models.FloatField()),
+            ],
+            options={
+                'db_table': 'whatsapp_rate_limit_buckets',
+            },
+        ),
+    ]
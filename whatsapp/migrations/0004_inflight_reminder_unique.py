@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:31
+
+from django.db import migrations, models
+
+
+def dedupe_inflight_messages(apps, schema_editor):
+    """Keep one PENDING/SENDING message per reminder (SENDING first, then oldest); dead-letter the rest"""
+    OutboundMessage = apps.get_model('whatsapp', 'OutboundMessage')
+    seen = set()
+    duplicates = []
+    in_flight = OutboundMessage.objects.filter(
+        status__in=['PENDING', 'SENDING'], reminder__isnull=False
+    ).order_by('reminder_id', '-status', 'created_at').values_list('pk', 'reminder_id')
+    for pk, reminder_id in in_flight.iterator():
+        if reminder_id in seen:
+            duplicates.append(pk)
+        else:
+            seen.add(reminder_id)
+    for start in range(0, len(duplicates), 500):
+        OutboundMessage.objects.filter(pk__in=duplicates[start:start + 500]).update(
+            status='DEAD', last_error='Duplicate message for reminder'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whatsapp', '0003_rate_limit_bucket'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_inflight_messages, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='outboundmessage',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['PENDING', 'SENDING'])), fields=('reminder',), name='uniq_inflight_reminder_message'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whatsapp', '0004_inflight_reminder_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnmatchedStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider_message_id', models.CharField(db_index=True, max_length=100)),
+                ('status', models.CharField(max_length=10)),
+                ('timestamp', models.BigIntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'whatsapp_unmatched_status_events',
+            },
+        ),
+    ]
@@ -1,6 +1,115 @@
 """
 WhatsApp Models
+Outbound message outbox: every send is a row written in the caller's
+transaction and delivered later by `run_whatsapp_outbox` (see outbox.py).
 """
 from django.db import models
+from fitness.models import Gym
+import uuid
 
-# WhatsApp app uses services only, no models needed
\ No newline at end of file
+
+class OutboundMessage(models.Model):
+    """One WhatsApp message waiting for / done with delivery"""
+
+    KIND_CHOICES = [
+        ('TEXT', 'Text'),
+        ('REMINDER', 'Reminder'),
+        ('RECEIPT', 'Receipt'),
+    ]
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),      # waiting for next_attempt_at
+        ('SENDING', 'Sending'),      # claimed by a worker
+        ('SENT', 'Sent'),
+        ('DEAD', 'Dead'),            # gave up (max attempts / permanent error)
+    ]
+
+    # What the provider reported afterwards via status webhooks
+    DELIVERY_STATUS_CHOICES = [
+        ('sent', 'Sent'),
+        ('delivered', 'Delivered'),
+        ('read', 'Read'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='outbound_messages')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='TEXT')
+    to_phone = models.CharField(max_length=20)
+    body = models.TextField()
+
+    # What the message is about (status is written back on delivery)
+    reminder = models.ForeignKey(
+        'reminders.Reminder', on_delete=models.SET_NULL, null=True, blank=True, related_name='outbound_messages'
+    )
+    receipt = models.ForeignKey(
+        'payments.Receipt', on_delete=models.SET_NULL, null=True, blank=True, related_name='outbound_messages'
+    )
+
+    # Delivery state
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    claim_token = models.UUIDField(null=True, blank=True, db_index=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, null=True)
+    provider_message_id = models.CharField(max_length=100, blank=True, null=True, db_index=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    delivery_status = models.CharField(max_length=10, choices=DELIVERY_STATUS_CHOICES, blank=True, default='')
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'whatsapp_outbound_messages'
+        ordering = ['-created_at']
+        indexes = [
+            # Worker claim query: WHERE status='PENDING' AND next_attempt_at <= now ORDER BY next_attempt_at
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['gym', '-created_at']),
+        ]
+        constraints = [
+            # A reminder is in flight at most once, even when bulk send / single send / the scheduler race
+            models.UniqueConstraint(
+                fields=['reminder'],
+                condition=models.Q(status__in=['PENDING', 'SENDING']),
+                name='uniq_inflight_reminder_message',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} to {self.to_phone} ({self.status})"
+
+
+class RateLimitBucket(models.Model):
+    """Shared token bucket (see ratelimit.py); one row per WhatsApp phone number id"""
+    key = models.CharField(max_length=100, primary_key=True)
+    tokens = models.FloatField()
+    # Epoch seconds of the last refill; float so sub-second refills are exact
+    refilled_at = models.FloatField()
+
+    class Meta:
+        db_table = 'whatsapp_rate_limit_buckets'
+
+    def __str__(self):
+        return f"{self.key}: {self.tokens:.1f} tokens"
+
+
+class UnmatchedStatusEvent(models.Model):
+    """
+    Status callback for a provider id no OutboundMessage has yet: Graph often
+    reports 'sent' before the outbox has saved the id. Applied once the id
+    appears, or dropped after WHATSAPP_WEBHOOK_UNMATCHED_TTL (see webhooks.py).
+    """
+    provider_message_id = models.CharField(max_length=100, db_index=True)
+    status = models.CharField(max_length=10)
+    timestamp = models.BigIntegerField(default=0)  # epoch seconds, as sent by Graph
+    error = models.TextField(blank=True, null=True)
+    received_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'whatsapp_unmatched_status_events'
+
+    def __str__(self):
+        return f"{self.status} for {self.provider_message_id}"
@@ -0,0 +1,269 @@
+"""
+WhatsApp Outbox
+Views never call the WhatsApp API. They enqueue OutboundMessage rows in
+the same transaction as the business write (reminder, receipt), so a
+message exists iff the change committed. `run_whatsapp_outbox` workers:
+
+  1. claim a batch: SELECT ... FOR UPDATE SKIP LOCKED where supported
+     (Postgres / MySQL), otherwise a conditional UPDATE on the candidate
+     ids; either way rows are tagged with a claim token and re-read by it
+  2. render templated reminder texts for the batch (reminders/messages.py)
+     and send it concurrently (whatsapp/dispatch.py)
+  3. write outcomes with bulk_update, for the rows the worker's claim
+     token still holds (a requeued stale claim belongs to someone else):
+       success             -> SENT (+ reminder / receipt updated)
+       retryable failure   -> PENDING again, next_attempt_at backed off
+                              exponentially (with jitter)
+       permanent / too many attempts -> DEAD (+ reminder marked FAILED)
+
+Several worker processes can run side by side; claims never overlap.
+"""
+import logging
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .dispatch import dispatch_messages
+from .models import OutboundMessage
+from .webhooks import resolve_unmatched_events
+
+logger = logging.getLogger(__name__)
+
+OUTCOME_FIELDS = [
+    'body', 'status', 'attempts', 'next_attempt_at', 'claim_token', 'claimed_at',
+    'last_error', 'provider_message_id', 'sent_at',
+]
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ==============================================
+# 📥 ENQUEUE (call inside the business transaction)
+# ==============================================
+
+def enqueue_message(gym, to_phone, body, kind='TEXT', reminder=None, receipt=None):
+    return OutboundMessage.objects.create(
+        gym=gym,
+        kind=kind,
+        to_phone=to_phone,
+        body=body,
+        reminder=reminder,
+        receipt=receipt,
+        next_attempt_at=timezone.now(),
+    )
+
+
+def enqueue_reminders(reminders):
+    """
+    Queue reminders (member preloaded) that don't already have a message in
+    flight. Returns the rows actually inserted.
+
+    The in-flight check is only a shortcut: concurrent callers (bulk send,
+    single send, the daily scheduler) can all pass it, so the partial unique
+    constraint on (reminder) while PENDING/SENDING decides, and losers are
+    skipped by ignore_conflicts.
+    """
+    reminders = list(reminders)
+    in_flight = set(
+        OutboundMessage.objects.filter(
+            reminder__in=reminders, status__in=['PENDING', 'SENDING']
+        ).values_list('reminder_id', flat=True)
+    )
+    now = timezone.now()
+    candidates = OutboundMessage.objects.bulk_create([
+        OutboundMessage(
+            gym_id=reminder.gym_id,
+            kind='REMINDER',
+            to_phone=reminder.member.phone,
+            # Templated reminders are rendered at send time (see _render_bodies)
+            body='' if reminder.template_id else reminder.message,
+            reminder=reminder,
+            next_attempt_at=now,
+        )
+        for reminder in reminders if reminder.pk not in in_flight
+    ], batch_size=500, ignore_conflicts=True)
+    if not candidates:
+        return []
+    # ids are generated client side, so the skipped ones simply aren't there
+    return list(OutboundMessage.objects.filter(pk__in=[m.pk for m in candidates]))
+
+
+# ==============================================
+# 🔒 CLAIM
+# ==============================================
+
+def claim_batch(batch_size=50, now=None, gym=None):
+    """Claim up to batch_size due messages (optionally of one gym) for this worker. Returns the claimed rows."""
+    now = now or timezone.now()
+    token = uuid.uuid4()
+    due = OutboundMessage.objects.filter(status='PENDING', next_attempt_at__lte=now).order_by('next_attempt_at')
+    if gym is not None:
+        due = due.filter(gym=gym)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:batch_size])
+            OutboundMessage.objects.filter(pk__in=ids).update(status='SENDING', claim_token=token, claimed_at=now)
+    else:
+        # SQLite: no row locks; the status='PENDING' guard makes a row go to exactly one claimer
+        ids = list(due.values_list('pk', flat=True)[:batch_size])
+        OutboundMessage.objects.filter(pk__in=ids, status='PENDING').update(
+            status='SENDING', claim_token=token, claimed_at=now
+        )
+
+    if not ids:
+        return []
+    return list(OutboundMessage.objects.filter(claim_token=token, status='SENDING'))
+
+
+def requeue_stale_claims(older_than=None):
+    """SENDING rows whose worker died go back to PENDING"""
+    older_than = older_than or timedelta(seconds=_setting('WHATSAPP_OUTBOX_CLAIM_TIMEOUT', 600))
+    return OutboundMessage.objects.filter(
+        status='SENDING', claimed_at__lt=timezone.now() - older_than
+    ).update(status='PENDING', claim_token=None, claimed_at=None)
+
+
+# ==============================================
+# 📤 DELIVER
+# ==============================================
+
+def backoff_delay(attempts):
+    """Exponential backoff with +/-20% jitter: base, 2x base, 4x base ... capped"""
+    base = _setting('WHATSAPP_OUTBOX_BACKOFF_BASE', 30)
+    cap = _setting('WHATSAPP_OUTBOX_BACKOFF_MAX', 3600)
+    delay = min(cap, base * (2 ** max(attempts - 1, 0)))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _apply_result(message, result, now, max_attempts):
+    message.attempts += 1
+    message.claim_token = None
+    message.claimed_at = None
+
+    if result['success']:
+        message.status = 'SENT'
+        message.sent_at = now
+        message.provider_message_id = result.get('message_id')
+        message.last_error = None
+    elif result.get('retryable', True) and message.attempts < max_attempts:
+        message.status = 'PENDING'
+        message.next_attempt_at = now + backoff_delay(message.attempts)
+        message.last_error = result.get('error')
+    else:
+        message.status = 'DEAD'
+        message.last_error = result.get('error')
+
+
+def _write_back_related(messages, now):
+    """Reminder / receipt status follows the final outcome of their message"""
+    from payments.models import Receipt
+    from reminders.models import Reminder
+
+    sent = [m for m in messages if m.status == 'SENT']
+    dead = [m for m in messages if m.status == 'DEAD']
+
+    sent_reminders = [m.reminder_id for m in sent if m.reminder_id]
+    if sent_reminders:
+        Reminder.objects.filter(pk__in=sent_reminders).update(
+            status='SENT', sent_at=now, delivery_status='Sent', error_message=None
+        )
+    dead_reminders = [m for m in dead if m.reminder_id]
+    if dead_reminders:
+        # Different errors per row -> bulk_update
+        Reminder.objects.bulk_update(
+            [Reminder(pk=m.reminder_id, status='FAILED', error_message=m.last_error) for m in dead_reminders],
+            ['status', 'error_message']
+        )
+
+    sent_receipts = [m.receipt_id for m in sent if m.receipt_id]
+    if sent_receipts:
+        Receipt.objects.filter(pk__in=sent_receipts).update(sent_via_whatsapp=True, whatsapp_sent_at=now)
+
+
+def _render_bodies(messages):
+    """
+    Fill empty bodies from their reminders' templates, one query + one pass
+    for the batch. Returns {message.pk: error} for the ones that can't render.
+    """
+    from reminders.messages import render_reminders
+    from reminders.models import Reminder
+
+    missing = [m for m in messages if not m.body and m.reminder_id]
+    if not missing:
+        return {}
+    reminders = Reminder.objects.filter(pk__in=[m.reminder_id for m in missing]).select_related(
+        'member', 'gym', 'template'
+    )
+    texts, errors = render_reminders(reminders)
+    failed = {}
+    for message in missing:
+        if message.reminder_id in errors:
+            failed[message.pk] = f"Template error: {errors[message.reminder_id]}"
+        else:
+            message.body = texts.get(message.reminder_id, '')
+    return failed
+
+
+def deliver(messages, concurrency=None, service=None):
+    """Send claimed messages and persist outcomes. Returns {'sent', 'retry', 'dead'} counts."""
+    if not messages:
+        return {'sent': 0, 'retry': 0, 'dead': 0}
+
+    # Unrenderable ones are dead-lettered without a send; retrying won't fix a template
+    unrenderable = _render_bodies(messages)
+    results = {pk: {'success': False, 'error': error, 'retryable': False} for pk, error in unrenderable.items()}
+    results.update(dispatch_messages(
+        ((message.pk, message.to_phone, message.body) for message in messages if message.pk not in unrenderable),
+        concurrency=concurrency,
+        service=service,
+    ))
+
+    now = timezone.now()
+    max_attempts = _setting('WHATSAPP_OUTBOX_MAX_ATTEMPTS', 6)
+    claims = {message.pk: message.claim_token for message in messages}
+    for message in messages:
+        _apply_result(message, results[message.pk], now, max_attempts)
+
+    with transaction.atomic():
+        # A slow batch may have been requeued (requeue_stale_claims) and re-claimed
+        # meanwhile; only write rows this worker still holds
+        held = set(
+            OutboundMessage.objects.select_for_update().filter(
+                pk__in=list(claims), status='SENDING', claim_token__in=set(claims.values())
+            ).values_list('pk', 'claim_token')
+        )
+        lost = [m for m in messages if (m.pk, claims[m.pk]) not in held]
+        if lost:
+            logger.warning("WhatsApp outbox: %s message(s) lost their claim before the outcome was saved", len(lost))
+            messages = [m for m in messages if (m.pk, claims[m.pk]) in held]
+        OutboundMessage.objects.bulk_update(messages, OUTCOME_FIELDS, batch_size=500)
+        _write_back_related(messages, now)
+    # Status callbacks that beat us to it (see webhooks.py)
+    resolve_unmatched_events(m.provider_message_id for m in messages if m.status == 'SENT')
+
+    counts = {'sent': 0, 'retry': 0, 'dead': 0}
+    for message in messages:
+        counts[{'SENT': 'sent', 'PENDING': 'retry', 'DEAD': 'dead'}[message.status]] += 1
+    if counts['dead']:
+        logger.warning("WhatsApp outbox: %s message(s) dead-lettered", counts['dead'])
+    return counts
+
+
+def process_outbox(batch_size=50, concurrency=None, max_batches=None, service=None, gym=None):
+    """Claim and deliver until nothing is due (or max_batches). Returns summed counts + batches."""
+    totals = {'sent': 0, 'retry': 0, 'dead': 0, 'batches': 0}
+    while max_batches is None or totals['batches'] < max_batches:
+        messages = claim_batch(batch_size, gym=gym)
+        if not messages:
+            break
+        for key, value in deliver(messages, concurrency=concurrency, service=service).items():
+            totals[key] += value
+        totals['batches'] += 1
+    return totals
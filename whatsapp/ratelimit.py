@@ -0,0 +1,168 @@
+"""
+WhatsApp Rate Limiter
+Cloud API throughput is capped per phone number, across every process
+that sends for it. The token bucket therefore lives in the database (the
+cache is per-process LocMem here), one row per phone number id:
+
+    UPDATE bucket
+       SET tokens = MIN(capacity, tokens + elapsed * rate) - n,
+           refilled_at = now
+     WHERE key = ? AND MIN(capacity, tokens + elapsed * rate) >= n
+
+Refill and take are one statement, so concurrent workers can never spend
+the same token. When it matches no row, one SELECT tells how long until
+enough tokens exist; blocking acquire() sleeps that long (plus jitter, so
+waiting workers don't retry in lockstep) and tries again.
+
+Wait times are recorded per process, see snapshot().
+"""
+import random
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest, Least
+from django.db.models.lookups import GreaterThanOrEqual
+
+from .models import RateLimitBucket
+
+
+class RateLimitMetrics:
+    def __init__(self, window=2000):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=window)
+        self.acquired = 0
+        self.rejected = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, acquired, wait):
+        with self._lock:
+            if acquired:
+                self.acquired += 1
+            else:
+                self.rejected += 1
+            if wait > 0:
+                self.waited += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                self._waits.append(wait)
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+            return {
+                'acquired': self.acquired,
+                'rejected': self.rejected,
+                'waited': self.waited,
+                'wait_ms': {
+                    'total': round(self.total_wait * 1000, 1),
+                    'avg': round(self.total_wait / self.waited * 1000, 1) if self.waited else 0.0,
+                    'p95': round(p95 * 1000, 1),
+                    'max': round(self.max_wait * 1000, 1),
+                },
+            }
+
+
+class TokenBucket:
+    """`rate` tokens/second, at most `capacity` saved up (the burst size)"""
+
+    def __init__(self, key, rate, capacity=None, clock=time.time, sleep=time.sleep, metrics=None):
+        self.key = key
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.clock = clock
+        self.sleep = sleep
+        self.metrics = metrics or RateLimitMetrics()
+        self._ensured = False
+
+    def _ensure_row(self):
+        if not self._ensured:
+            # Starts full; ignore_conflicts keeps it a no-op when another process created it first
+            RateLimitBucket.objects.bulk_create(
+                [RateLimitBucket(key=self.key, tokens=self.capacity, refilled_at=self.clock())],
+                ignore_conflicts=True,
+            )
+            self._ensured = True
+
+    def _available(self, now):
+        # tokens + max(0, now - refilled_at) * rate, capped at capacity (clock skew never drains)
+        elapsed = Greatest(Value(now) - F('refilled_at'), Value(0.0), output_field=FloatField())
+        return Least(Value(self.capacity), F('tokens') + elapsed * Value(self.rate), output_field=FloatField())
+
+    def try_acquire(self, tokens=1):
+        """One attempt. Returns (acquired, seconds until `tokens` would be available)."""
+        self._ensure_row()
+        now = self.clock()
+        available = self._available(now)
+        # Condition stays in the UPDATE's own WHERE (no subquery), so row locking re-checks it
+        taken = RateLimitBucket.objects.filter(
+            GreaterThanOrEqual(available, Value(float(tokens))), key=self.key
+        ).update(
+            tokens=available - Value(float(tokens)),
+            refilled_at=Greatest(F('refilled_at'), Value(now), output_field=FloatField()),
+        )
+        if taken:
+            return True, 0.0
+
+        current = RateLimitBucket.objects.filter(key=self.key).annotate(available=available).values_list(
+            'available', flat=True
+        ).first()
+        if current is None:  # row deleted under us
+            self._ensured = False
+            return False, 0.0
+        return False, max(tokens - current, 0.0) / self.rate
+
+    def acquire(self, tokens=1, block=True, timeout=None):
+        """
+        Take `tokens`. Non-blocking: one attempt. Blocking: wait for refills
+        until `timeout` seconds (None = forever). Returns True if acquired.
+        """
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot take {tokens} tokens from a bucket of {self.capacity:g}")
+
+        started = time.monotonic()
+        while True:
+            acquired, wait = self.try_acquire(tokens)
+            waited = time.monotonic() - started
+            if acquired or not block:
+                self.metrics.record(acquired, waited)
+                return acquired
+
+            remaining = None if timeout is None else timeout - waited
+            if remaining is not None and remaining <= 0:
+                self.metrics.record(False, waited)
+                return False
+
+            pause = max(wait, 0.001) * random.uniform(1.0, 1.2)
+            self.sleep(pause if remaining is None else min(pause, remaining))
+
+    def snapshot(self):
+        return {'key': self.key, 'rate': self.rate, 'capacity': self.capacity, **self.metrics.snapshot()}
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Process-wide bucket for the configured phone number, or None when WHATSAPP_RATE_LIMIT is 0"""
+    rate = getattr(settings, 'WHATSAPP_RATE_LIMIT', 0)
+    if not rate:
+        return None
+    key = f"whatsapp:{getattr(settings, 'WHATSAPP_PHONE_NUMBER_ID', None) or 'default'}"
+    capacity = getattr(settings, 'WHATSAPP_RATE_LIMIT_BURST', None) or rate
+    with _limiters_lock:
+        limiter = _limiters.get((key, rate, capacity))
+        if limiter is None:
+            limiter = _limiters[(key, rate, capacity)] = TokenBucket(key, rate, capacity)
+        return limiter
+
+
+def rate_limiter_stats():
+    limiter = get_rate_limiter()
+    return limiter.snapshot() if limiter else None
@@ -0,0 +1,16 @@
+"""
+WhatsApp Serializers
+"""
+from rest_framework import serializers
+from .models import OutboundMessage
+
+
+class OutboundMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OutboundMessage
+        fields = [
+            'id', 'kind', 'to_phone', 'status', 'attempts', 'next_attempt_at',
+            'last_error', 'provider_message_id', 'delivery_status', 'delivered_at', 'read_at',
+            'reminder', 'receipt', 'sent_at', 'created_at'
+        ]
+        read_only_fields = fields
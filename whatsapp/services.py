@@ -1,20 +1,28 @@
 """
 WhatsApp Business API Service
 Optimized for Indian Phone Number Formats
+HTTP goes through the shared pooled transport (transport.py).
 """
-import requests
+import logging
+
 from django.conf import settings
 
+from .transport import CircuitOpenError, get_transport
+
+logger = logging.getLogger(__name__)
+
 class WhatsAppService:
     """WhatsApp Business API Service"""
     
-    def __init__(self):
+    def __init__(self, transport=None):
+        self.transport = transport or get_transport()
         self.phone_number_id = getattr(settings, 'WHATSAPP_PHONE_NUMBER_ID', None)
         self.access_token = getattr(settings, 'WHATSAPP_ACCESS_TOKEN', None)
         self.api_version = getattr(settings, 'WHATSAPP_API_VERSION', 'v18.0')
+        self.api_base = getattr(settings, 'WHATSAPP_API_BASE', 'https://graph.facebook.com').rstrip('/')
         
         if self.phone_number_id:
-            self.base_url = f"https://graph.facebook.com/{self.api_version}/{self.phone_number_id}/messages"
+            self.base_url = f"{self.api_base}/{self.api_version}/{self.phone_number_id}/messages"
         else:
             self.base_url = None
     
@@ -24,7 +32,8 @@ class WhatsAppService:
         if not self.base_url or not self.access_token:
             return {
                 'success': False,
-                'error': 'WhatsApp API credentials not configured'
+                'error': 'WhatsApp API credentials not configured',
+                'retryable': True
             }
         
         # 🛡️ SMART PHONE NUMBER CLEANING
@@ -54,11 +63,11 @@ class WhatsAppService:
         }
         
         try:
-            response = requests.post(
+            # Pooled keep-alive session; timeout/retries come from the transport settings
+            response = self.transport.post(
                 self.base_url,
                 headers=headers,
                 json=payload,
-                timeout=10 # Timeout zaroori hai taaki server hang na ho
             )
             
             if response.status_code in [200, 201]:
@@ -68,30 +77,43 @@ class WhatsAppService:
                 }
             else:
                 # Log error for debugging
-                print(f"WhatsApp Error: {response.text}")
+                logger.warning("WhatsApp Error: %s", response.text)
                 return {
                     'success': False,
-                    'error': f"API Error: {response.status_code} - {response.text}"
+                    'error': f"API Error: {response.status_code} - {response.text}",
+                    'status_code': response.status_code,
+                    # 429 / 5xx are worth retrying, other 4xx (bad number, bad token) are not
+                    'retryable': response.status_code == 429 or response.status_code >= 500
                 }
         
+        except CircuitOpenError as e:
+            # API looks down: fail fast, the outbox retries later
+            return {
+                'success': False,
+                'error': str(e),
+                'retryable': True,
+                'circuit_open': True
+            }
+        
         except Exception as e:
             return {
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'retryable': True
             }
     
-    def send_receipt(self, receipt):
-        """Send receipt via WhatsApp"""
-        try:
-            member = receipt.member
-            payment = receipt.payment
-            gym = receipt.gym
-            
-            # Safe checking for month
-            month_text = payment.month if payment.month else "N/A"
-            method_text = payment.get_payment_method_display()
-            
-            message = f"""
+    @staticmethod
+    def receipt_message(receipt):
+        """Receipt WhatsApp text (receipt.member / payment / gym)"""
+        member = receipt.member
+        payment = receipt.payment
+        gym = receipt.gym
+        
+        # Safe checking for month
+        month_text = payment.month if payment.month else "N/A"
+        method_text = payment.get_payment_method_display()
+        
+        return f"""
 🏋️ *{gym.name}*
 📋 Receipt #{receipt.receipt_number}
 
@@ -111,14 +133,12 @@ For any queries, contact us:
 📧 {gym.email}
 
 Thank you for being with us!
-            """.strip()
-            
-            return self.send_message(member.phone, message)
+        """.strip()
+    
+    def send_receipt(self, receipt):
+        """Send receipt via WhatsApp"""
+        try:
+            message = self.receipt_message(receipt)
         except Exception as e:
             return {'success': False, 'error': f"Receipt formatting failed: {str(e)}"}
-    
-    def send_reminder(self, reminder):
-        """Send reminder via WhatsApp"""
-        if reminder and reminder.member:
-            return self.send_message(reminder.member.phone, reminder.message)
-        return {'success': False, 'error': 'Invalid reminder data'}
\ No newline at end of file
+        return self.send_message(receipt.member.phone, message)
@@ -1,3 +1,668 @@
-from django.test import TestCase
+"""
+WhatsApp Tests
+"""
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.db import IntegrityError, close_old_connections, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from fitness.testing import create_gym, create_member
+from reminders.models import Reminder
+from .dispatch import dispatch_messages
+from .fake_api import start_fake_api
+from .models import OutboundMessage, RateLimitBucket, UnmatchedStatusEvent
+from .outbox import backoff_delay, claim_batch, deliver, enqueue_reminders, requeue_stale_claims
+from .ratelimit import TokenBucket
+from .services import WhatsAppService
+from .transport import CircuitBreaker, CircuitOpenError, WhatsAppTransport, get_transport
+from .webhooks import (
+    StatusBuffer, apply_status_events, build_status_payload, purge_unmatched_events, sign_payload, verify_signature
+)
+
+SECRET = 'test-app-secret'
+
+
+def create_sent_message(gym, index=0, with_reminder=True):
+    reminder = None
+    if with_reminder:
+        member = create_member(gym, index)
+        reminder = Reminder.objects.create(
+            gym=gym, member=member, reminder_type='MEMBERSHIP_EXPIRING', message='Renew please',
+            due_date=member.membership_end_date, status='SENT', delivery_status='Sent'
+        )
+    return OutboundMessage.objects.create(
+        gym=gym, kind='REMINDER', to_phone=f'90000{index:05d}', body='Renew please', reminder=reminder,
+        status='SENT', next_attempt_at=timezone.now(), sent_at=timezone.now(),
+        provider_message_id=f'wamid.test.{index}'
+    )
+
+
+class SignatureTests(SimpleTestCase):
+    def test_valid_signature_is_accepted(self):
+        body = b'{"entry": []}'
+        self.assertTrue(verify_signature(body, sign_payload(body, SECRET), SECRET))
+
+    def test_tampered_body_or_wrong_secret_is_rejected(self):
+        body = b'{"entry": []}'
+        signature = sign_payload(body, SECRET)
+        self.assertFalse(verify_signature(b'{"entry": [1]}', signature, SECRET))
+        self.assertFalse(verify_signature(body, signature, 'other-secret'))
+        self.assertFalse(verify_signature(body, None, SECRET))
+
+    @override_settings(WHATSAPP_APP_SECRET=None)
+    def test_missing_app_secret_rejects_everything(self):
+        body = b'{}'
+        self.assertFalse(verify_signature(body, sign_payload(body, 'anything')))
+
+
+@override_settings(
+    WHATSAPP_APP_SECRET=SECRET,
+    WHATSAPP_WEBHOOK_VERIFY_TOKEN='verify-me',
+    WHATSAPP_WEBHOOK_FLUSH_INTERVAL=0,  # apply inline, no background thread
+)
+class WebhookViewTests(TestCase):
+    def setUp(self):
+        self.gym = create_gym()
+        self.url = reverse('whatsapp:webhook')
+
+    def post_statuses(self, events):
+        body = json.dumps(build_status_payload(events)).encode()
+        return self.client.post(
+            self.url, body, content_type='application/json', secure=True,
+            HTTP_X_HUB_SIGNATURE_256=sign_payload(body, SECRET)
+        )
+
+    def test_verification_handshake(self):
+        response = self.client.get(self.url, {
+            'hub.mode': 'subscribe', 'hub.verify_token': 'verify-me', 'hub.challenge': '12345'
+        }, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'12345')
+
+        response = self.client.get(self.url, {
+            'hub.mode': 'subscribe', 'hub.verify_token': 'wrong', 'hub.challenge': '12345'
+        }, secure=True)
+        self.assertEqual(response.status_code, 403)
+
+    def test_unsigned_or_malformed_posts_are_rejected(self):
+        body = json.dumps(build_status_payload([('wamid.test.0', 'delivered', 1)])).encode()
+        response = self.client.post(self.url, body, content_type='application/json', secure=True)
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.post(
+            self.url, b'not json', content_type='application/json', secure=True,
+            HTTP_X_HUB_SIGNATURE_256=sign_payload(b'not json', SECRET)
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_delivered_and_read_update_message_and_reminder(self):
+        message = create_sent_message(self.gym)
+
+        response = self.post_statuses([('wamid.test.0', 'delivered', 1700000000)])
+        self.assertEqual(response.status_code, 200)
+        message.refresh_from_db()
+        self.assertEqual(message.delivery_status, 'delivered')
+        self.assertEqual(message.delivered_at.timestamp(), 1700000000)
+
+        self.post_statuses([('wamid.test.0', 'read', 1700000060)])
+        message.refresh_from_db()
+        message.reminder.refresh_from_db()
+        self.assertEqual(message.delivery_status, 'read')
+        self.assertEqual(message.read_at.timestamp(), 1700000060)
+        self.assertEqual(message.reminder.delivery_status, 'Read')
+
+    def test_out_of_order_callbacks_never_downgrade(self):
+        message = create_sent_message(self.gym)
+
+        self.post_statuses([('wamid.test.0', 'read', 1700000060)])
+        self.post_statuses([('wamid.test.0', 'delivered', 1700000000), ('wamid.test.0', 'sent', 1699999999)])
+
+        message.refresh_from_db()
+        self.assertEqual(message.delivery_status, 'read')
+        self.assertEqual(message.read_at.timestamp(), 1700000060)
+
+    def test_failed_status_marks_reminder_failed(self):
+        message = create_sent_message(self.gym)
+        payload = build_status_payload([('wamid.test.0', 'failed', 1700000000)])
+        payload['entry'][0]['changes'][0]['value']['statuses'][0]['errors'] = [
+            {'code': 131026, 'title': 'Message undeliverable'}
+        ]
+        body = json.dumps(payload).encode()
+        self.client.post(
+            self.url, body, content_type='application/json', secure=True,
+            HTTP_X_HUB_SIGNATURE_256=sign_payload(body, SECRET)
+        )
+
+        message.refresh_from_db()
+        message.reminder.refresh_from_db()
+        self.assertEqual(message.delivery_status, 'failed')
+        self.assertEqual(message.last_error, 'Message undeliverable')
+        self.assertEqual(message.reminder.status, 'FAILED')
+        self.assertEqual(message.reminder.error_message, 'Message undeliverable')
+
+
+class ApplyStatusEventsTests(TestCase):
+    def test_batch_collapses_per_message_and_parks_unknown_ids(self):
+        gym = create_gym()
+        for index in range(3):
+            create_sent_message(gym, index, with_reminder=False)
+        events = [
+            {'id': f'wamid.test.{index}', 'status': status, 'timestamp': 1700000000, 'error': None}
+            for index in range(3) for status in ('sent', 'delivered')
+        ]
+        events.append({'id': 'wamid.unknown', 'status': 'read', 'timestamp': 1700000000, 'error': None})
+
+        # lookup, savepoint, one grouped UPDATE, release; then park + re-check (parked, lookup)
+        with self.assertNumQueries(7):
+            counts = apply_status_events(events)
+
+        self.assertEqual(counts, {'events': 7, 'updated': 3, 'unknown': 1})
+        self.assertEqual(OutboundMessage.objects.filter(delivery_status='delivered').count(), 3)
+        self.assertEqual(
+            list(UnmatchedStatusEvent.objects.values_list('provider_message_id', 'status')), [('wamid.unknown', 'read')]
+        )
+
+    def test_parked_events_apply_once_the_outbox_saves_the_id(self):
+        gym = create_gym()
+        member = create_member(gym)
+        reminder = Reminder.objects.create(
+            gym=gym, member=member, reminder_type='MEMBERSHIP_EXPIRING', message='Renew please',
+            due_date=member.membership_end_date
+        )
+        enqueue_reminders([reminder])
+        claimed = claim_batch(10)
+        # Graph calls back while the batch is still being sent
+        apply_status_events([{'id': 'wamid.early', 'status': 'delivered', 'timestamp': 1700000000, 'error': None}])
+
+        class Service:
+            def send_message(self, phone, text):
+                return {'success': True, 'message_id': 'wamid.early'}
+
+        deliver(claimed, service=Service())
+
+        message = OutboundMessage.objects.get()
+        self.assertEqual((message.status, message.delivery_status), ('SENT', 'delivered'))
+        self.assertIsNotNone(message.delivered_at)
+        self.assertFalse(UnmatchedStatusEvent.objects.exists())
+
+    def test_old_parked_events_are_purged(self):
+        apply_status_events([{'id': 'wamid.never', 'status': 'sent', 'timestamp': 0, 'error': None}])
+        UnmatchedStatusEvent.objects.update(received_at=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(purge_unmatched_events(timedelta(days=1)), 1)
+        self.assertFalse(UnmatchedStatusEvent.objects.exists())
+
+
+class StatusBufferTests(SimpleTestCase):
+    def test_flush_hands_over_everything_once(self):
+        batches = []
+        buffer = StatusBuffer(flush_size=100, flush_interval=60, apply=batches.append)
+        buffer.add([{'id': 'a'}, {'id': 'b'}])
+        buffer.add([{'id': 'c'}])
+
+        buffer.flush()
+        buffer.flush()
+
+        self.assertEqual(batches, [[{'id': 'a'}, {'id': 'b'}, {'id': 'c'}]])
+        self.assertEqual(buffer.pending(), 0)
+
+    def test_full_buffer_wakes_the_flusher(self):
+        applied = threading.Event()
+        buffer = StatusBuffer(flush_size=2, flush_interval=60, apply=lambda batch: applied.set())
+        buffer.add([{'id': 'a'}, {'id': 'b'}])
+
+        self.assertTrue(applied.wait(5))
+
+    def test_failed_apply_keeps_events_for_retry(self):
+        def explode(batch):
+            raise RuntimeError('database is locked')
+
+        buffer = StatusBuffer(flush_size=100, flush_interval=60, apply=explode)
+        buffer.add([{'id': 'a'}])
+        with self.assertLogs('whatsapp.webhooks', 'ERROR'):
+            buffer.flush()
+        self.assertEqual(buffer.pending(), 1)
+
+    def test_overflowing_retry_buffer_logs_what_it_drops(self):
+        def explode(batch):
+            raise RuntimeError('database is locked')
+
+        buffer = StatusBuffer(flush_size=2, flush_interval=60, apply=explode)
+        buffer.add([{'id': str(index)} for index in range(25)])
+        with self.assertLogs('whatsapp.webhooks', 'ERROR') as logs:
+            buffer.flush()
+
+        self.assertEqual(buffer.pending(), 20)
+        self.assertTrue(any('Dropping 5 ' in line for line in logs.output))
+
+
+@override_settings(WHATSAPP_APP_SECRET=SECRET, WHATSAPP_WEBHOOK_FLUSH_INTERVAL=0)
+class ReplayCommandTests(TestCase):
+    def setUp(self):
+        # Requests go through the real WSGI handler; keep it from closing the test transaction's connection
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+
+    def test_replay_applies_delivered_and_read(self):
+        gym = create_gym()
+        for index in range(5):
+            create_sent_message(gym, index, with_reminder=False)
+        out = StringIO()
+
+        call_command('replay_whatsapp_webhooks', events=10, stdout=out)
+
+        self.assertIn('10 events for 5 messages', out.getvalue())
+        self.assertNotIn('did not return 200', out.getvalue())
+        self.assertEqual(OutboundMessage.objects.filter(delivery_status='read').count(), 5)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.client_ports.add(self.client_address[1])
+            status, headers = server.script.pop(0) if server.script else (200, {})
+        body = json.dumps({'messages': [{'id': f'wamid.stub.{server.requests}'}]}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubGraphServer(ThreadingHTTPServer):
+    """Answers POSTs from a script of (status, headers), then 200s"""
+    daemon_threads = True
+
+    def __init__(self, script=()):
+        super().__init__(('127.0.0.1', 0), _StubHandler)
+        self.lock = threading.Lock()
+        self.script = list(script)
+        self.requests = 0
+        self.client_ports = set()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v18.0/123/messages"
+
+
+class TransportTests(SimpleTestCase):
+    def make_transport(self, **kwargs):
+        kwargs.setdefault('backoff', 0)
+        transport = WhatsAppTransport(pool_size=4, timeout=5, **kwargs)
+        self.addCleanup(transport.close)
+        return transport
+
+    def make_server(self, script=()):
+        server = StubGraphServer(script)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_connections_are_reused(self):
+        server = self.make_server()
+        transport = self.make_transport()
+
+        for _ in range(5):
+            self.assertEqual(transport.post(server.url, json={}).status_code, 200)
+
+        self.assertEqual(server.requests, 5)
+        self.assertEqual(len(server.client_ports), 1)
+
+    def test_429_is_retried_and_counted(self):
+        server = self.make_server([(429, {}), (429, {})])
+        transport = self.make_transport(retries=2)
+
+        response = transport.post(server.url, json={})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(server.requests, 3)
+        stats = transport.metrics.snapshot()
+        self.assertEqual((stats['calls'], stats['ok'], stats['retries']), (1, 1, 2))
+        self.assertIsNotNone(stats['latency_ms']['p95'])
+
+    def test_5xx_is_not_resent(self):
+        # The send may have gone through behind a 502; the outbox decides when to retry
+        server = self.make_server([(502, {})])
+        transport = self.make_transport(retries=2)
+
+        self.assertEqual(transport.post(server.url, json={}).status_code, 502)
+        self.assertEqual(server.requests, 1)
+
+    def test_429_is_left_to_the_outbox_when_rate_limited(self):
+        # Each attempt must take its own token, so no re-POST behind the limiter's back
+        server = self.make_server([(429, {})])
+        with override_settings(WHATSAPP_RATE_LIMIT=10), mock.patch('whatsapp.transport._transport', None):
+            transport = get_transport()
+        self.addCleanup(transport.close)
+
+        self.assertEqual(transport.post(server.url, json={}).status_code, 429)
+        self.assertEqual(server.requests, 1)
+
+    def test_429_honours_retry_after(self):
+        server = self.make_server([(429, {'Retry-After': '1'})])
+        transport = self.make_transport(retries=1)
+
+        started = time.monotonic()
+        response = transport.post(server.url, json={})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(time.monotonic() - started, 0.9)
+
+    def test_retry_after_is_capped(self):
+        server = self.make_server([(429, {'Retry-After': '3600'})])
+        transport = self.make_transport(retries=1, max_retry_after=0)
+
+        started = time.monotonic()
+        self.assertEqual(transport.post(server.url, json={}).status_code, 200)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_breaker_opens_fails_fast_and_recovers(self):
+        server = self.make_server([(500, {}), (500, {})])
+        transport = self.make_transport(
+            retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+        )
+
+        self.assertEqual(transport.post(server.url, json={}).status_code, 500)
+        self.assertEqual(transport.post(server.url, json={}).status_code, 500)
+        with self.assertRaises(CircuitOpenError):
+            transport.post(server.url, json={})
+        self.assertEqual(server.requests, 2)
+        self.assertEqual(transport.metrics.snapshot()['rejected_by_breaker'], 1)
+
+        time.sleep(0.25)
+        self.assertEqual(transport.post(server.url, json={}).status_code, 200)  # half-open probe
+        self.assertEqual(transport.breaker.snapshot()['state'], CircuitBreaker.CLOSED)
+
+    def test_connection_errors_count_towards_the_breaker(self):
+        server = self.make_server()
+        url = server.url
+        server.shutdown()
+        server.server_close()
+        transport = self.make_transport(retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+
+        with self.assertRaises(Exception):
+            transport.post(url, json={})
+        with self.assertRaises(CircuitOpenError):
+            transport.post(url, json={})
+        self.assertEqual(transport.metrics.snapshot()['exceptions'], {'ConnectionError': 1})
+
+    @override_settings(WHATSAPP_PHONE_NUMBER_ID='123', WHATSAPP_ACCESS_TOKEN='token')
+    def test_service_reports_open_circuit_as_retryable(self):
+        server = self.make_server([(500, {})])
+        transport = self.make_transport(retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+        service = WhatsAppService(transport=transport)
+        service.base_url = server.url
+
+        with self.assertLogs('whatsapp.services', 'WARNING'):
+            first = service.send_message('9876543210', 'Hello')
+        second = service.send_message('9876543210', 'Hello')
+
+        self.assertFalse(first['success'])
+        self.assertTrue(first['retryable'])
+        self.assertTrue(second['circuit_open'])
+        self.assertEqual(server.requests, 1)
+
+
+class FakeApiTests(SimpleTestCase):
+    def make_server(self, **options):
+        server = start_fake_api(**options)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def post(self, server):
+        transport = WhatsAppTransport(retries=0)
+        self.addCleanup(transport.close)
+        return transport.post(f"{server.url}/v18.0/1/messages", json={'to': '919876543210'},
+                              headers={'Authorization': 'Bearer fake'})
+
+    def test_rate_limit_answers_429_with_retry_after(self):
+        server = self.make_server(rate_limit=2, retry_after=3)
+
+        codes = [self.post(server).status_code for _ in range(3)]
+        response = self.post(server)
+
+        self.assertEqual(codes[:2], [200, 200])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '3')
+        self.assertEqual(response.json()['error']['code'], 130429)
+
+    def test_error_rate_answers_500(self):
+        server = self.make_server(error_rate=1.0)
+
+        self.assertEqual(self.post(server).status_code, 500)
+        self.assertEqual(server.stats(), {'ok': 0, 'errors': 1, 'throttled': 0})
+
+
+class FakeClock:
+    """time.time / time.sleep pair where sleeping just moves the clock"""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class RateLimiterTests(TestCase):
+    def make_bucket(self, rate=10, capacity=3):
+        self.clock = FakeClock()
+        return TokenBucket('whatsapp:test', rate, capacity, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_burst_up_to_capacity_then_denied_with_wait(self):
+        bucket = self.make_bucket()
+
+        taken = [bucket.try_acquire()[0] for _ in range(3)]
+        acquired, wait = bucket.try_acquire()
+
+        self.assertEqual(taken, [True, True, True])
+        self.assertFalse(acquired)
+        self.assertAlmostEqual(wait, 0.1)
+        self.assertFalse(bucket.acquire(block=False))
+        self.assertEqual(bucket.snapshot()['rejected'], 1)
+
+    def test_refills_with_time_up_to_capacity(self):
+        bucket = self.make_bucket()
+        for _ in range(3):
+            bucket.try_acquire()
+
+        self.clock.now += 0.25
+        self.assertEqual([bucket.try_acquire()[0] for _ in range(3)], [True, True, False])
+
+        self.clock.now += 60
+        bucket.try_acquire()
+        self.assertAlmostEqual(RateLimitBucket.objects.get(key='whatsapp:test').tokens, 2.0)
+
+    def test_two_buckets_on_one_key_share_tokens(self):
+        bucket = self.make_bucket()
+        other = TokenBucket('whatsapp:test', 10, 3, clock=self.clock, sleep=self.clock.sleep)
+
+        self.assertEqual(
+            [bucket.try_acquire()[0], other.try_acquire()[0], bucket.try_acquire()[0], other.try_acquire()[0]],
+            [True, True, True, False]
+        )
+
+    def test_blocking_acquire_sleeps_until_refill(self):
+        bucket = self.make_bucket()
+        for _ in range(3):
+            bucket.acquire()
+
+        self.assertTrue(bucket.acquire())
+
+        self.assertTrue(self.clock.slept)
+        self.assertGreaterEqual(sum(self.clock.slept), 0.1)
+        self.assertEqual(bucket.snapshot()['acquired'], 4)
+
+    def test_blocking_acquire_times_out(self):
+        bucket = self.make_bucket(rate=0.001, capacity=1)
+        bucket.acquire()
+
+        self.assertFalse(bucket.acquire(timeout=0))
+        self.assertEqual(bucket.snapshot()['rejected'], 1)
+
+    def test_more_tokens_than_capacity_is_an_error(self):
+        with self.assertRaises(ValueError):
+            self.make_bucket().acquire(tokens=5)
+
+    def test_dispatch_does_not_send_without_a_token(self):
+        bucket = self.make_bucket(rate=0.001, capacity=2)
+        sent = []
+
+        class Service:
+            def send_message(self, phone, text):
+                sent.append(phone)
+                return {'success': True, 'message_id': f'wamid.{phone}'}
+
+        with override_settings(WHATSAPP_RATE_LIMIT_TIMEOUT=0):
+            results = dispatch_messages(
+                [(i, f'9198765432{i:02d}', 'hi') for i in range(3)], concurrency=2, service=Service(), limiter=bucket
+            )
+
+        self.assertEqual(len(sent), 2)
+        self.assertEqual([results[i]['success'] for i in range(3)], [True, True, False])
+        self.assertTrue(results[2]['retryable'])
+
+
+class ScriptedService:
+    """send_message() answers `result`, or by_phone[phone] when given"""
+
+    def __init__(self, result=None, by_phone=None):
+        self.result = result
+        self.by_phone = by_phone or {}
+        self.calls = []
+
+    def send_message(self, phone, text):
+        self.calls.append(phone)
+        return self.by_phone.get(phone, self.result)
+
+
+@override_settings(WHATSAPP_OUTBOX_MAX_ATTEMPTS=3, WHATSAPP_OUTBOX_BACKOFF_BASE=30, WHATSAPP_OUTBOX_BACKOFF_MAX=100)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.gym = create_gym()
+
+    def make_reminders(self, count=1):
+        reminders = []
+        for index in range(count):
+            member = create_member(self.gym, index)
+            reminders.append(Reminder.objects.create(
+                gym=self.gym, member=member, reminder_type='MEMBERSHIP_EXPIRING', message='Renew please',
+                due_date=member.membership_end_date
+            ))
+        return reminders
+
+    def test_claims_only_due_messages_and_never_twice(self):
+        due, later = enqueue_reminders(self.make_reminders(2))
+        OutboundMessage.objects.filter(pk=later.pk).update(next_attempt_at=timezone.now() + timedelta(hours=1))
+
+        first = claim_batch(10)
+        second = claim_batch(10)
+
+        self.assertEqual([m.pk for m in first], [due.pk])
+        self.assertEqual(second, [])
+        self.assertEqual(first[0].status, 'SENDING')
+        self.assertIsNotNone(first[0].claim_token)
+
+    def test_claim_can_be_limited_to_one_gym(self):
+        enqueue_reminders(self.make_reminders())
+        other = create_gym('other@example.com')
+
+        self.assertEqual(claim_batch(10, gym=other), [])
+        self.assertEqual(len(claim_batch(10, gym=self.gym)), 1)
+
+    def test_reminder_is_enqueued_once_while_in_flight(self):
+        reminder, = self.make_reminders()
+
+        self.assertEqual(len(enqueue_reminders([reminder])), 1)
+        self.assertEqual(enqueue_reminders([reminder]), [])
+        # The constraint holds even when the in-flight check is bypassed (concurrent callers)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            OutboundMessage.objects.create(
+                gym=self.gym, to_phone='1', body='x', reminder=reminder, next_attempt_at=timezone.now()
+            )
+        OutboundMessage.objects.update(status='DEAD')
+        self.assertEqual(len(enqueue_reminders([reminder])), 1)
+
+    def test_backoff_doubles_with_jitter_and_is_capped(self):
+        for attempts, expected in [(1, 30), (2, 60), (3, 100), (10, 100)]:
+            delay = backoff_delay(attempts).total_seconds()
+            self.assertGreaterEqual(delay, expected * 0.8)
+            self.assertLessEqual(delay, expected * 1.2)
+
+    def test_retryable_failures_back_off_then_dead_letter(self):
+        reminder, = self.make_reminders()
+        message, = enqueue_reminders([reminder])
+        service = ScriptedService({'success': False, 'error': 'HTTP 500', 'retryable': True})
+
+        for attempt in (1, 2):
+            before = timezone.now()
+            self.assertEqual(deliver(claim_batch(10), service=service)['retry'], 1)
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts), ('PENDING', attempt))
+            self.assertGreater(message.next_attempt_at, before + timedelta(seconds=20))
+            OutboundMessage.objects.update(next_attempt_at=timezone.now())
+
+        self.assertEqual(deliver(claim_batch(10), service=service)['dead'], 1)
+        message.refresh_from_db()
+        reminder.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.last_error), ('DEAD', 3, 'HTTP 500'))
+        self.assertEqual((reminder.status, reminder.error_message), ('FAILED', 'HTTP 500'))
+
+    def test_permanent_failure_is_dead_at_once_and_success_marks_sent(self):
+        bad, good = self.make_reminders(2)
+        enqueue_reminders([bad, good])
+        service = ScriptedService(
+            {'success': True, 'message_id': 'wamid.ok'},
+            by_phone={bad.member.phone: {'success': False, 'error': 'Invalid number', 'retryable': False}},
+        )
+
+        counts = deliver(claim_batch(10), concurrency=1, service=service)
+
+        self.assertEqual(counts, {'sent': 1, 'retry': 0, 'dead': 1})
+        statuses = dict(OutboundMessage.objects.values_list('reminder_id', 'status'))
+        self.assertEqual(statuses, {bad.pk: 'DEAD', good.pk: 'SENT'})
+        good.refresh_from_db()
+        self.assertEqual(good.status, 'SENT')
+
+    def test_outcome_of_a_requeued_claim_is_discarded(self):
+        reminder, = self.make_reminders()
+        enqueue_reminders([reminder])
+        slow = claim_batch(10)
+        OutboundMessage.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_claims(timedelta(minutes=10)), 1)
+        fast = claim_batch(10)
+
+        deliver(fast, service=ScriptedService({'success': True, 'message_id': 'wamid.fast'}))
+        counts = deliver(slow, service=ScriptedService({'success': False, 'error': 'late', 'retryable': False}))
+
+        self.assertEqual(counts, {'sent': 0, 'retry': 0, 'dead': 0})
+        message = OutboundMessage.objects.get()
+        self.assertEqual((message.status, message.provider_message_id, message.attempts), ('SENT', 'wamid.fast', 1))
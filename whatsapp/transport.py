@@ -0,0 +1,257 @@
+"""
+WhatsApp HTTP Transport
+One pooled requests.Session per process for every Graph API call:
+
+  * keep-alive pool sized to the send concurrency, so a bulk send pays the
+    TCP + TLS handshake once per connection instead of once per message
+  * urllib3 Retry for 429 and connect errors, honouring Retry-After
+    (capped, a worker thread must not sleep for an hour)
+  * a circuit breaker: after N consecutive failures (5xx, timeouts,
+    connection errors) calls fail fast for a while instead of each one
+    waiting for a timeout; one probe call is let through to test recovery
+  * per-call latency / outcome metrics (per process), see snapshot()
+
+Read errors and 5xx are not retried here: the message may already have
+been accepted (a gateway 502/504 can come after the send went through),
+so re-POSTing would duplicate it. They come back retryable and the outbox
+retries them with backoff. A 429 or a failed connect means nothing was
+sent, so those are safe to repeat - but 429 only when no rate limiter is
+configured: a urllib3 re-POST would skip the token bucket (ratelimit.py),
+which then answers for every attempt that goes out.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the breaker is open"""
+
+
+class CappedRetry(Retry):
+    """Retry that never sleeps longer than max_retry_after on a Retry-After header"""
+    max_retry_after = 30
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.max_retry_after)
+
+
+# ==============================================
+# 🔌 CIRCUIT BREAKER
+# ==============================================
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go out now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probing:
+                # Exactly one probe; everyone else keeps failing fast until it reports back
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def snapshot(self):
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self.failures}
+
+
+# ==============================================
+# 📊 METRICS
+# ==============================================
+
+class TransportMetrics:
+    """Counters + a window of recent latencies for percentiles"""
+
+    def __init__(self, window=2000):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.ok = 0
+            self.http_errors = {}
+            self.exceptions = {}
+            self.retries = 0
+            self.rejected = 0
+            self.total_seconds = 0.0
+            self.max_seconds = 0.0
+            self._latencies.clear()
+
+    def record(self, seconds, status_code=None, exception=None, retries=0):
+        with self._lock:
+            self.calls += 1
+            self.retries += retries
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self._latencies.append(seconds)
+            if exception is not None:
+                name = type(exception).__name__
+                self.exceptions[name] = self.exceptions.get(name, 0) + 1
+            elif status_code is not None and status_code < 400:
+                self.ok += 1
+            else:
+                self.http_errors[str(status_code)] = self.http_errors.get(str(status_code), 0) + 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            errors = sum(self.http_errors.values()) + sum(self.exceptions.values())
+
+            def percentile(p):
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1)
+
+            return {
+                'calls': self.calls,
+                'ok': self.ok,
+                'errors': errors,
+                'error_rate': round(errors / self.calls, 4) if self.calls else 0.0,
+                'http_errors': dict(self.http_errors),
+                'exceptions': dict(self.exceptions),
+                'retries': self.retries,
+                'rejected_by_breaker': self.rejected,
+                'latency_ms': {
+                    'avg': round(self.total_seconds / self.calls * 1000, 1) if self.calls else None,
+                    'p50': percentile(0.50),
+                    'p95': percentile(0.95),
+                    'p99': percentile(0.99),
+                    'max': round(self.max_seconds * 1000, 1) if self.calls else None,
+                },
+            }
+
+
+# ==============================================
+# 🚚 TRANSPORT
+# ==============================================
+
+class WhatsAppTransport:
+    # Only statuses where the API did NOT accept the message (see module docstring)
+    RETRY_STATUSES = (429,)
+
+    def __init__(self, pool_size=10, timeout=10, retries=2, backoff=0.5, max_retry_after=30,
+                 breaker=None, metrics=None, retry_statuses=None):
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = metrics or TransportMetrics()
+
+        retry_class = type('CappedRetry', (CappedRetry,), {'max_retry_after': max_retry_after})
+        retry = retry_class(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            status_forcelist=self.RETRY_STATUSES if retry_statuses is None else retry_statuses,
+            allowed_methods=frozenset({'POST'}),
+            backoff_factor=backoff,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def post(self, url, **kwargs):
+        """session.post with breaker + metrics. Raises CircuitOpenError or requests exceptions."""
+        if not self.breaker.allow():
+            self.metrics.record_rejected()
+            raise CircuitOpenError('WhatsApp API unavailable (circuit open), not calling it')
+
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        try:
+            response = self.session.post(url, **kwargs)
+        except requests.RequestException as e:
+            self.metrics.record(time.perf_counter() - started, exception=e)
+            self.breaker.record_failure()
+            raise
+
+        retries = getattr(getattr(response.raw, 'retries', None), 'history', ())
+        self.metrics.record(time.perf_counter() - started, status_code=response.status_code, retries=len(retries))
+        # 4xx is our problem (bad number / token / rate), not an outage
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def close(self):
+        self.session.close()
+
+
+_transport = None
+_transport_pid = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Process-wide transport (rebuilt after fork: pooled sockets must not be shared)"""
+    global _transport, _transport_pid
+    with _transport_lock:
+        if _transport is None or _transport_pid != os.getpid():
+            concurrency = getattr(settings, 'WHATSAPP_SEND_CONCURRENCY', 8)
+            _transport = WhatsAppTransport(
+                pool_size=getattr(settings, 'WHATSAPP_HTTP_POOL_SIZE', None) or max(concurrency, 10),
+                timeout=getattr(settings, 'WHATSAPP_HTTP_TIMEOUT', 10),
+                retries=getattr(settings, 'WHATSAPP_HTTP_RETRIES', 2),
+                backoff=getattr(settings, 'WHATSAPP_HTTP_BACKOFF', 0.5),
+                max_retry_after=getattr(settings, 'WHATSAPP_HTTP_MAX_RETRY_AFTER', 30),
+                breaker=CircuitBreaker(
+                    failure_threshold=getattr(settings, 'WHATSAPP_BREAKER_THRESHOLD', 5),
+                    reset_timeout=getattr(settings, 'WHATSAPP_BREAKER_RESET', 30),
+                ),
+                # With the shared bucket on, every POST must have taken a token first
+                retry_statuses=() if getattr(settings, 'WHATSAPP_RATE_LIMIT', 0) else None,
+            )
+            _transport_pid = os.getpid()
+        return _transport
+
+
+def transport_stats():
+    transport = get_transport()
+    return {**transport.metrics.snapshot(), 'circuit': transport.breaker.snapshot()}
@@ -2,11 +2,18 @@
 WhatsApp URLs
 """
 from django.urls import path
-from .views import SendReceiptWhatsAppView, TestWhatsAppView
+from .views import (
+    SendReceiptWhatsAppView, TestWhatsAppView, OutboxListView, OutboxDetailView, WhatsAppWebhookView,
+    TransportMetricsView
+)
 
 app_name = 'whatsapp'
 
 urlpatterns = [
     path('send-receipt/<uuid:receipt_id>/', SendReceiptWhatsAppView.as_view(), name='send-receipt'),
     path('test/', TestWhatsAppView.as_view(), name='test'),
-]
\ No newline at end of file
+    path('outbox/', OutboxListView.as_view(), name='outbox-list'),
+    path('outbox/<uuid:pk>/', OutboxDetailView.as_view(), name='outbox-detail'),
+    path('webhook/', WhatsAppWebhookView.as_view(), name='webhook'),
+    path('metrics/', TransportMetricsView.as_view(), name='metrics'),
+]
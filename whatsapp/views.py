@@ -3,20 +3,30 @@ WhatsApp Views
 """
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from rest_framework import status
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework import generics, status
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from django.urls import reverse
+from .models import OutboundMessage
+from .outbox import enqueue_message
+from .ratelimit import get_rate_limiter, rate_limiter_stats
+from .serializers import OutboundMessageSerializer
 from .services import WhatsAppService
+from .transport import transport_stats
+from .webhooks import ingest_status_events, parse_body, verify_signature
 from payments.models import Receipt
 from fitness.models import ActivityLog
 
 
 class SendReceiptWhatsAppView(APIView):
-    """Send receipt via WhatsApp"""
+    """Queue a receipt for WhatsApp delivery (outbox worker sends it)"""
     permission_classes = [IsAuthenticated]
     
     def post(self, request, receipt_id):
         try:
-            receipt = Receipt.objects.get(id=receipt_id, gym=request.user.gym)
+            receipt = Receipt.objects.select_related('member', 'payment').get(id=receipt_id, gym=request.user.gym)
             
             # Check if WhatsApp is enabled
             if not request.user.gym.whatsapp_enabled:
@@ -25,33 +35,28 @@ class SendReceiptWhatsAppView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Send via WhatsApp
-            whatsapp_service = WhatsAppService()
-            result = whatsapp_service.send_receipt(receipt)
-            
-            if result['success']:
-                receipt.sent_via_whatsapp = True
-                from django.utils import timezone
-                receipt.whatsapp_sent_at = timezone.now()
-                receipt.save()
-                
-                # Log activity
+            # Message + activity log commit together; receipt is marked sent when delivery succeeds
+            with transaction.atomic():
+                message = enqueue_message(
+                    request.user.gym,
+                    receipt.member.phone,
+                    WhatsAppService.receipt_message(receipt),
+                    kind='RECEIPT',
+                    receipt=receipt,
+                )
                 ActivityLog.objects.create(
                     user=request.user,
                     gym=request.user.gym,
                     action='RECEIPT_SENT',
-                    description=f'Receipt {receipt.receipt_number} sent via WhatsApp to {receipt.member.name}'
-                )
-                
-                return Response({
-                    'success': True,
-                    'message': 'Receipt sent successfully via WhatsApp'
-                })
-            else:
-                return Response(
-                    {'success': False, 'error': result['error']},
-                    status=status.HTTP_400_BAD_REQUEST
+                    description=f'Receipt {receipt.receipt_number} queued for WhatsApp to {receipt.member.name}'
                 )
+            
+            return Response({
+                'success': True,
+                'message': 'Receipt queued for WhatsApp delivery',
+                'outbox_id': message.id,
+                'status_url': reverse('whatsapp:outbox-detail', kwargs={'pk': message.id}),
+            }, status=status.HTTP_202_ACCEPTED)
         
         except Receipt.DoesNotExist:
             return Response(
@@ -60,6 +65,28 @@ class SendReceiptWhatsAppView(APIView):
             )
 
 
+class OutboxListView(generics.ListAPIView):
+    """Outbound WhatsApp messages of the gym (?status=PENDING|SENDING|SENT|DEAD)"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = OutboundMessageSerializer
+    
+    def get_queryset(self):
+        queryset = OutboundMessage.objects.filter(gym=self.request.user.gym)
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter.upper())
+        return queryset
+
+
+class OutboxDetailView(generics.RetrieveAPIView):
+    """Delivery status of one queued message"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = OutboundMessageSerializer
+    
+    def get_queryset(self):
+        return OutboundMessage.objects.filter(gym=self.request.user.gym)
+
+
 class TestWhatsAppView(APIView):
     """Test WhatsApp configuration"""
     permission_classes = [IsAuthenticated]
@@ -81,6 +108,14 @@ This is a test message to verify WhatsApp integration.
 If you received this, WhatsApp is configured correctly! ✅
         """.strip()
         
+        # Interactive call: don't hold the request open waiting for a token
+        limiter = get_rate_limiter()
+        if limiter and not limiter.acquire(block=False):
+            return Response(
+                {'success': False, 'error': 'WhatsApp send rate limit reached, try again in a moment'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+        
         whatsapp_service = WhatsAppService()
         result = whatsapp_service.send_message(phone, message)
         
@@ -93,4 +128,43 @@ If you received this, WhatsApp is configured correctly! ✅
             return Response(
                 {'success': False, 'error': result['error']},
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+
+class WhatsAppWebhookView(APIView):
+    """Graph API webhook: GET subscription handshake, POST signed status callbacks"""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        verify_token = getattr(settings, 'WHATSAPP_WEBHOOK_VERIFY_TOKEN', None)
+        if (
+            verify_token
+            and request.query_params.get('hub.mode') == 'subscribe'
+            and request.query_params.get('hub.verify_token') == verify_token
+        ):
+            # Meta expects the bare challenge back, not JSON
+            return HttpResponse(request.query_params.get('hub.challenge', ''), content_type='text/plain')
+        return Response({'error': 'Verification failed'}, status=status.HTTP_403_FORBIDDEN)
+    
+    def post(self, request):
+        body = request.body
+        if not verify_signature(body, request.headers.get('X-Hub-Signature-256')):
+            return Response({'error': 'Invalid signature'}, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            events = parse_body(body)
+        except ValueError:
+            return Response({'error': 'Invalid JSON'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # ⚡ Buffered; applied in bulk by the flusher thread
+        ingest_status_events(events)
+        return Response({'received': len(events)})
+
+
+class TransportMetricsView(APIView):
+    """Latency / error / retry counters, breaker state and rate-limit waits of this process's WhatsApp sends"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response({**transport_stats(), 'rate_limit': rate_limiter_stats()})